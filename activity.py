@@ -0,0 +1,63 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from datetime import datetime
+
+from common import *
+
+# 'pushed' drops repos neither pushed to nor updated since start_date, 'created' repos created after end_date,
+# 'archived' archived repos, and 'fork' forks
+ACTIVITY_RULES = ['pushed', 'created', 'archived', 'fork']
+DEFAULT_ACTIVITY_RULES = ['pushed', 'created']
+
+# Drops repos with no activity between start_date and end_date from the attributes
+# of the org repos listing, i.e., before any per repo API call
+class ActivityFilter:
+    def __init__(self, rules, start_date, end_date):
+        self.rules = rules
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def _date(self, repo, attr):
+        date = to_utc(getattr(repo, attr, None))
+        return date if isinstance(date, datetime) else None
+
+    # returns the first rule dropping repo, or None when repo may have activity, e.g., when its dates are unknown
+    def inactive_rule(self, repo):
+        for rule in self.rules:
+            if rule == 'pushed':
+                dates = [date for date in [self._date(repo, 'pushed_at'), self._date(repo, 'updated_at')] if date != None]
+                if len(dates) > 0 and max(dates) < self.start_date:
+                    return rule
+            elif rule == 'created':
+                created_at = self._date(repo, 'created_at')
+                if created_at != None and created_at > self.end_date:
+                    return rule
+            elif rule == 'archived' and getattr(repo, 'archived', False) == True:
+                return rule
+            elif rule == 'fork' and getattr(repo, 'fork', False) == True:
+                return rule
+        return None
+
+    # returns (active_repos, {repo_name: rule}) of the skipped repos
+    def filter(self, repos):
+        active_repos, skipped = [], {}
+        for repo in repos:
+            rule = self.inactive_rule(repo)
+            if rule == None:
+                active_repos.append(repo)
+            else:
+                skipped[repo.name] = rule
+        return active_repos, skipped
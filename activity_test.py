@@ -0,0 +1,53 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+
+from unittest.mock import Mock
+from datetime import datetime, timezone
+
+from activity import *
+
+class TestActivityFilter(unittest.TestCase):
+    def setUp(self):
+        self.start_date = datetime(2020, 7, 1)
+        self.end_date = datetime(2020, 7, 31)
+
+    def __repo(self, name, pushed_at=None, updated_at=None, created_at=None, archived=False, fork=False):
+        repo = Mock(pushed_at=pushed_at, updated_at=updated_at, created_at=created_at, archived=archived, fork=fork)
+        repo.name = name
+        return repo
+
+    def test_filter(self):
+        repos = [self.__repo('pushed', pushed_at=datetime(2020, 7, 2), updated_at=datetime(2019, 1, 1)),
+                 self.__repo('updated', pushed_at=datetime(2019, 1, 1), updated_at=datetime(2020, 7, 15, tzinfo=timezone.utc)),
+                 self.__repo('dormant', pushed_at=datetime(2020, 6, 30), updated_at=datetime(2020, 6, 1)),
+                 self.__repo('new', pushed_at=datetime(2020, 8, 2), created_at=datetime(2020, 8, 1)),
+                 self.__repo('forked', pushed_at=datetime(2020, 7, 2), fork=True)]
+        active_repos, skipped = ActivityFilter(DEFAULT_ACTIVITY_RULES, self.start_date, self.end_date).filter(repos)
+        self.assertEqual([repo.name for repo in active_repos], ['pushed', 'updated', 'forked'])
+        self.assertEqual(skipped, {'dormant': 'pushed', 'new': 'created'})
+        active_repos, skipped = ActivityFilter(['fork'], self.start_date, self.end_date).filter(repos)
+        self.assertEqual(skipped, {'forked': 'fork'})
+
+    def test_unknown_dates(self):
+        repo = Mock(spec=['name'])
+        repo.name = 'store-repo'
+        active_filter = ActivityFilter(ACTIVITY_RULES, self.start_date, self.end_date)
+        self.assertEqual(active_filter.inactive_rule(repo), None)
+        self.assertEqual(active_filter.inactive_rule(self.__repo('archived', archived=True)), 'archived')
+
+if __name__ == '__main__':
+    unittest.main()
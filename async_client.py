@@ -0,0 +1,284 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio, threading
+
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from client import GHClient
+
+from common import *
+
+API_URL = 'https://api.github.com'
+
+class AsyncRepo:
+    def __init__(self, data):
+        self.name = data['name']
+        self.full_name = data['full_name']
+        self.created_at = self._date(data, 'created_at')
+        self.pushed_at = self._date(data, 'pushed_at')
+        self.updated_at = self._date(data, 'updated_at')
+        self.archived = data.get('archived', False)
+        self.fork = data.get('fork', False)
+
+    def _date(self, data, key):
+        return datetime.strptime(data[key], '%Y-%m-%dT%H:%M:%SZ') if data.get(key) else None
+
+# GHClient backend calling the GitHub REST API with asyncio and aiohttp: one keep-alive
+# session whose requests are all in flight together, up to self.workers at a time
+class AsyncGHClient(GHClient):
+    PER_PAGE = 100
+    def __init__(self, access_token, api_url=API_URL):
+        super().__init__(access_token)
+        self.api_url = api_url
+        self.loop = None
+        self.session = None
+        self.semaphore = None
+        self.__lock = threading.Lock()
+
+    def get_client(self):
+        raise Exception("no PyGithub client with the 'async' backend")
+
+    def _parse_datetime(self, value):
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+
+    # the event loop runs in its own thread so that the counts methods can be called from any thread
+    def _run(self, coroutine):
+        with self.__lock:
+            if self.loop == None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self._run_loop, args=(self.loop,), daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def _run_loop(self, loop):
+        loop.run_forever()
+        loop.close()
+
+    def close(self):
+        if self.loop == None:
+            return
+        if self.session != None:
+            self._run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop = None
+        self.session = None
+
+    # aiohttp is optional, so commands check it is installed before using the client
+    @staticmethod
+    def available():
+        return aiohttp != None
+
+    async def _get_session(self):
+        if self.session == None:
+            self.semaphore = asyncio.Semaphore(max(1, self.workers))
+            connector = aiohttp.TCPConnector(limit=max(1, self.workers))
+            self.session = aiohttp.ClientSession(connector=connector, headers={'Accept': 'application/vnd.github.v3+json'})
+        return self.session
+
+    # the rate limiters may sleep, so they are called off the event loop
+    async def _blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _token_and_limiter(self, resource):
+        if isinstance(self.adaptive_rate_limiter, TokenPool):
+            token = self.adaptive_rate_limiter.acquire(resource)
+            return token, self.adaptive_rate_limiter.limiters[token]
+        return self.access_token, self.adaptive_rate_limiter
+
+    # returns (status, body, {rel: page URL}) and retries as asked by the rate limit headers
+    async def _get(self, url, params=None, statuses=[200, 202, 204]):
+        session = await self._get_session()
+        resource = 'search' if '/search/' in url else 'core'
+        await self._blocking(self._count_check_api_calls)
+        for attempt in range(AdaptiveRateLimiter.MAX_RETRIES + 1):
+            token, limiter = await self._blocking(self._token_and_limiter, resource)
+            if limiter != None:
+                await self._blocking(limiter.wait, resource)
+            async with self.semaphore:
+                async with session.get(url, params=params, headers={'Authorization': "token {token}".format(token=token)}) as response:
+                    status = response.status
+                    headers = dict(response.headers)
+                    body = await response.json() if status == 200 else None
+                    links = {rel: str(link['url']) for rel, link in response.links.items()}
+            retry_after = limiter.update(resource, status, headers, attempt) if limiter != None else None
+            if retry_after == None or attempt == AdaptiveRateLimiter.MAX_RETRIES:
+                break
+            if isinstance(self.adaptive_rate_limiter, TokenPool):
+                self.adaptive_rate_limiter.block(token, resource, retry_after)
+            else:
+                await asyncio.sleep(retry_after)
+        if status not in statuses:
+            raise Exception("GitHub API error '{status}' for: {url}".format(status=status, url=url))
+        return status, body, links
+
+    # async iterator over the items of every page of a listing
+    async def _paginate(self, path, params={}):
+        url = self.api_url + path
+        params = dict(params, per_page=self.PER_PAGE)
+        while url != None:
+            status, items, links = await self._get(url, params)
+            # the next page URL already has the query parameters
+            url, params = links.get('next'), None
+            for item in items or []:
+                yield item
+
+    async def _repos(self, org):
+        return Repos([AsyncRepo(r) async for r in self._paginate("/orgs/{org}/repos".format(org=org))])
+
+    def _list_repos(self, org):
+        return self._run(self._repos(org))
+
+    async def _repo(self, org, name):
+        status, body, _ = await self._get("{api_url}/repos/{org}/{name}".format(api_url=self.api_url, org=org, name=name), statuses=[200, 404])
+        return AsyncRepo(body) if status == 200 else None
+
+    def _get_repo(self, org, name):
+        return self._run(self._repo(org, name))
+
+    # items are listed newest first on date_key so that paging stops at the first one older than start_date
+    async def _items_in(self, items, start_date, end_date, date_key='created_at'):
+        async for item in items:
+            item_date = self._parse_datetime(item[date_key])
+            if item_date > end_date:
+                continue
+            if item_date < start_date:
+                return
+            yield item
+
+    async def _authors_counts(self, items, authors):
+        counts = self._init_authors_count_map(authors)
+        async for item in items:
+            if item['user'] != None and item['user']['login'] in counts:
+                self._count(counts, item['user']['login'], self._parse_datetime(item['created_at']))
+        return counts
+
+    def prs_count(self, repo, author, start_date, end_date, state='close'):
+        return self.prs_counts(repo, [author], start_date, end_date, state)[author]
+
+    def prs_counts(self, repo, authors, start_date, end_date, state='close'):
+        prs = self._paginate("/repos/{repo}/pulls".format(repo=repo.full_name), {'state': state, 'sort': 'created', 'direction': 'desc'})
+        return self._run(self._authors_counts(self._items_in(prs, start_date, end_date), authors))
+
+    def issues_count(self, repo, author, start_date, end_date, state='close'):
+        return self.issues_counts(repo, [author], start_date, end_date, state)[author]
+
+    def issues_counts(self, repo, authors, start_date, end_date, state='close'):
+        issues = self._paginate("/repos/{repo}/issues".format(repo=repo.full_name), {'state': state, 'since': start_date.strftime('%Y-%m-%dT%H:%M:%SZ'), 'sort': 'created', 'direction': 'desc'})
+        return self._run(self._authors_counts(self._items_in(issues, start_date, end_date), authors))
+
+    async def _list(self, path):
+        return [item async for item in self._paginate(path)]
+
+    # the reviews of each PR are fetched while the next PRs are being listed, the PRs created
+    # between start_date and end_date are counted in prs_counts
+    async def _prs_reviews_counts(self, repo, authors, start_date, end_date, pr_state):
+        prs_counts = self._init_authors_count_map(authors)
+        reviews_counts = self._init_authors_count_map(authors)
+        prs = self._paginate("/repos/{repo}/pulls".format(repo=repo.full_name), {'state': pr_state, 'sort': 'updated', 'direction': 'desc'})
+        reviews_tasks = []
+        async for pr in prs:
+            if self._parse_datetime(pr['updated_at']) < start_date:
+                break
+            created_at = self._parse_datetime(pr['created_at'])
+            if pr['user'] != None and pr['user']['login'] in prs_counts and created_at >= start_date and created_at <= end_date:
+                self._count(prs_counts, pr['user']['login'], created_at)
+            reviews_tasks.append(asyncio.ensure_future(self._list("/repos/{repo}/pulls/{number}/reviews".format(repo=repo.full_name, number=pr['number']))))
+        for reviews in await asyncio.gather(*reviews_tasks):
+            for r in reviews:
+                # pending reviews have no submitted_at and deleted users no user
+                if r['user'] == None or r.get('submitted_at') == None:
+                    continue
+                submitted_at = self._parse_datetime(r['submitted_at'])
+                if r['user']['login'] in reviews_counts and (submitted_at >= start_date and submitted_at <= end_date):
+                    self._count(reviews_counts, r['user']['login'], submitted_at)
+        return prs_counts, reviews_counts
+
+    def reviews_count(self, repo, author, start_date, end_date, pr_state='close'):
+        return self.reviews_counts(repo, [author], start_date, end_date, pr_state)[author]
+
+    def reviews_counts(self, repo, authors, start_date, end_date, pr_state='close'):
+        return self._run(self._prs_reviews_counts(repo, authors, start_date, end_date, pr_state))[1]
+
+    def prs_reviews_counts(self, repo, authors, start_date, end_date, state='close'):
+        return self._run(self._prs_reviews_counts(repo, authors, start_date, end_date, state))
+
+    # with one item per page, the number of the last page is the total
+    async def _total(self, path, params):
+        status, items, links = await self._get(self.api_url + path, dict(params, per_page=1))
+        if 'last' not in links:
+            return len(items or [])
+        return int(parse_qs(urlparse(links['last']).query)['page'][0])
+
+    def prs_total(self, repo, state='closed'):
+        return self._run(self._total("/repos/{repo}/pulls".format(repo=repo.full_name), {'state': state}))
+
+    def issues_total(self, repo, state='closed'):
+        return self._run(self._total("/repos/{repo}/issues".format(repo=repo.full_name), {'state': state}))
+
+    async def _search_repos_counts(self, query, repo_name=None):
+        url, params = self.api_url + '/search/issues', {'q': query, 'per_page': self.PER_PAGE if repo_name == None else 1}
+        if repo_name != None:
+            status, results, links = await self._get(url, params)
+            return {repo_name: results['total_count']} if results['total_count'] > 0 else {}
+        repos_counts = {}
+        while url != None:
+            status, results, links = await self._get(url, params)
+            url, params = links.get('next'), None
+            if results['total_count'] > self.SEARCH_MAX_RESULTS:
+                return None
+            for item in results['items']:
+                item_repo_name = item['repository_url'].split('/')[-1]
+                repos_counts[item_repo_name] = repos_counts.get(item_repo_name, 0) + 1
+        return repos_counts
+
+    async def _search_authors_repos_counts(self, org, kind, authors, start_date, end_date, state, repo_name):
+        return await asyncio.gather(*[self._search_repos_counts(self._search_query(org, kind, author, start_date, end_date, state, repo_name), repo_name) for author in authors])
+
+    def search_counts(self, org, kind, authors, start_date, end_date, state='closed', repo_name=None):
+        authors_repos_counts = self._run(self._search_authors_repos_counts(org, kind, authors, start_date, end_date, state, repo_name))
+        return self._search_counts(kind, authors, authors_repos_counts)
+
+    async def _commits_churn_counts(self, repo, authors, start_date, end_date):
+        commits_counts = self._init_authors_count_map(authors)
+        additions_counts = self._init_authors_count_map(authors)
+        deletions_counts = self._init_authors_count_map(authors)
+        status, stats_contributors, links = await self._get("{api_url}/repos/{repo}/stats/contributors".format(api_url=self.api_url, repo=repo.full_name))
+        if status == 202:
+            raise StatsComputingException("contributors stats for repo: '{repo}' are being computed by GitHub".format(repo=repo.full_name))
+        for sc in stats_contributors or []:
+            if sc['author'] == None or sc['author']['login'] not in commits_counts:
+                continue
+            for w in sc['weeks']:
+                week = datetime.fromtimestamp(w['w'], timezone.utc).replace(tzinfo=None)
+                if self._week_in(week, start_date, end_date):
+                    self._count(commits_counts, sc['author']['login'], week, w['c'])
+                    self._count(additions_counts, sc['author']['login'], week, w['a'])
+                    self._count(deletions_counts, sc['author']['login'], week, w['d'])
+        return commits_counts, additions_counts, deletions_counts
+
+    def commits_count(self, repo, author, start_date, end_date):
+        return self.commits_counts(repo, [author], start_date, end_date)[author]
+
+    def commits_counts(self, repo, authors, start_date, end_date):
+        return self.commits_churn_counts(repo, authors, start_date, end_date)[0]
+
+    def commits_churn_counts(self, repo, authors, start_date, end_date):
+        return self._run(self._commits_churn_counts(repo, authors, start_date, end_date))
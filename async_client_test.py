@@ -0,0 +1,180 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import sys, json, threading, unittest
+
+from io import StringIO
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from async_client import *
+
+PRS = [{'number': 3, 'user': {'login': 'user0'}, 'created_at': '2020-07-20T10:00:00Z', 'updated_at': '2020-07-25T10:00:00Z'},
+       {'number': 2, 'user': {'login': 'user1'}, 'created_at': '2020-07-10T10:00:00Z', 'updated_at': '2020-07-12T10:00:00Z'},
+       {'number': 1, 'user': {'login': 'user0'}, 'created_at': '2020-06-10T10:00:00Z', 'updated_at': '2020-07-02T10:00:00Z'},
+       {'number': 0, 'user': {'login': 'user0'}, 'created_at': '2020-05-10T10:00:00Z', 'updated_at': '2020-05-11T10:00:00Z'}]
+
+REVIEWS = {3: [{'user': {'login': 'user1'}, 'submitted_at': '2020-07-21T10:00:00Z'}, {'user': None, 'submitted_at': '2020-07-21T10:00:00Z'}],
+           2: [{'user': {'login': 'user0'}, 'submitted_at': '2020-07-11T10:00:00Z'}, {'user': {'login': 'user0'}, 'submitted_at': None}],
+           1: [{'user': {'login': 'user1'}, 'submitted_at': '2020-07-02T10:00:00Z'}, {'user': {'login': 'user1'}, 'submitted_at': '2020-06-11T10:00:00Z'}]}
+
+class FakeGitHubAPIHandler(BaseHTTPRequestHandler):
+    paths = []
+    retry_after = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def __send(self, status, body, headers={}):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    # two items per page, or one when counting totals, linking to the next and last ones
+    def __send_page(self, items, query):
+        page = int(query.get('page', ['1'])[0])
+        per_page = 1 if query.get('per_page') == ['1'] else 2
+        headers = {}
+        if page*per_page < len(items):
+            link = '<http://{host}{path}?page={page}&per_page={per_page}>; rel="{rel}"'
+            headers['Link'] = ', '.join([link.format(host=self.headers['Host'], path=urlparse(self.path).path, page=p, per_page=per_page, rel=rel)
+                                         for p, rel in [(page+1, 'next'), ((len(items)+per_page-1)//per_page, 'last')]])
+        self.__send(200, items[(page-1)*per_page:page*per_page], headers)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        FakeGitHubAPIHandler.paths.append(url.path)
+        if len(self.retry_after) > 0:
+            self.__send(403, {}, {'Retry-After': self.retry_after.pop(0)})
+        elif url.path == '/orgs/fake-org/repos':
+            self.__send_page([{'name': 'repo0', 'full_name': 'fake-org/repo0'}, {'name': 'repo1', 'full_name': 'fake-org/repo1'}, {'name': 'repo2', 'full_name': 'fake-org/repo2'}], query)
+        elif url.path == '/repos/fake-org/repo0':
+            self.__send(200, {'name': 'repo0', 'full_name': 'fake-org/repo0'})
+        elif url.path == '/repos/fake-org/repo0/pulls':
+            prs = PRS
+            if query.get('sort') == ['created']:
+                prs = sorted(PRS, key=lambda pr: pr['created_at'], reverse=True)
+            self.__send_page(prs, query)
+        elif url.path.startswith('/repos/fake-org/repo0/pulls/'):
+            self.__send(200, REVIEWS[int(url.path.split('/')[5])])
+        elif url.path == '/repos/fake-org/repo0/issues':
+            self.__send_page([{'user': {'login': 'user0'}, 'created_at': '2020-07-03T10:00:00Z'}, {'user': {'login': 'user1'}, 'created_at': '2020-06-03T10:00:00Z'}], query)
+        elif url.path == '/search/issues':
+            self.__send(200, {'total_count': 2, 'items': [{'repository_url': 'http://127.0.0.1/repos/fake-org/repo0'}, {'repository_url': 'http://127.0.0.1/repos/fake-org/repo1'}]})
+        elif url.path == '/repos/fake-org/repo0/stats/contributors':
+            self.__send(200, [{'author': {'login': 'user0'}, 'weeks': [{'w': 1593907200, 'a': 10, 'd': 2, 'c': 3}, {'w': 1588464000, 'a': 1, 'd': 1, 'c': 1}]}])
+        elif url.path == '/repos/fake-org/repo1/stats/contributors':
+            self.__send(202, {})
+        else:
+            self.__send(404, {'message': 'Not Found'})
+
+@unittest.skipIf(aiohttp == None, "aiohttp is not installed")
+class TestAsyncGHClient(unittest.TestCase):
+    def setUp(self):
+        self.backup_out = sys.stdout
+        sys.stdout = StringIO()
+        FakeGitHubAPIHandler.paths = []
+        FakeGitHubAPIHandler.retry_after = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGitHubAPIHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = AsyncGHClient('fake-access-token', "http://127.0.0.1:{port}".format(port=self.server.server_port))
+        self.client.set_workers(4)
+        self.repo = AsyncRepo({'name': 'repo0', 'full_name': 'fake-org/repo0'})
+        self.start_date = datetime(2020, 7, 1)
+        self.end_date = datetime(2020, 7, 31)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        sys.stdout = self.backup_out
+
+    def test_repos(self):
+        repos = self.client.repos('fake-org')
+        self.assertEqual(repos.totalCount, 3)
+        self.assertEqual([r.name for r in repos], ['repo0', 'repo1', 'repo2'])
+
+    def test_repo(self):
+        self.assertEqual(self.client.repo('fake-org', 'repo0').full_name, 'fake-org/repo0')
+        self.assertEqual(self.client.repo('fake-org', 'unknown-repo'), None)
+        self.assertNotIn('/orgs/fake-org/repos', FakeGitHubAPIHandler.paths)
+
+    def test_prs_counts(self):
+        self.assertEqual(self.client.prs_counts(self.repo, ['user0', 'user1'], self.start_date, self.end_date, 'closed'), {'user0': 1, 'user1': 1})
+        self.assertEqual(self.client.prs_count(self.repo, 'user0', self.start_date, self.end_date, 'closed'), 1)
+
+    def test_issues_counts(self):
+        self.assertEqual(self.client.issues_counts(self.repo, ['user0', 'user1'], self.start_date, self.end_date, 'closed'), {'user0': 1, 'user1': 0})
+
+    def test_reviews_counts(self):
+        self.assertEqual(self.client.reviews_counts(self.repo, ['user0', 'user1', 'user2'], self.start_date, self.end_date, 'closed'), {'user0': 1, 'user1': 2, 'user2': 0})
+        # PR 0 was not updated since start date so its reviews are not fetched
+        self.assertNotIn('/repos/fake-org/repo0/pulls/0/reviews', FakeGitHubAPIHandler.paths)
+
+    def test_prs_reviews_counts(self):
+        authors = ['user0', 'user1', 'user2']
+        prs_counts, reviews_counts = self.client.prs_reviews_counts(self.repo, authors, self.start_date, self.end_date, 'closed')
+        self.assertEqual(prs_counts, self.client.prs_counts(self.repo, authors, self.start_date, self.end_date, 'closed'))
+        self.assertEqual(reviews_counts, {'user0': 1, 'user1': 2, 'user2': 0})
+
+    def test_commits_counts(self):
+        self.assertEqual(self.client.commits_counts(self.repo, ['user0', 'user1'], self.start_date, self.end_date), {'user0': 3, 'user1': 0})
+        self.assertEqual(self.client.commits_churn_counts(self.repo, ['user0'], self.start_date, self.end_date), ({'user0': 3}, {'user0': 10}, {'user0': 2}))
+        repo1 = AsyncRepo({'name': 'repo1', 'full_name': 'fake-org/repo1'})
+        with self.assertRaises(StatsComputingException):
+            self.client.commits_counts(repo1, ['user0'], self.start_date, self.end_date)
+
+    def test_totals(self):
+        self.assertEqual(self.client.prs_total(self.repo, 'closed'), 4)
+        self.assertEqual(self.client.issues_total(self.repo, 'closed'), 2)
+        self.assertEqual(self.client.repos('fake-org')[0].created_at, None)
+
+    def test_search_counts(self):
+        search_counts = self.client.search_counts('fake-org', 'pr', ['user0', 'user1'], self.start_date, self.end_date, 'closed')
+        self.assertEqual(search_counts, {'user0': {'repo0': 1, 'repo1': 1}, 'user1': {'repo0': 1, 'repo1': 1}})
+        self.assertEqual(FakeGitHubAPIHandler.paths.count('/search/issues'), 2)
+        # a search in one repo only reads the total
+        search_counts = self.client.search_counts('fake-org', 'pr', ['user0'], self.start_date, self.end_date, 'closed', 'repo0')
+        self.assertEqual(search_counts, {'user0': {'repo0': 2}})
+
+    def test_retry_after(self):
+        sleeps = []
+        self.client.set_adaptive_rate_limiter(AdaptiveRateLimiter(sleep=sleeps.append))
+        FakeGitHubAPIHandler.retry_after = ['0']
+        self.assertEqual(self.client.repos('fake-org').totalCount, 3)
+        self.assertEqual(FakeGitHubAPIHandler.paths.count('/orgs/fake-org/repos'), 3)
+
+    def test_error(self):
+        with self.assertRaises(Exception):
+            self.client.repos('unknown-org')
+
+    def test_threads(self):
+        counts = []
+        threads = [threading.Thread(target=lambda: counts.append(self.client.prs_counts(self.repo, ['user0'], self.start_date, self.end_date, 'closed'))) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(counts, [{'user0': 1}]*8)
+
+if __name__ == '__main__':
+    unittest.main()
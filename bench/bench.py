@@ -0,0 +1,164 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""ght benchmarks
+
+Runs ght commands against a local fake GitHub API serving a synthetic organization
+and reports the API calls, wall time, and peak memory of each run, compared to the
+recorded baselines.
+
+Usage:
+  bench.py [options]
+
+Options:
+  --size=small                   Synthetic organization size, one of 'small', 'medium', or 'large' [default: small].
+  --commands=COMMANDS            Comma separated ght commands to run [default: commits,prs,reviews,issues,stats,sync].
+  --backends=rest                Comma separated --backend values to run each command with [default: rest].
+  --strategies=list              Comma separated --strategy values to run each command with [default: list].
+  --workers=1                    ght --workers value [default: 1].
+  --month=mar                    ght MONTH of the current year, the synthetic data spans the whole year [default: mar].
+  --latency=0                    Seconds added to each fake GitHub API response [default: 0].
+  --cache                        Also run each command again with the responses cached by the first run.
+
+  --baselines=FILE               Recorded baselines, defaults to baselines.json next to this script.
+  --record                       Record the results as the new baselines.
+  --tolerance=0.25               Allowed fraction of wall time and peak memory over the baselines [default: 0.25].
+
+  -h --help                      Show this screen.
+
+"""
+import io, os, sys, json, time, shutil, tempfile, tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from docopt import docopt
+from tabulate import tabulate
+
+import ghtrack
+
+from cli import CLI
+from common import *
+
+from fake_github import FakeGitHub
+from synthetic_org import SyntheticOrg, SIZES
+
+DEFAULT_BASELINES = os.path.join(BENCH_DIR, 'baselines.json')
+
+def ght_argv(command, org, fake, backend, strategy, options, work_dir, cache_dir):
+    if command == 'sync':
+        argv = ['sync', org.name, '--store', os.path.join(work_dir, 'ghtrack.db')]
+    else:
+        argv = [command, options['--month'], org.name, '--users', ','.join(org.users), '--show-all-stats', '--backend', backend, '--strategy', strategy]
+    if command == 'stats':
+        argv += ['--commits', '--prs', '--reviews', '--issues']
+    argv += ['--all-repos', '--api-url', fake.url, '--access-token', 'bench-access-token', '--workers', options['--workers'], '--checkpoint', os.path.join(work_dir, 'checkpoint.json'), '--no-memo']
+    if cache_dir != None:
+        return argv + ['--cache-dir', cache_dir]
+    return argv + ['--no-cache']
+
+# returns {'api_calls', 'wall_time', 'peak_memory'} of one ght run, its output is discarded
+def run(argv, fake):
+    args = docopt(ghtrack.__doc__, argv=argv)
+    fake.reset_calls()
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        rc = CLI(args).command().execute()
+    finally:
+        wall_time = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sys.stdout = stdout
+    if rc != 0:
+        raise Exception("'ght {argv}' failed with: {rc}".format(argv=' '.join(argv), rc=rc))
+    return {'api_calls': fake.api_calls(), 'not_modified': fake.not_modified, 'wall_time': round(wall_time, 3), 'peak_memory': peak_memory}
+
+def load_baselines(path):
+    try:
+        with open(path) as baselines_file:
+            return json.load(baselines_file)
+    except FileNotFoundError:
+        return {}
+
+def record_baselines(path, baselines, results):
+    baselines.update(results)
+    with open(path, 'w') as baselines_file:
+        json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+        baselines_file.write('\n')
+
+def delta(value, baseline):
+    if baseline == None:
+        return ''
+    if baseline == 0:
+        return '+0%' if value == 0 else 'new'
+    return "{percent:+.0f}%".format(percent=100.0*(value - baseline)/baseline)
+
+# API calls are deterministic so any increase is a regression, wall time and memory are allowed some noise
+def regressions(key, result, baseline, tolerance):
+    found = []
+    if baseline == None:
+        return found
+    if result['api_calls'] > baseline['api_calls']:
+        found.append("{key}: {calls} API calls, baseline {baseline}".format(key=key, calls=result['api_calls'], baseline=baseline['api_calls']))
+    for metric in ['wall_time', 'peak_memory']:
+        if result[metric] > baseline[metric]*(1 + tolerance):
+            found.append("{key}: {metric} {value}, baseline {baseline}".format(key=key, metric=metric, value=result[metric], baseline=baseline[metric]))
+    return found
+
+def main(options):
+    if options['--size'] not in SIZES:
+        Console.error("invalid --size '{size}', one of: {sizes}".format(size=options['--size'], sizes=', '.join(SIZES)))
+        return 1
+    os.environ.pop('GH_ACCESS_TOKENS', None)
+    baselines_path = options['--baselines'] or DEFAULT_BASELINES
+    baselines = load_baselines(baselines_path)
+    tolerance = float(options['--tolerance'])
+    org = SyntheticOrg.of_size(options['--size'])
+    fake = FakeGitHub(org, latency=float(options['--latency'])).start()
+    work_dir = tempfile.mkdtemp(prefix='ght-bench-')
+    results, rows, found = {}, [], []
+    try:
+        for backend, strategy, command in [(b, s, c) for b in options['--backends'].split(',') for s in options['--strategies'].split(',') for c in options['--commands'].split(',')]:
+            # the strategy only changes how prs and issues are counted, and reviews with 'auto'
+            if strategy != 'list' and command not in ['prs', 'issues', 'stats'] and not (strategy == 'auto' and command == 'reviews'):
+                continue
+            cache_dir = os.path.join(work_dir, "cache-{backend}-{strategy}-{command}".format(backend=backend, strategy=strategy, command=command)) if options['--cache'] else None
+            runs = [('', None)] if cache_dir == None else [('', cache_dir), ('cached', cache_dir)]
+            for run_name, run_cache_dir in runs:
+                key = '/'.join([name for name in [options['--size'], command, backend, strategy if strategy != 'list' else '', "workers={workers}".format(workers=options['--workers']), run_name] if name])
+                result = run(ght_argv(command, org, fake, backend, strategy, options, work_dir, run_cache_dir), fake)
+                baseline = baselines.get(key)
+                results[key] = result
+                found += regressions(key, result, baseline, tolerance)
+                rows.append([key, result['api_calls'], delta(result['api_calls'], baseline and baseline['api_calls']), result['not_modified'],
+                             result['wall_time'], delta(result['wall_time'], baseline and baseline['wall_time']),
+                             round(result['peak_memory']/1024/1024, 2), delta(result['peak_memory'], baseline and baseline['peak_memory'])])
+    finally:
+        fake.stop()
+        shutil.rmtree(work_dir)
+    print(tabulate(rows, headers=['run', 'API calls', 'Δ', '304s', 'wall time (s)', 'Δ', 'peak memory (MB)', 'Δ']))
+    if options['--record']:
+        record_baselines(baselines_path, baselines, results)
+        Console.ok("recorded baselines in: {path}".format(path=baselines_path))
+        return 0
+    for regression in found:
+        Console.warn("regression {regression}".format(regression=regression))
+    return 1 if len(found) > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main(docopt(__doc__)))
@@ -0,0 +1,77 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+
+from client import GHClient
+from connection import uninstall_connection
+
+from fake_github import FakeGitHub
+from synthetic_org import SyntheticOrg
+
+class TestSyntheticOrg(unittest.TestCase):
+    def test_deterministic(self):
+        org, same_org = SyntheticOrg(repos=2, prs=5, year=2020), SyntheticOrg(repos=2, prs=5, year=2020)
+        self.assertEqual(org.prs, same_org.prs)
+        self.assertEqual(org.reviews, same_org.reviews)
+        self.assertEqual(len(org.repos), 2)
+        self.assertEqual(len(org.prs['bench-org/repo0']), 5)
+        self.assertNotEqual(org.prs, SyntheticOrg(repos=2, prs=5, year=2020, seed=1).prs)
+
+class TestFakeGitHub(unittest.TestCase):
+    def setUp(self):
+        self.org = SyntheticOrg(repos=3, prs=70, reviews=2, issues=10, users=5, year=2020)
+        self.fake = FakeGitHub(self.org).start()
+        self.client = GHClient('fake-access-token', base_url=self.fake.url)
+
+    def tearDown(self):
+        uninstall_connection()
+        self.fake.stop()
+
+    def test_repos(self):
+        repos = list(self.client.repos('bench-org'))
+        self.assertEqual([r.name for r in repos], ['repo0', 'repo1', 'repo2'])
+        self.assertEqual(self.fake.calls['org'], 1)
+
+    def test_pulls_pagination(self):
+        repo = self.client.get_client().get_repo('bench-org/repo0')
+        prs = list(repo.get_pulls(state='all', sort='created', direction='desc'))
+        self.assertEqual(len(prs), 70)
+        self.assertEqual(self.fake.calls['pulls'], 3)
+        self.assertTrue(prs[0].created_at >= prs[-1].created_at)
+
+    def test_counts(self):
+        repo = self.client.get_client().get_repo('bench-org/repo0')
+        start_date, end_date = datetime(2020, 1, 1), datetime(2020, 12, 31, 23, 59, 59)
+        prs_counts = self.client.prs_counts(repo, self.org.users, start_date, end_date, 'closed')
+        self.assertEqual(sum(prs_counts.values()), len([pr for pr in self.org.prs['bench-org/repo0'] if pr['state'] == 'closed']))
+
+    def test_search(self):
+        start_date, end_date = datetime(2020, 1, 1), datetime(2020, 12, 31, 23, 59, 59)
+        search_counts = self.client.search_counts('bench-org', 'pr', ['user0'], start_date, end_date, 'closed')
+        prs = [pr for repo_prs in self.org.prs.values() for pr in repo_prs if pr['user']['login'] == 'user0' and pr['state'] == 'closed']
+        self.assertEqual(sum(search_counts['user0'].values()), len(prs))
+        self.assertEqual(self.fake.remaining['search'], self.fake.limits['search'] - self.fake.calls['search'])
+
+    def test_rate_limit_headers(self):
+        self.client.repos('bench-org')
+        self.assertEqual(self.fake.remaining['core'], self.fake.limits['core'] - self.fake.api_calls())
+
+if __name__ == '__main__':
+    unittest.main()
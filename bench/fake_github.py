@@ -0,0 +1,245 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import re, json, time, hashlib, threading
+
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+from synthetic_org import github_date
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.fake.handle(self, 'GET')
+
+    def do_POST(self):
+        self.server.fake.handle(self, 'POST')
+
+# Local stand-in for the GitHub REST and GraphQL endpoints ght calls, serving a
+# SyntheticOrg with pagination, ETags, rate limit headers, and a latency per request
+class FakeGitHub:
+    DEFAULT_PER_PAGE = 30
+    MAX_PER_PAGE = 100
+    ROUTES = [('repos', re.compile(r'^/orgs/(?P<org>[^/]+)/repos$')),
+              ('org', re.compile(r'^/orgs/(?P<org>[^/]+)$')),
+              ('reviews', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/pulls/(?P<number>\d+)/reviews$')),
+              ('pulls', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/pulls$')),
+              ('issues', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/issues$')),
+              ('contributors', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)/stats/contributors$')),
+              ('repo', re.compile(r'^/repos/(?P<repo>[^/]+/[^/]+)$')),
+              ('search', re.compile(r'^/search/issues$'))]
+    # like GitHub, the search quota is per minute and the others per hour
+    WINDOWS = {'core': 3600, 'graphql': 3600, 'search': 60}
+
+    def __init__(self, org, latency=0, rate_limit=100000, search_rate_limit=30):
+        self.org = org
+        self.latency = latency
+        self.limits = {'core': rate_limit, 'graphql': rate_limit, 'search': search_rate_limit}
+        self.remaining = dict(self.limits)
+        self.resets = {resource: int(time.time()) + window for resource, window in self.WINDOWS.items()}
+        self.calls = Counter()
+        self.not_modified = 0
+        self.__lock = threading.Lock()
+        self.server = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGitHubHandler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{port}".format(port=self.server.server_port)
+
+    def api_calls(self):
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        with self.__lock:
+            self.calls = Counter()
+            self.not_modified = 0
+
+    def __repo_json(self, repo):
+        url = "{url}/repos/{full_name}".format(url=self.url, full_name=repo['full_name'])
+        return dict(repo, url=url, owner={'login': self.org.name}, html_url=url)
+
+    def __pr_json(self, repo_name, pr):
+        return dict(pr, url="{url}/repos/{repo}/pulls/{number}".format(url=self.url, repo=repo_name, number=pr['number']))
+
+    def __issue_json(self, repo_name, issue, pr=False):
+        issue = {k: issue[k] for k in ['number', 'user', 'state', 'created_at', 'updated_at']}
+        issue['url'] = "{url}/repos/{repo}/issues/{number}".format(url=self.url, repo=repo_name, number=issue['number'])
+        issue['repository_url'] = "{url}/repos/{repo}".format(url=self.url, repo=repo_name)
+        if pr:
+            issue['pull_request'] = {'url': "{url}/repos/{repo}/pulls/{number}".format(url=self.url, repo=repo_name, number=issue['number'])}
+        return issue
+
+    def __sorted(self, items, query, default_sort='created'):
+        sort = query.get('sort', default_sort)
+        key = 'updated_at' if sort == 'updated' else 'created_at'
+        return sorted(items, key=lambda item: (item[key], item['number']), reverse=query.get('direction', 'desc') == 'desc')
+
+    # supports the org:, repo:, is:, author:, and created: qualifiers
+    def search(self, query):
+        qualifiers = dict([term.split(':', 1) for term in query.get('q', '').split() if ':' in term and not term.startswith('is:')])
+        is_terms = [term[3:] for term in query.get('q', '').split() if term.startswith('is:')]
+        items = []
+        for repo_name in self.org.prs:
+            if qualifiers.get('org', self.org.name) != self.org.name or qualifiers.get('repo', repo_name) != repo_name:
+                continue
+            if 'pr' not in is_terms:
+                items += [self.__issue_json(repo_name, i) for i in self.org.issues[repo_name]]
+            if 'issue' not in is_terms:
+                items += [self.__issue_json(repo_name, pr, True) for pr in self.org.prs[repo_name]]
+        items = [i for i in items if i['state'] in is_terms or not set(['open', 'closed']) & set(is_terms)]
+        if 'author' in qualifiers:
+            items = [i for i in items if i['user']['login'] == qualifiers['author']]
+        if 'created' in qualifiers:
+            start, end = qualifiers['created'].split('..')
+            items = [i for i in items if i['created_at'] >= start and i['created_at'] <= end]
+        return sorted(items, key=lambda i: (i['created_at'], i['repository_url'], i['number']), reverse=True)
+
+    def __state(self, items, query):
+        state = query.get('state', 'open')
+        return [item for item in items if state == 'all' or item['state'] == state]
+
+    # returns (status, body, extra headers)
+    def get(self, path, query):
+        for name, route in self.ROUTES:
+            match = route.match(path)
+            if match == None:
+                continue
+            params = match.groupdict()
+            if 'org' in params and params['org'] != self.org.name:
+                break
+            if 'repo' in params and params['repo'] not in self.org.prs:
+                break
+            if name == 'org':
+                return name, 200, {'login': self.org.name, 'url': "{url}/orgs/{org}".format(url=self.url, org=self.org.name)}, False
+            elif name == 'repos':
+                return name, 200, [self.__repo_json(r) for r in self.org.repos], True
+            elif name == 'repo':
+                return name, 200, self.__repo_json([r for r in self.org.repos if r['full_name'] == params['repo']][0]), False
+            elif name == 'pulls':
+                prs = self.__sorted(self.__state(self.org.prs[params['repo']], query), query)
+                return name, 200, [self.__pr_json(params['repo'], pr) for pr in prs], True
+            elif name == 'reviews':
+                return name, 200, self.org.reviews.get((params['repo'], int(params['number'])), []), True
+            elif name == 'issues':
+                issues = [self.__issue_json(params['repo'], i) for i in self.org.issues[params['repo']]]
+                issues += [self.__issue_json(params['repo'], pr, True) for pr in self.org.prs[params['repo']]]
+                issues = self.__state(issues, query)
+                if 'since' in query:
+                    issues = [i for i in issues if i['updated_at'] >= query['since'][:19] + 'Z']
+                return name, 200, self.__sorted(issues, query), True
+            elif name == 'search':
+                return name, 200, self.search(query), True
+            elif name == 'contributors':
+                return name, 200, self.org.contributors[params['repo']], False
+        return 'unknown', 404, {'message': 'Not Found'}, False
+
+    def __page(self, path, query, items):
+        per_page = min(int(query.get('per_page', self.DEFAULT_PER_PAGE)), self.MAX_PER_PAGE)
+        page = int(query.get('page', 1))
+        last_page = max(1, (len(items) + per_page - 1) // per_page)
+        links = []
+        for rel, number in [('next', page + 1), ('last', last_page)]:
+            if page < last_page:
+                links.append('<{url}{path}?{query}>; rel="{rel}"'.format(url=self.url, path=path, query=urlencode(dict(query, page=number)), rel=rel))
+        headers = {'Link': ', '.join(links)} if links else {}
+        return items[(page - 1)*per_page:page*per_page], headers
+
+    # answers the GraphQL queries of graphql_client.py
+    def graphql(self, request):
+        query, variables = request['query'], request['variables']
+        repo_name = "{owner}/{name}".format(owner=variables['owner'], name=variables['name'])
+        offset = int(variables.get('cursor') or 0)
+        def reviews_page(number, offset):
+            reviews = self.org.reviews.get((repo_name, number), [])
+            nodes = [{'author': r['user'], 'submittedAt': r['submitted_at']} for r in reviews[offset:offset + 100]]
+            return {'pageInfo': {'hasNextPage': offset + 100 < len(reviews), 'endCursor': str(offset + 100)}, 'nodes': nodes}
+        rate_limit = {'cost': 1, 'remaining': self.remaining['graphql'], 'resetAt': github_date(datetime.fromtimestamp(self.resets['graphql'], timezone.utc))}
+        if 'pullRequests(' in query:
+            states = [state.lower() for state in variables.get('states') or ['OPEN', 'CLOSED', 'MERGED']]
+            prs = [pr for pr in self.org.prs.get(repo_name, []) if pr['state'] in states or (pr['state'] == 'closed' and 'merged' in states)]
+            prs = sorted(prs, key=lambda pr: (pr['updated_at'], pr['number']), reverse=True)
+            nodes = [{'number': pr['number'], 'author': pr['user'], 'createdAt': pr['created_at'], 'updatedAt': pr['updated_at'], 'reviews': reviews_page(pr['number'], 0)} for pr in prs[offset:offset + 50]]
+            pull_requests = {'pageInfo': {'hasNextPage': offset + 50 < len(prs), 'endCursor': str(offset + 50)}, 'nodes': nodes}
+            return {'data': {'rateLimit': rate_limit, 'repository': {'pullRequests': pull_requests}}}
+        return {'data': {'rateLimit': rate_limit, 'repository': {'pullRequest': {'reviews': reviews_page(variables['number'], offset)}}}}
+
+    def handle(self, handler, verb):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        url = urlparse(handler.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        headers = {}
+        if verb == 'POST' and url.path == '/graphql':
+            name, resource, status = 'graphql', 'graphql', 200
+            body = self.graphql(json.loads(handler.rfile.read(int(handler.headers.get('Content-Length', 0)))))
+        else:
+            name, status, body, paginated = self.get(url.path, query)
+            resource = 'search' if name == 'search' else 'core'
+            if paginated:
+                total_count = len(body)
+                body, headers = self.__page(url.path, query, body)
+                if name == 'search':
+                    body = {'total_count': total_count, 'incomplete_results': False, 'items': body}
+        data = json.dumps(body).encode('utf-8')
+        etag = '"{digest}"'.format(digest=hashlib.sha1(data).hexdigest())
+        # like GitHub, a conditional request answered with 304 does not use the rate limit
+        not_modified = verb == 'GET' and handler.headers.get('If-None-Match') == etag
+        with self.__lock:
+            self.calls[name] += 1
+            now = int(time.time())
+            if now >= self.resets[resource]:
+                self.remaining[resource] = self.limits[resource]
+                self.resets[resource] = now + self.WINDOWS[resource]
+            exhausted = self.remaining[resource] == 0
+            if not_modified:
+                self.not_modified += 1
+            elif not exhausted:
+                self.remaining[resource] -= 1
+            remaining = self.remaining[resource]
+        headers.update({'ETag': etag, 'X-RateLimit-Limit': str(self.limits[resource]), 'X-RateLimit-Remaining': str(remaining),
+                        'X-RateLimit-Reset': str(self.resets[resource]), 'X-RateLimit-Resource': resource})
+        if not_modified:
+            status, data = 304, b''
+        elif exhausted:
+            status, data = 403, json.dumps({'message': 'API rate limit exceeded'}).encode('utf-8')
+            headers = {k: v for k, v in headers.items() if k.startswith('X-RateLimit')}
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json; charset=utf-8')
+        handler.send_header('Content-Length', str(len(data)))
+        for header, value in headers.items():
+            handler.send_header(header, value)
+        handler.end_headers()
+        handler.wfile.write(data)
@@ -0,0 +1,82 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import random
+
+from datetime import datetime, timedelta, timezone
+
+SIZES = {'small': {'repos': 5, 'prs': 40, 'reviews': 2, 'issues': 20, 'users': 10},
+         'medium': {'repos': 20, 'prs': 200, 'reviews': 3, 'issues': 100, 'users': 30},
+         'large': {'repos': 50, 'prs': 1000, 'reviews': 4, 'issues': 500, 'users': 100}}
+
+def github_date(date):
+    return date.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+# Deterministic GitHub organization of repos with PRs, reviews, issues, and weekly
+# contributors stats spread over one year, the same for a given size, year, and seed
+class SyntheticOrg:
+    def __init__(self, name='bench-org', repos=5, prs=40, reviews=2, issues=20, users=10, year=None, seed=0):
+        self.name = name
+        self.year = year or datetime.now().year
+        self.random = random.Random(seed)
+        self.users = ["user{no}".format(no=no) for no in range(users)]
+        self.repos = []
+        self.prs = {}
+        self.reviews = {}
+        self.issues = {}
+        self.contributors = {}
+        for no in range(repos):
+            self.__add_repo("repo{no}".format(no=no), prs, reviews, issues)
+
+    @classmethod
+    def of_size(cls, size, name='bench-org', year=None, seed=0):
+        return cls(name=name, year=year, seed=seed, **SIZES[size])
+
+    def __date(self, after=None, max_days=None):
+        start = after or datetime(self.year, 1, 1)
+        days = max_days or (datetime(self.year, 12, 31) - start).days
+        return start + timedelta(days=self.random.randint(0, max(0, days)), seconds=self.random.randint(0, 86399))
+
+    def __user(self):
+        return {'login': self.random.choice(self.users)}
+
+    def __add_repo(self, name, prs_count, reviews_count, issues_count):
+        full_name = "{org}/{name}".format(org=self.name, name=name)
+        prs = []
+        for number in range(1, prs_count + 1):
+            created_at = self.__date()
+            updated_at = self.__date(created_at, 30)
+            state = 'closed' if self.random.random() < 0.8 else 'open'
+            prs.append({'number': number, 'user': self.__user(), 'state': state, 'created_at': github_date(created_at), 'updated_at': github_date(updated_at),
+                        'merged_at': github_date(updated_at) if state == 'closed' and self.random.random() < 0.9 else None})
+            self.reviews[(full_name, number)] = [{'id': number*1000 + no, 'user': self.__user(), 'state': 'APPROVED', 'submitted_at': github_date(self.__date(created_at, (updated_at - created_at).days))}
+                                                 for no in range(self.random.randint(0, 2*reviews_count))]
+        issues = []
+        for number in range(prs_count + 1, prs_count + issues_count + 1):
+            created_at = self.__date()
+            issues.append({'number': number, 'user': self.__user(), 'state': 'closed' if self.random.random() < 0.6 else 'open',
+                           'created_at': github_date(created_at), 'updated_at': github_date(self.__date(created_at, 60))})
+        weeks = [int(datetime(self.year, 1, 1, tzinfo=timezone.utc).timestamp()) + no*7*24*3600 for no in range(52)]
+        contributors = []
+        for login in self.users:
+            if self.random.random() < 0.5:
+                continue
+            contributor_weeks = [{'w': w, 'a': self.random.randint(0, 500), 'd': self.random.randint(0, 200), 'c': self.random.randint(0, 5)} for w in weeks]
+            contributors.append({'author': {'login': login}, 'total': sum([w['c'] for w in contributor_weeks]), 'weeks': contributor_weeks})
+        pushed_at = github_date(max([datetime.strptime(pr['updated_at'], '%Y-%m-%dT%H:%M:%SZ') for pr in prs] or [datetime(self.year, 1, 1)]))
+        self.repos.append({'name': name, 'full_name': full_name, 'archived': False, 'fork': False, 'created_at': github_date(datetime(self.year, 1, 1)), 'pushed_at': pushed_at, 'updated_at': pushed_at})
+        self.prs[full_name] = prs
+        self.issues[full_name] = issues
+        self.contributors[full_name] = contributors
@@ -0,0 +1,120 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os, json, time, hashlib, tempfile, threading
+
+# On-disk cache of GitHub API GET responses, one JSON file per URL with the response
+# body and its ETag / Last-Modified validators used to revalidate it
+class HTTPCache:
+    DEFAULT_CACHE_DIR = '~/.ghtrack/cache'
+    DEFAULT_MAX_SIZE = 200*1024*1024
+    DEFAULT_MAX_AGE = 30*24*3600
+    EVICT_EVERY_PUTS = 100
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE, max_age=DEFAULT_MAX_AGE):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.__puts = 0
+        self.__lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.evict()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+            except FileNotFoundError:
+                pass
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # returns the cached entry for key, i.e., {'etag', 'last_modified', 'status', 'headers', 'body'}, or None
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                self._remove(path)
+                return None
+            with open(path) as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        return entry
+
+    # a revalidated entry is fresh again, so its age restarts for eviction
+    def touch(self, key):
+        with self.__lock:
+            self.hits += 1
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def put(self, key, status, headers, body):
+        with self.__lock:
+            self.misses += 1
+        etag = headers.get('etag') or headers.get('ETag')
+        last_modified = headers.get('last-modified') or headers.get('Last-Modified')
+        if etag == None and last_modified == None:
+            return
+        entry = {'key': key, 'etag': etag, 'last_modified': last_modified, 'status': status, 'headers': headers, 'body': body}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(tmp_path, self._path(key))
+        with self.__lock:
+            self.__puts += 1
+            evict = self.__puts % self.EVICT_EVERY_PUTS == 0
+        if evict:
+            self.evict()
+
+    # drops entries older than max_age then least recently used entries until under max_size
+    def evict(self):
+        now = time.time()
+        entries = []
+        for mtime, size, path in self._entries():
+            if now - mtime > self.max_age:
+                self._remove(path)
+            else:
+                entries.append((mtime, size, path))
+        total_size = sum([size for _, size, _ in entries])
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def size(self):
+        return sum([size for _, size, _ in self._entries()])
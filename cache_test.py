@@ -0,0 +1,83 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os, time, shutil, tempfile, unittest
+
+from cache import *
+
+class TestHTTPCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = HTTPCache(self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def __age(self, key, seconds):
+        path = self.cache._path(key)
+        old_time = time.time() - seconds
+        os.utime(path, (old_time, old_time))
+
+    def test_put_get(self):
+        self.cache.put('fake-url', 200, {'etag': '"abc"', 'link': 'next'}, '{"name": "fake"}')
+        entry = self.cache.get('fake-url')
+        self.assertEqual(entry['etag'], '"abc"')
+        self.assertEqual(entry['last_modified'], None)
+        self.assertEqual(entry['headers']['link'], 'next')
+        self.assertEqual(entry['body'], '{"name": "fake"}')
+        self.assertEqual(self.cache.get('other-fake-url'), None)
+
+    def test_put_without_validators(self):
+        self.cache.put('fake-url', 200, {'link': 'next'}, '{}')
+        self.assertEqual(self.cache.get('fake-url'), None)
+
+    def test_get_expired(self):
+        self.cache.put('fake-url', 200, {'last-modified': 'Wed, 01 Jul 2020 00:00:00 GMT'}, '{}')
+        self.__age('fake-url', self.cache.max_age + 1)
+        self.assertEqual(self.cache.get('fake-url'), None)
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_touch(self):
+        self.cache.put('fake-url', 200, {'etag': '"abc"'}, '{}')
+        self.__age('fake-url', self.cache.max_age - 1)
+        self.cache.touch('fake-url')
+        self.assertEqual(self.cache.hits, 1)
+        self.__age('fake-url', 1)
+        self.assertTrue(self.cache.get('fake-url') != None)
+
+    def test_evict_age(self):
+        self.cache.put('fake-url0', 200, {'etag': '"0"'}, '{}')
+        self.cache.put('fake-url1', 200, {'etag': '"1"'}, '{}')
+        self.__age('fake-url0', self.cache.max_age + 1)
+        self.cache.evict()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.assertTrue(self.cache.get('fake-url1') != None)
+
+    def test_evict_size(self):
+        for no in range(3):
+            self.cache.put("fake-url{no}".format(no=no), 200, {'etag': '"{no}"'.format(no=no)}, 'x'*100)
+            self.__age("fake-url{no}".format(no=no), 10 - no)
+        self.cache.max_size = 2*os.path.getsize(self.cache._path('fake-url0'))
+        self.cache.evict()
+        self.assertEqual(self.cache.get('fake-url0'), None)
+        self.assertTrue(self.cache.get('fake-url1') != None)
+        self.assertTrue(self.cache.get('fake-url2') != None)
+
+    def test_clear(self):
+        self.cache.put('fake-url', 200, {'etag': '"abc"'}, '{}')
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, json, time, hashlib, tempfile, threading
+
+from common import *
+
+# Completed units of a command, e.g., the reviews counts of one repo, saved atomically to a JSON file
+# so that --resume skips them after a crash, a Ctrl-C, or an expired access token; {request} in the path is
+# replaced by a hash of the request, so that concurrent commands each have their own file
+class Checkpoint:
+    DEFAULT_CHECKPOINT = '~/.ghtrack/checkpoint-{request}.json'
+    SAVE_EVERY = 5
+    def __init__(self, path, request, clock=time.time):
+        self.path = os.path.expanduser(path.replace('{request}', self.request_hash(request)))
+        self.request = request
+        self.clock = clock
+        self.units = {}
+        self.__saved_at = None
+        self.__lock = threading.Lock()
+        if os.path.dirname(self.path) != '':
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    @staticmethod
+    def request_hash(request):
+        return hashlib.sha1(json.dumps(request, sort_keys=True).encode()).hexdigest()[:12]
+
+    def _key(self, data, unit):
+        return "{data}/{unit}".format(data=data, unit=unit)
+
+    # loads the units saved by the same request, and returns how many
+    def load(self):
+        try:
+            with open(self.path) as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            Console.warn("ignoring checkpoint: '{path}' that could not be read: {message}".format(path=self.path, message=e.__str__()))
+            return 0
+        if state.get('request') != self.request:
+            Console.warn("ignoring checkpoint: '{path}' of another command".format(path=self.path))
+            return 0
+        with self.__lock:
+            self.units = state.get('units', {})
+            return len(self.units)
+
+    def get(self, data, unit):
+        with self.__lock:
+            return self.units.get(self._key(data, unit))
+
+    # saved at most every SAVE_EVERY seconds, so a crash loses only the units completed since
+    def put(self, data, unit, result):
+        with self.__lock:
+            self.units[self._key(data, unit)] = result
+            save = self.__saved_at == None or self.clock() - self.__saved_at >= self.SAVE_EVERY
+        if save:
+            self.save()
+
+    # written to a temporary file then renamed, so the checkpoint is never torn
+    def save(self):
+        with self.__lock:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'w') as checkpoint_file:
+                json.dump({'request': self.request, 'units': self.units}, checkpoint_file)
+            os.replace(tmp_path, self.path)
+            self.__saved_at = self.clock()
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
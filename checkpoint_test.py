@@ -0,0 +1,82 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, sys, tempfile, unittest
+
+from io import StringIO
+
+from checkpoint import *
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.backup_out = sys.stdout
+        sys.stdout = StringIO()
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'state', 'checkpoint.json')
+        self.now = 1000
+        self.request = {'command': 'reviews', 'org': 'fake-org', 'users': ['user0', 'user1']}
+        self.checkpoint = Checkpoint(self.path, self.request, lambda: self.now)
+
+    def tearDown(self):
+        self.dir.cleanup()
+        sys.stdout = self.backup_out
+
+    def test_put_load(self):
+        self.checkpoint.put('reviews', 'repo0', {'user0': 1, 'user1': 0})
+        checkpoint = Checkpoint(self.path, self.request)
+        self.assertEqual(checkpoint.load(), 1)
+        self.assertEqual(checkpoint.get('reviews', 'repo0'), {'user0': 1, 'user1': 0})
+        self.assertEqual(checkpoint.get('reviews', 'repo1'), None)
+        self.assertEqual(checkpoint.get('prs', 'repo0'), None)
+
+    def test_save_every(self):
+        self.checkpoint.put('reviews', 'repo0', {'user0': 1})
+        self.checkpoint.put('reviews', 'repo1', {'user0': 2})
+        self.assertEqual(Checkpoint(self.path, self.request).load(), 1)
+        self.now += Checkpoint.SAVE_EVERY
+        self.checkpoint.put('reviews', 'repo2', {'user0': 3})
+        self.assertEqual(Checkpoint(self.path, self.request).load(), 3)
+
+    def test_other_request(self):
+        self.checkpoint.save()
+        checkpoint = Checkpoint(self.path, dict(self.request, org='other-org'))
+        self.assertEqual(checkpoint.load(), 0)
+        self.assertIn('another command', sys.stdout.getvalue())
+
+    def test_torn_file(self):
+        with open(self.path, 'w') as checkpoint_file:
+            checkpoint_file.write('{"request": ')
+        self.assertEqual(self.checkpoint.load(), 0)
+
+    def test_atomic_save(self):
+        self.checkpoint.put('reviews', 'repo0', {'user0': 1})
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['checkpoint.json'])
+
+    def test_remove(self):
+        self.checkpoint.save()
+        self.checkpoint.remove()
+        self.assertFalse(os.path.exists(self.path))
+        self.checkpoint.remove()
+        self.assertEqual(Checkpoint(self.path, self.request).load(), 0)
+
+    def test_request_path(self):
+        path = os.path.join(self.dir.name, 'checkpoint-{request}.json')
+        checkpoint = Checkpoint(path, self.request)
+        self.assertEqual(checkpoint.path, os.path.join(self.dir.name, 'checkpoint-{hash}.json'.format(hash=Checkpoint.request_hash(self.request))))
+        self.assertEqual(Checkpoint(path, dict(self.request)).path, checkpoint.path)
+        self.assertNotEqual(Checkpoint(path, dict(self.request, org='other-org')).path, checkpoint.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,13 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import io, sys, yaml, json, csv, os.path
+import io, sys, time, heapq, threading, yaml, json, csv, os.path
 
-from datetime import datetime
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
 from calendar import monthrange
 from tabulate import tabulate
 
 from client import GHClient
+from graphql_client import GHGraphQLClient, graphql_url
+from async_client import AsyncGHClient, API_URL
+from git_client import GHGitClient, GitMirrors
+from cache import HTTPCache
+from store import EventStore, StoreClient
+from planner import Planner
+from checkpoint import Checkpoint
+from memo import ResultsMemo
+from periods import PERIODS, period_keys
+from activity import ActivityFilter, ACTIVITY_RULES, DEFAULT_ACTIVITY_RULES
+from writers import StreamWriter
 
 from common import *
 
@@ -46,6 +59,20 @@ class Credentials:
             access_token = self.hash['gh_access_token']
         return access_token
 
+    def __gh_access_tokens_from_environment(self):
+        return [token.strip() for token in os.getenv('GH_ACCESS_TOKENS', '').split(',') if token.strip() != '']
+
+    # the access token followed by the GH_ACCESS_TOKENS or gh_access_tokens ones, without duplicates
+    def access_tokens(self):
+        tokens = self.__gh_access_tokens_from_environment()
+        if len(tokens) == 0:
+            tokens = self.hash.get('gh_access_tokens') or []
+        access_tokens = []
+        for token in [self.access_token()] + list(tokens):
+            if token and str(token) not in access_tokens:
+                access_tokens.append(str(token))
+        return access_tokens
+
 class CLI:
     def __init__(self, args):
         self.args = args
@@ -66,9 +93,33 @@ class CLI:
             self.args['--access-token'] = credentials_hash['gh_access_token']
         return Credentials(credentials_hash)
 
+    def __create_cache(self):
+        if self.args.get('--no-cache') or not self.args.get('--cache-dir'):
+            return None
+        try:
+            return HTTPCache(self.args['--cache-dir'])
+        except OSError as e:
+            Console.warn("disabling cache, could not open --cache-dir '{cache_dir}': {message}".format(cache_dir=self.args['--cache-dir'], message=e.__str__()))
+        return None
+
+    def __create_client(self):
+        if self.args.get('--offline'):
+            return StoreClient(EventStore(self.args['--store']))
+        cache = self.__create_cache()
+        api_url = self.args.get('--api-url') or API_URL
+        # --strategy=auto may pick GraphQL for the reviews of large repos
+        if self.args.get('--backend') == 'graphql' or (self.args.get('--backend') in [None, 'rest'] and self.args.get('--strategy') == 'auto'):
+            return GHGraphQLClient(self.credentials.access_token(), graphql_url=graphql_url(api_url), cache=cache, base_url=api_url)
+        if self.args.get('--backend') == 'async':
+            return AsyncGHClient(self.credentials.access_token(), api_url)
+        if self.args.get('--backend') == 'git':
+            mirrors = GitMirrors(self.args.get('--mirrors-dir') or GitMirrors.DEFAULT_MIRRORS_DIR, self.credentials.access_token())
+            return GHGitClient(self.credentials.access_token(), mirrors, cache=cache, base_url=api_url)
+        return GHClient(self.credentials.access_token(), cache=cache, base_url=api_url)
+
     def command(self, client=None):
         if client == None:
-            client = GHClient(self.credentials.access_token())
+            client = self.__create_client()
         if self.args.get('commits') and self.args['commits']:
             return Commits(self.args, self.credentials, client)
         elif self.args.get('reviews') and self.args['reviews']:
@@ -79,6 +130,10 @@ class CLI:
             return Issues(self.args, self.credentials, client)
         elif self.args.get('stats') and self.args['stats']:
             return Stats(self.args, self.credentials, client)
+        elif self.args.get('sync') and self.args['sync']:
+            return Sync(self.args, self.credentials, client)
+        elif self.args.get('invalidate') and self.args['invalidate']:
+            return Invalidate(self.args, self.credentials, client)
         else:
             raise Exception("Invalid command")
 
@@ -92,7 +147,26 @@ class Command:
     OUTPUT_JSON = ['json', 'jsn', 'JSON', 'JSN']
     OUTPUT_YAML = ['yaml', 'yml', 'YAML', 'YML']
     OUTPUT_CSV = ['csv', 'CSV']
+    OUTPUT_JSONL = ['jsonl', 'JSONL']
+    BACKENDS = ['rest', 'graphql', 'async', 'git']
+    # default --workers of the backends whose requests are cheap to have in flight together, 1 for the others
+    BACKEND_WORKERS = {'async': 16}
+    STRATEGIES = ['list', 'search', 'auto']
     SECONDS_MULIPLIER = {'s':1, 'm':60, 'h':3600, 'd':24*3600}
+    DATE_FORMAT = '%Y-%m-%d'
+    # seconds before retrying a repo whose stats GitHub is computing, doubled on each retry
+    STATS_RETRY_BACKOFF = 2
+    STATS_RETRIES = 6
+    # --churn lines counted with the commits
+    CHURN_DATA = ['additions', 'deletions', 'net']
+    # the --active-rules 'pushed' rule only applies to the data a push changes, since issues, reviews, and PRs
+    # opened from forks do not change the repo pushed_at
+    PUSHED_DATA = ['commits'] + CHURN_DATA
+    # reviews are not memoized since they are counted by the current state of their PRs
+    MEMOIZED_DATA = ['commits', 'prs', 'issues'] + CHURN_DATA
+    # prs and issues are counted by their current state, so only their closed counts are memoized: open counts of a past
+    # month drop as soon as its items are closed, while closed counts only miss items of the month closed after the memo
+    MEMOIZED_STATES = {'prs': ['closed'], 'issues': ['closed']}
     def __init__(self, args, credentials, client):
         self.__init_empty_options(args)
         self.args = args
@@ -100,9 +174,21 @@ class Command:
         self.client = client
         self.rate_limit_data = self._init_rate_limit_data()
         self.client.set_rate_limit_data(self.rate_limit_data)
+        self.client.set_adaptive_rate_limiter(self._init_adaptive_rate_limiter())
+        self.client.set_workers(self.workers())
+        self.client.set_period(self.period())
         self.repos_stats = self._init_repos_stats()
         self.summary_stats = self._init_summary_stats()
         self.__month_number = 0
+        self.__planner = None
+        self.__checkpoint = None
+        self.__checkpoint_lock = threading.Lock()
+        self.__memo = None
+        self.__tracked_repos = None
+        self.__pushed_repos = None
+        self.__churn_counts = {}
+        self.__stream_writer = None
+        self.__streamed_data = set()
 
     def __init_empty_options(self, args):
         for option in self.BOOL_OPTIONS:
@@ -124,34 +210,43 @@ class Command:
         map['request']['year'] = self.year()
         map['request']['month'] = self.month()
         map['request']['data'] = data_name
+        if self.since():
+            map['request']['since'] = self.since()
+            map['request']['until'] = self.until()
+        if self.period():
+            map['request']['period'] = self.period()
+
+    # the position of each repo of the output, i.e., --repos without --skip-repos, so that tables are
+    # built from the counted repos of each user in that order instead of scanning all repos for each user
+    def _repos_index(self):
+        skip_repos = set(self.skip_repos())
+        return {repo: position for position, repo in enumerate([repo for repo in self.repos() if repo not in skip_repos])}
 
     def _init_users_stats(self, users_stats):
+        repos_index = self._repos_index()
         for user in self.users():
             users_stats[user] = {}
-            for repo in self.repos():
-                if repo not in self.skip_repos():
-                    users_stats[user][repo] = 0
+            for repo in repos_index:
+                users_stats[user][repo] = {} if self.period() else 0
 
     def _init_repos_stats(self):
         repo_stats = {} #{'repo_name': {'commits': 0, 'prs': 0, 'reviews': 0, 'issues': 0},  ...}
-        for repo in self.repos():
-            if repo not in self.skip_repos():
-                repo_stats[repo] = {}
-                repo_stats[repo]['commits'] = 0
-                repo_stats[repo]['prs'] = 0
-                repo_stats[repo]['reviews'] = 0
-                repo_stats[repo]['issues'] = 0
+        for repo in self._repos_index():
+            repo_stats[repo] = {}
+            repo_stats[repo]['commits'] = 0
+            repo_stats[repo]['prs'] = 0
+            repo_stats[repo]['reviews'] = 0
+            repo_stats[repo]['issues'] = 0
+            for data in self.churn_data():
+                repo_stats[repo][data] = 0
         return repo_stats
 
     def _init_summary_stats(self):
-        data = ['commits', 'prs', 'issues', 'reviews']
+        data = ['commits', 'prs', 'issues', 'reviews'] + self.churn_data()
+        repos_index = self._repos_index()
         summary_stats = {} #{'commits': {'repo0': 0, 'repo1': 0, ...},{'reviews': {'repo0': 0, ...},...}
         for item in data:
-            repo_stats = {}
-            for repo in self.repos():
-                if repo not in self.skip_repos():
-                    repo_stats[repo] = 0
-            summary_stats[item] = repo_stats
+            summary_stats[item] = {repo: 0 for repo in repos_index}
         return summary_stats
 
     def _init_rate_limit_data(self):
@@ -176,17 +271,30 @@ class Command:
 
         return rate_limit_data
 
+    # GitHub rate limit headers pace API calls unless a fixed --rate-limit is set, and always pace searches, including
+    # the ones --strategy=auto plans, since the Search API quota is only 30 calls per minute; several access tokens
+    # are always pooled, also with a fixed --rate-limit, which then paces the calls of all tokens
+    def _init_adaptive_rate_limiter(self):
+        access_tokens = self.credentials.access_tokens()
+        if len(access_tokens) > 1:
+            return TokenPool(access_tokens)
+        if self.rate_limit_data.enabled() and self.strategy() not in ['search', 'auto']:
+            return None
+        return AdaptiveRateLimiter()
+
     # returns --rl-sleep value in seconds, so 1h == 3600
     def _parse_rl_sleep(self):
-        sleep_seconds = 0
-        rl_sleep = self.rl_sleep()
+        return self._parse_seconds(self.rl_sleep(), '--rl-sleep')
+
+    def _parse_seconds(self, duration, option):
+        seconds = 0
         try:
-            unit = rl_sleep[len(rl_sleep)-1:]
-            value = int(rl_sleep[0:len(rl_sleep)-1])
-            sleep_seconds = self.SECONDS_MULIPLIER[unit.lower()]*value
+            unit = duration[len(duration)-1:]
+            value = int(duration[0:len(duration)-1])
+            seconds = self.SECONDS_MULIPLIER[unit.lower()]*value
         except:
-            Console.warn("Error parsing --rl-sleep value '{rl_sleep}".format(rl_sleep=self.rl_sleep()))
-        return sleep_seconds
+            Console.warn("Error parsing {option} value '{duration}".format(option=option, duration=duration))
+        return seconds
 
     def _write_map_as_csv(self, output_stream, output_map):
         writer = csv.DictWriter(output_stream, output_map.keys())
@@ -198,42 +306,76 @@ class Command:
         for item in output_list:
             writer.writerow(item)
 
+    def _user_repo_headers(self):
+        if self.period():
+            return ['user', 'repo', 'data', self.period(), 'count']
+        return ['user', 'repo', 'data', 'count']
+
+    # the rows of the count of user in repo, none when 0 unless --show-all-stats, with --period one per period
+    def _user_repo_rows(self, request_data, user, repo, count):
+        if self._total(count) == 0 and not self.show_all_stats():
+            return []
+        if not self.period():
+            return [[user, repo, request_data, count]]
+        rows = []
+        for key in self.period_keys():
+            period_count = count.get(key, 0) if isinstance(count, dict) else 0
+            if period_count == 0 and not self.show_all_stats():
+                continue
+            rows.append([user, repo, request_data, key, period_count])
+        return rows
+
     def _extract_user_repo_data(self, request_data, users_repos_map):
-        users_repos_data = []
-        data_headers = ['user', 'repo', 'data', 'count']
-        users_repos_data.append(data_headers)
-        for user in self.users():
-            for repo in self.repos():
-                if repo not in self.skip_repos():
-                    users_repos_data_count = 0
-                    if repo in users_repos_map[user]:
-                        users_repos_data_count = users_repos_map[user][repo]
-                        if users_repos_data_count == 0 and not self.show_all_stats():
-                            continue
-                        users_repos_data.append([user, repo, request_data, users_repos_data_count])
+        users_repos_data = [self._user_repo_headers()]
+        repos_index = self._repos_index()
+        for user in self._map_users(users_repos_map):
+            user_repos = sorted([repo for repo in users_repos_map[user] if repo in repos_index], key=repos_index.get)
+            for repo in user_repos:
+                users_repos_data.extend(self._user_repo_rows(request_data, user, repo, users_repos_map[user][repo]))
         return users_repos_data
 
+    # with --output=csv or jsonl and a --file, the rows are written as each repo is counted
+    def stream_writer(self):
+        if self.__stream_writer == None and self.output() in self.OUTPUT_CSV + self.OUTPUT_JSONL and self.file():
+            self.__stream_writer = StreamWriter.open(self.file(), 'csv' if self.output() in self.OUTPUT_CSV else 'jsonl')
+        return self.__stream_writer
+
+    def _start_stream(self, users_map):
+        writer = self.stream_writer()
+        if writer != None and users_map['request']['data'] not in self.__streamed_data:
+            self.__streamed_data.add(users_map['request']['data'])
+            writer.start(users_map['request'], self._user_repo_headers())
+
+    def _stream_counts(self, users_map, repo_name, users, users_counts):
+        writer = self.stream_writer()
+        if writer == None:
+            return
+        rows = []
+        for user in users:
+            rows.extend(self._user_repo_rows(users_map['request']['data'], user, repo_name, users_counts.get(user, 0)))
+        writer.write_rows(rows)
+
+    def _close_stream_writer(self):
+        if self.__stream_writer != None:
+            self.__stream_writer.close()
+
     def _extract_repos_stats_table(self):
         header = ['repo', 'data', 'total']
         table = []
-        for repo in self.repos():
-            if repo not in self.skip_repos():
-                repo_stats = self.repos_stats[repo]
-                for item in repo_stats:
-                    row = [repo, item, repo_stats[item]]
-                    table.append(row)
+        for repo in self._repos_index():
+            for item, total in self.repos_stats[repo].items():
+                table.append([repo, item, total])
         return (header, table)
 
+    # one row per data and repo
     def _extract_summary_stats_table(self):
         header = ['data', 'repo', 'total']
         table = []
-        for data in self.summary_stats.keys():
-            data_stats = self.summary_stats[data]
-            for repo in self.repos():
-                if repo not in self.skip_repos():
-                    for item in data_stats:
-                        row = [data, repo, data_stats[item]]
-                        table.append(row)
+        repos_index = self._repos_index()
+        for data, data_stats in self.summary_stats.items():
+            for repo in repos_index:
+                if repo in data_stats:
+                    table.append([data, repo, data_stats[repo]])
         return (header, table)
 
     def _print_summarize_output(self):
@@ -243,6 +385,9 @@ class Command:
         elif self.output() in self.OUTPUT_YAML:
             self._print_output_yml(self.repos_stats)
             self._print_output_yml(self.summary_stats)
+        elif self.output() in self.OUTPUT_CSV + self.OUTPUT_JSONL and self.stream_writer() != None:
+            self.stream_writer().write_table(*self._extract_repos_stats_table())
+            self.stream_writer().write_table(*self._extract_summary_stats_table())
         elif self.output() in self.OUTPUT_CSV:
             self._print_summarize_output_cvs()
         else:
@@ -271,8 +416,12 @@ class Command:
     def _print_output_text(self, output_map):        
         Console.println()
         request_headers = ['org', 'year', 'month', 'data', 'state']
+        if self.since():
+            request_headers = ['org', 'since', 'until', 'data', 'state']
+        if self.period():
+            request_headers.append('period')
         r = output_map['request']
-        print(tabulate([[r['org'], r['year'], r['month'], r['data'], r['state']]], headers=request_headers))
+        print(tabulate([[r[header] for header in request_headers]], headers=request_headers))
         
         Console.println()
         users_repos_data = self._extract_user_repo_data(output_map['request']['data'], output_map)
@@ -298,6 +447,7 @@ class Command:
                 yml_file.write('\n')
                 yaml.dump(output_map, yml_file, default_flow_style=False)
 
+    # with a --file the rows were streamed as each repo was counted
     def _print_output_csv(self, output_map):
         request_map = output_map['request']
         Console.println()
@@ -308,113 +458,456 @@ class Command:
             self._write_list_as_csv(output_stream, users_repos_data)
             Console.print(output_stream.getvalue())
         else:
-            with open(self.file(), 'a', newline='') as csv_file:
-                csv_file.write('\n')
-                self._write_map_as_csv(csv_file, request_map)
-                csv_file.write('\n')
-                users_repos_data = self._extract_user_repo_data(output_map['request']['data'], output_map)
-                self._write_list_as_csv(csv_file, users_repos_data)
+            self._start_stream(output_map)
+
+    # one JSON object per row, e.g., {"count": 1, "data": "prs", "org": ..., "repo": ..., "user": ...}
+    def _print_output_jsonl(self, output_map):
+        Console.println()
+        if self.file() == None or self.file() == '':
+            output_stream = io.StringIO()
+            writer = StreamWriter(output_stream, 'jsonl', close=False)
+            writer.start(output_map['request'], self._user_repo_headers())
+            writer.write_rows(self._extract_user_repo_data(output_map['request']['data'], output_map)[1:])
+            Console.print(output_stream.getvalue())
+        else:
+            self._start_stream(output_map)
 
     # data is one of 'commits', 'prs', 'reviews', 'issues'
     # data_map is map {'user0': {'repo0': count0, 'repo1': count1, ...}, {...}}
-    # output: {'repo0': {'commits': total0, 'issues': total1, ...}, {...}}
-    def _update_repo_stats(self, data, data_map):
-        for user in self.users():
-            user_data_map = data_map[user]
-            for repo_name in user_data_map:
-                if repo_name in self.repos_stats:
-                    self.repos_stats[repo_name][data] += user_data_map[repo_name]
-                else:
-                    self.repos_stats[repo_name][data] = user_data_map[repo_name]
-                if self.repos_stats[repo_name][data] == 0 and not self.show_all_stats():
-                    del(self.repos_stats[repo_name][data])
+    # the totals of each repo are summed once, from the counted repos of each user, into repos_stats and summary_stats
+    def _update_stats(self, data, data_map):
+        repos_totals = Counter()
+        for user in self._map_users(data_map):
+            for repo_name, count in data_map[user].items():
+                repos_totals[repo_name] += self._total(count)
+        self._update_repo_stats(data, repos_totals)
+        self._update_summary_stats(data, repos_totals)
 
+    # output: {'repo0': {'commits': total0, 'issues': total1, ...}, {...}}
+    def _update_repo_stats(self, data, repos_totals):
+        for repo_name, total in repos_totals.items():
+            repo_stats = self.repos_stats.setdefault(repo_name, {})
+            repo_stats[data] = repo_stats.get(data, 0) + total
+        if not self.show_all_stats():
+            for repo_name in self.repos_stats:
+                if self.repos_stats[repo_name].get(data, 0) == 0:
+                    self.repos_stats[repo_name].pop(data, None)
 
-    # data is one of 'commits', 'prs', 'reviews', 'issues'
-    # data_map is map {'user0': {'repo0': count0, 'repo1': count1, ...}, {...}}
     # output: {'commits': {'repo0': total0, 'repo1': total1, ...}, {...}}
-    def _update_summary_stats(self, data, data_map):
-        for user in self.users():
-            user_data_map = data_map[user]
-            for repo_name in user_data_map:
-                if repo_name in user_data_map:
-                    self.summary_stats[data][repo_name] += user_data_map[repo_name]
-                else:
-                    self.summary_stats[data][repo_name] = user_data_map[repo_name]
-                if self.repos_stats[repo_name][data] == 0 and not self.show_all_stats():
-                    del(self.repos_stats[repo_name][data])
+    def _update_summary_stats(self, data, repos_totals):
+        data_stats = self.summary_stats[data]
+        for repo_name, total in repos_totals.items():
+            data_stats[repo_name] = data_stats.get(repo_name, 0) + total
 
-    def _update_users_issues(self):
-        repos = self.client.repos(self.org())
-        totalReposCount = repos.totalCount
-        for user in self.users():
-            Console.print("Getting 'issues' for '{user}' in organization: '{org}'".format(user=user, org=self.org()))
-            count = 1
+    # data is one of 'commits', 'prs', 'reviews', 'issues'
+    # users_map is map {'user0': {'repo0': count0, 'repo1': count1, ...}, {...}}
+    # counts_func(repo, users) returns {'user0': count0, 'user1': count1, ...} for users of one repo
+    # and is called for up to --workers repos in parallel, results are merged in this thread
+    # prs and issues, i.e., the search_kind 'pr' or 'issue', can also be counted by searching
+    def _update_users_data(self, data, users_map, counts_func, search_kind=None):
+        if len(self.users()) == 0 and not self.all_users():
+            return
+        repos = self._data_repos(data)
+        Console.print("Getting '{data}' for {users} in organization: '{org}'".format(data=data, users=self.users_description(), org=self.org()))
+        self._start_stream(users_map)
+        if self.all_users():
+            self._update_all_users_data(data, users_map, counts_func, repos)
+            Console.println()
+            self._update_stats(data, users_map)
+            return
+        search_func, counts_func = self._count_funcs(data, repos, counts_func, search_kind)
+        memoized = self._memoized(data, repos)
+        listed_users, searched = self._search_users(data, repos, memoized, search_func)
+        repos_users = self._repos_users(repos, listed_users, memoized)
+        for repo_name, users_counts in memoized.items():
+            self._update_users_map(users_map, repo_name, list(users_counts), users_counts)
+        listed = {}
+        # each repo is merged, and streamed, as soon as it is counted
+        def merge_listed(repo, counts):
+            listed[repo.name] = {user: counts.get(user, 0) for user in repos_users[repo.name][1]}
+            self._update_users_map(users_map, repo.name, list(listed[repo.name]), listed[repo.name])
+        counted = self._count_repos(data, [(repo, lambda repo=repo, repo_users=repo_users: counts_func(repo, repo_users)) for repo, repo_users in repos_users.values()], merge_listed)
+        # repos left out are not shown as zeros
+        for repo_name in repos_users.keys() - counted.keys():
+            for user in repos_users[repo_name][1]:
+                users_map[user].pop(repo_name, None)
+        self._merge_searched(users_map, repos, searched, listed)
+        self._memoize(data, listed)
+        Console.println()
+        self._update_stats(data, users_map)
+
+    # returns (search_func, counts_func) of the --strategy plan, search_func is None when no org search is made
+    def _count_funcs(self, data, repos, counts_func, search_kind):
+        plan = self._plan(data, repos)
+        if plan != None:
+            search_func = self._search_func(search_kind) if plan.org_search else None
+            return search_func, self._planned_counts_func(plan, search_kind, counts_func)
+        if self.strategy() == 'search' and search_kind != None:
+            return self._search_func(search_kind), counts_func
+        return None, counts_func
+
+    # users memoized in every repo are neither searched nor listed; search_func(users) returns
+    # {user: {repo_name: count}} for the users it could count across all repos at once
+    # returns (users still to list, searched)
+    def _search_users(self, data, repos, memoized, search_func):
+        users = [user for user in self.users() if not all([user in memoized.get(repo.name, {}) for repo in repos])]
+        if search_func == None or len(users) == 0:
+            return users, {}
+        searched = self._checkpointed(data, ':search', lambda: search_func(users))
+        return [user for user in users if user not in searched], searched
+
+    # returns {repo_name: (repo, users)} of the users to list in each repo, i.e., not memoized in it
+    def _repos_users(self, repos, users, memoized):
+        repos_users = {}
+        for repo in repos:
+            repo_users = [user for user in users if user not in memoized.get(repo.name, {})]
+            if len(repo_users) > 0:
+                repos_users[repo.name] = (repo, repo_users)
+        return repos_users
+
+    # the searched counts are merged, and memoized with listed, in every repo
+    def _merge_searched(self, users_map, repos, searched, listed):
+        for user, repos_counts in searched.items():
             for repo in repos:
-                Console.progress(count, totalReposCount, status="processing repos".format(name=repo.name))
-                if repo.name in self.repos() and repo.name not in self.skip_repos():
-                    issues_count = self.client.issues_count(repo, user, self.start_date(), self.end_date(), self.state())
-                    if issues_count == 0 and not self.show_all_stats():
-                            continue
-                    self.users_issues[user][repo.name] = issues_count
-                count += 1
+                self._update_users_map(users_map, repo.name, [user], {user: repos_counts.get(repo.name, 0)})
+                listed.setdefault(repo.name, {})[user] = repos_counts.get(repo.name, 0)
+
+    # --all-users counts every author seen in one listing of each repo, i.e., with the API calls of the list
+    # strategy for named users, then keeps the --top authors by total count, picked with a heap, in that order;
+    # rows are only streamed as each repo is counted without --top
+    def _update_all_users_data(self, data, users_map, counts_func, repos):
+        stream = self.top() == None
+        stream_counts = lambda repo, counts: self._stream_counts(users_map, repo.name, list(counts), counts)
+        listed = self._count_repos(data, [(repo, lambda repo=repo: counts_func(repo, None)) for repo in repos], stream_counts if stream else None)
+        totals = Counter()
+        for repo in repos:
+            for user, count in listed.get(repo.name, {}).items():
+                totals[user] += self._total(count)
+        top_users = [user for user, _ in heapq.nlargest(self.top() or len(totals), totals.items(), key=lambda item: item[1])]
+        for user in top_users:
+            users_map[user] = {}
+        for repo_name, users_counts in listed.items():
+            self._update_users_map(users_map, repo_name, top_users, users_counts, not stream)
+
+    # repos_counts is [(repo, count_func)], count_func() is called for up to --workers repos in parallel and
+    # returns {repo_name: count_func() result}, each also passed to counted(repo, result) in this thread once counted;
+    # repos whose stats GitHub is still computing are retried with backoff while the other repos are counted,
+    # and are left out with a warning if never computed
+    def _count_repos(self, data, repos_counts, counted=None):
+        results, futures, deferred, failed = {}, {}, [], 0
+        executor = ThreadPoolExecutor(max_workers=self.workers())
+        submit = lambda repo, count_func: executor.submit(self._checkpointed, data, repo.name, count_func)
+        try:
+            for index, (repo, count_func) in enumerate(repos_counts):
+                futures[submit(repo, count_func)] = (index, repo, count_func, 0)
+            while len(futures) > 0 or len(deferred) > 0:
+                self._submit_deferred(deferred, futures, submit)
+                timeout = max(0, deferred[0][0] - time.time()) if len(deferred) > 0 else None
+                if len(futures) == 0:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    failed += self._collect_count(data, future, futures.pop(future), results, deferred, counted)
+                    Console.progress(len(results) + failed, len(repos_counts), status="processing repos")
+        except BaseException:
+            # on errors, or Ctrl-C, the repos not yet counted are cancelled rather than waited for
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=False)
+        return results
+
+    # the deferred repos due for a retry are submitted again
+    def _submit_deferred(self, deferred, futures, submit):
+        while len(deferred) > 0 and deferred[0][0] <= time.time():
+            _, index, repo, count_func, retries = heapq.heappop(deferred)
+            futures[submit(repo, count_func)] = (index, repo, count_func, retries)
+
+    # saves the result of a done future in results, or defers the repo to retry it with backoff while
+    # GitHub is computing its stats, returns 1 when the repo failed after the retries else 0
+    def _collect_count(self, data, future, task, results, deferred, counted):
+        index, repo, count_func, retries = task
+        try:
+            results[repo.name] = future.result()
+            if counted != None:
+                counted(repo, results[repo.name])
+        except StatsComputingException as e:
+            if retries < self.STATS_RETRIES:
+                retry_at = time.time() + self.STATS_RETRY_BACKOFF * 2 ** retries
+                heapq.heappush(deferred, (retry_at, index, repo, count_func, retries + 1))
+                return 0
             Console.println()
-        self._update_repo_stats('issues', self.users_issues)
-        self._update_summary_stats('issues', self.users_issues)
+            self.warn("{message} after {retries} retries, not counting '{data}' of repo: '{repo}'".format(message=e, retries=retries, data=data, repo=repo.name))
+            return 1
+        return 0
+
+    # the users of users_map, i.e., --users or with --all-users the authors counted
+    def _map_users(self, users_map):
+        return [user for user in users_map if user != 'request']
+
+    # with --period counts are {period_key: count} of every period, e.g., {'2020-07': 2, '2020-08': 0}
+    def _update_users_map(self, users_map, repo_name, users, users_counts, stream=True):
+        for user in users:
+            user_count = users_counts.get(user, 0)
+            if self._total(user_count) == 0 and not self.show_all_stats():
+                continue
+            if self.period():
+                user_count = {key: user_count.get(key, 0) if isinstance(user_count, dict) else 0 for key in self.period_keys()}
+            users_map[user][repo_name] = user_count
+        if stream:
+            self._stream_counts(users_map, repo_name, users, users_counts)
+
+    def _total(self, count):
+        if isinstance(count, dict):
+            return sum(count.values())
+        return count
+
+    # counts prs or issues with one Search API query per user, in all repos or only in repo_name
+    def _search_func(self, kind, repo_name=None):
+        if repo_name != None:
+            return lambda users: self.client.search_counts(self.org(), kind, users, self.start_date(), self.end_date(), self.state(), repo_name)
+        return lambda users: self.client.search_counts(self.org(), kind, users, self.start_date(), self.end_date(), self.state())
+
+    # the counts of each repo, or of the searches, are checkpointed once done unless --offline; the checkpoint is
+    # created by the first counting worker thread that needs it, so its creation is locked
+    def checkpoint(self):
+        with self.__checkpoint_lock:
+            if self.__checkpoint == None and self.args.get('--checkpoint') and not self.offline():
+                request = {'command': self.name(), 'org': self.org(), 'year': self.year(), 'month': self.month(), 'since': self.since(), 'until': self.until(),
+                           'period': self.period(), 'state': self.state(), 'users': self.users(), 'all_users': self.all_users()}
+                self.__checkpoint = Checkpoint(self.args['--checkpoint'], request)
+                if self.resume():
+                    Console.print("Resuming with {units} completed units from checkpoint: '{path}'".format(units=self.__checkpoint.load(), path=self.__checkpoint.path))
+        return self.__checkpoint
+
+    # returns func() or its result saved in the checkpoint, e.g., for unit 'repo0' of data 'reviews'
+    def _checkpointed(self, data, unit, func):
+        checkpoint = self.checkpoint()
+        if checkpoint == None:
+            return func()
+        result = checkpoint.get(data, unit)
+        if result == None:
+            result = func()
+            checkpoint.put(data, unit, result)
+        return result
+
+    # the checkpoint is only needed until the command completes
+    def _close_checkpoint(self, completed):
+        if self.__checkpoint == None:
+            return
+        if completed:
+            self.__checkpoint.remove()
+        else:
+            self.__checkpoint.save()
+
+    # counts of months that ended more than --memo-after ago are final, so are memoized unless --offline,
+    # --since, --period, or --all-users
+    def memo(self):
+        if self.__memo == None and self.args.get('--memo') and not self.args.get('--no-memo') and not self.offline() and not self.since() and not self.period() and not self.all_users():
+            ended_at = self.end_date() + timedelta(seconds=1)
+            if datetime.now() - ended_at > timedelta(seconds=self._parse_seconds(self.args.get('--memo-after') or '3d', '--memo-after')):
+                self.__memo = ResultsMemo(self.args['--memo'])
+        return self.__memo
+
+    # commits and their lines are counted in any state
+    def _memo_state(self, data):
+        return self.state() if data in self.MEMOIZED_STATES else ''
+
+    def _memoizable(self, data):
+        if data not in self.MEMOIZED_DATA or self._memo_state(data) not in self.MEMOIZED_STATES.get(data, ['']):
+            return False
+        return self.memo() != None
+
+    # returns {repo_name: {user: count}} of the memoized counts of data
+    def _memoized(self, data, repos):
+        if not self._memoizable(data):
+            return {}
+        return self.memo().counts(self.org(), data, self._memo_state(data), self.year(), self.month_number(), [repo.name for repo in repos], self.users())
+
+    def _memoize(self, data, repos_counts):
+        if not self._memoizable(data):
+            return
+        self.memo().put(self.org(), data, self._memo_state(data), self.year(), self.month_number(), repos_counts)
+
+    def _planner(self):
+        if self.__planner == None:
+            self.__planner = Planner(self.client, self.org(), self.users(), self.start_date(), self.end_date(), self.state())
+        return self.__planner
+
+    # --strategy=auto plans the cheapest way to count data in each repo
+    def _plan(self, data, repos):
+        if self.strategy() != 'auto' or data not in Planner.METRICS:
+            return None
+        plan = self._planner().plan(data, repos)
+        if self.explain():
+            self._print_plan(plan)
+        return plan
+
+    def _print_plan(self, plan):
+        Console.println()
+        print(tabulate(plan.rows(), headers=['data', 'repo', 'strategy', 'estimated calls', 'alternatives']))
+        Console.print("Estimated API calls for '{data}': {calls}, after {planning_calls} planning calls".format(data=plan.metric, calls=plan.estimated_calls(), planning_calls=plan.planning_calls))
+
+    def _planned_counts_func(self, plan, search_kind, counts_func):
+        def planned_counts_func(repo, users):
+            strategy = plan.strategy(repo.name)
+            if strategy == 'search':
+                searched = self._search_func(search_kind, repo.name)(users)
+                users_counts = {user: repos_counts.get(repo.name, 0) for user, repos_counts in searched.items()}
+                listed_users = [user for user in users if user not in searched]
+                if len(listed_users) > 0:
+                    users_counts.update(counts_func(repo, listed_users))
+                return users_counts
+            elif strategy == 'list' and plan.metric == 'reviews' and hasattr(self.client, 'list_reviews_counts'):
+                return self.client.list_reviews_counts(repo, users, self.start_date(), self.end_date(), self.state())
+            return counts_func(repo, users)
+        return planned_counts_func
+
+    # the data counted by the command
+    def data_names(self):
+        return [self.name()]
+
+    def _estimate_strategy(self, data):
+        if self.strategy() == 'list' and self.backend() == 'graphql' and data == 'reviews':
+            return 'graphql'
+        elif data == 'commits' and self.backend() == 'git':
+            return 'git'
+        elif data == 'commits' or (self.strategy() == 'search' and data not in ['prs', 'issues']):
+            return 'list'
+        return self.strategy()
+
+    # --estimate only lists the repos and gets their PRs and issues totals, then projects the
+    # API calls of the command, the rate limit sleeps, and the wall time at the latency of these calls
+    def print_estimate(self):
+        Console.print("Estimating API calls for {users} in organization: '{org}'".format(users=self.users_description(), org=self.org()))
+        started_at = time.time()
+        repos = self.tracked_repos()
+        repos_calls = len(self.repos())
+        if self.all_repos():
+            repos_calls = 1 + len(self.client.repos(self.org())) // Planner.PER_PAGE
+        rows, calls = [], {'core': repos_calls, 'search': 0, 'graphql': 0}
+        for data in self.data_names():
+            data_calls = self._planner().estimate(data, repos, self._estimate_strategy(data))
+            rows.append([data, self._estimate_strategy(data), data_calls['core'], data_calls['search'], data_calls['graphql']])
+            for resource in calls:
+                calls[resource] += data_calls[resource]
+        metadata_calls = repos_calls + self._planner().planning_calls
+        # without tracked repos no call is made to measure the latency
+        latency = (time.time() - started_at) / metadata_calls if metadata_calls > 0 else 0
+        total_calls = sum(calls.values())
+        sleep = self.rate_limit_data.projected_sleep(total_calls)
+        if self.client.adaptive_rate_limiter != None:
+            sleep += sum([self.client.adaptive_rate_limiter.projected_sleep(resource, resource_calls) for resource, resource_calls in calls.items()])
+        Console.println()
+        print(tabulate(rows, headers=['data', 'strategy', 'core calls', 'search calls', 'graphql calls']))
+        Console.println()
+        Console.print("Estimated API calls: {calls}, after {metadata_calls} metadata calls".format(calls=total_calls, metadata_calls=metadata_calls))
+        Console.print("Estimated rate limit sleeps: {sleep}".format(sleep=timedelta(seconds=int(sleep))))
+        Console.print("Estimated wall time: {wall_time}, at {latency:.2f} seconds per call with {workers} workers".format(wall_time=timedelta(seconds=int(total_calls*latency/self.workers() + sleep)), latency=latency, workers=self.workers()))
+        cost_summary = self.client.cost_summary()
+        if cost_summary:
+            Console.print(cost_summary)
+        Console.ok("OK")
+        return 0
+
+    def _update_users_issues(self):
+        self._update_users_data('issues', self.users_issues,
+                                lambda repo, users: self.client.issues_counts(repo, users, self.start_date(), self.end_date(), self.state()), 'issue')
 
     def _update_users_prs(self):
-        repos = self.client.repos(self.org())
-        for user in self.users():
-            totalReposCount = repos.totalCount
-            Console.print("Getting 'prs' for '{user}' in organization: '{org}'".format(user=user, org=self.org()))
-            count = 1
-            for repo in repos:
-                Console.progress(count, totalReposCount, status="processing repos".format(name=repo.name))
-                if repo.name in self.repos() and repo.name not in self.skip_repos():
-                    prs_count = self.client.prs_count(repo, user, self.start_date(), self.end_date(), self.state())
-                    if prs_count == 0 and not self.show_all_stats():
-                            continue
-                    self.users_prs[user][repo.name] = prs_count
-                count += 1
-            Console.println()
-        self._update_repo_stats('prs', self.users_prs)
-        self._update_summary_stats('prs', self.users_prs)
+        self._update_users_data('prs', self.users_prs,
+                                lambda repo, users: self.client.prs_counts(repo, users, self.start_date(), self.end_date(), self.state()), 'pr')
 
     def _update_users_reviews(self):
-        repos = self.client.repos(self.org())
-        totalReposCount = repos.totalCount
-        for user in self.users():
-            Console.print("Getting 'reviews' for '{user}' in organization: '{org}'".format(user=user, org=self.org()))
-            count = 1
-            for repo in repos:
-                Console.progress(count, totalReposCount, status="processing repos".format(name=repo.name))
-                if repo.name in self.repos() and repo.name not in self.skip_repos():
-                    reviews_count = self.client.reviews_count(repo, user, self.start_date(), self.end_date())
-                    if reviews_count == 0 and not self.show_all_stats():
-                            continue
-                    self.users_reviews[user][repo.name] = reviews_count
-                count += 1
-            Console.println()
-        self._update_repo_stats('reviews', self.users_reviews)
-        self._update_summary_stats('reviews', self.users_reviews)
+        self._update_users_data('reviews', self.users_reviews,
+                                lambda repo, users: self.client.reviews_counts(repo, users, self.start_date(), self.end_date(), self.state()))
 
     def _update_users_commits(self):
-        repos = self.client.repos(self.org())
-        totalReposCount = repos.totalCount
-        for user in self.users():
-            Console.print("Getting 'commits' for '{user}' in organization: '{org}'".format(user=user, org=self.org()))
-            count = 1
-            for repo in repos:
-                Console.progress(count, totalReposCount, status="processing repos".format(name=repo.name))
-                if repo.name in self.repos() and repo.name not in self.skip_repos():
-                    commits_count = self.client.commits_count(repo, user, self.start_date(), self.end_date())
-                    if commits_count == 0 and not self.show_all_stats():
-                            continue
-                    self.users_commits[user][repo.name] = commits_count
-                count += 1
-            Console.println()
-        self._update_repo_stats('commits', self.users_commits)
-        self._update_summary_stats('commits', self.users_commits)
+        if self.churn():
+            self._update_users_data('commits', self.users_commits, self._churn_commits_counts)
+            for data in self.CHURN_DATA:
+                self._update_users_data(data, self.users_churn[data], lambda repo, users, data=data: self._churn_counts(repo)[data])
+            return
+        self._update_users_data('commits', self.users_commits,
+                                lambda repo, users: self.client.commits_counts(repo, users, self.start_date(), self.end_date()))
+
+    # with --churn the lines added and deleted by all users are counted from the same contributors stats as
+    # the commits, and kept until counting each of the CHURN_DATA takes them
+    def _churn_commits_counts(self, repo, users):
+        all_users = None if self.all_users() else self.users()
+        commits_counts, additions_counts, deletions_counts = self.client.commits_churn_counts(repo, all_users, self.start_date(), self.end_date())
+        self.__churn_counts[repo.name] = {'additions': additions_counts, 'deletions': deletions_counts, 'net': self._net_counts(additions_counts, deletions_counts)}
+        return commits_counts
+
+    # the commits of repos memoized or resumed from a checkpoint were not counted
+    def _churn_counts(self, repo):
+        if repo.name not in self.__churn_counts:
+            self._churn_commits_counts(repo, None)
+        return self.__churn_counts[repo.name]
+
+    def _net_counts(self, additions_counts, deletions_counts):
+        net_counts = {}
+        for user, additions in additions_counts.items():
+            deletions = deletions_counts.get(user, 0)
+            if isinstance(additions, dict):
+                net_counts[user] = {key: additions.get(key, 0) - deletions.get(key, 0) for key in additions.keys() | deletions.keys()}
+            else:
+                net_counts[user] = additions - deletions
+        return net_counts
+
+    # the maps of the CHURN_DATA, i.e., {data: {user: {repo_name: lines}}}, initialized by commands counting commits
+    def _init_users_churn(self):
+        self.users_churn = {data: {} for data in self.churn_data()}
+        for data, users_map in self.users_churn.items():
+            self._init_request(users_map, data)
+            self._init_users_stats(users_map)
+
+    def _print_churn_output(self):
+        for data in self.churn_data():
+            self.print_output(self.users_churn[data])
+
+    # named repos are resolved with one call each instead of listing the org, which the client lists only once
+    def tracked_repos(self):
+        if self.__tracked_repos == None:
+            repos = self._resolve_repos()
+            if self.active_only():
+                repos = self._active_repos(repos, [rule for rule in self.active_rules() if rule != 'pushed'], self.data_names())
+            self.__tracked_repos = repos
+        return self.__tracked_repos
+
+    def _resolve_repos(self):
+        skip_repos = set(self.skip_repos())
+        if self.all_repos():
+            return [repo for repo in self.client.repos(self.org()) if repo.name not in skip_repos]
+        repos = []
+        for repo_name in dict.fromkeys(self.repos()):
+            if repo_name in skip_repos:
+                continue
+            repo = self.client.repo(self.org(), repo_name)
+            if repo == None:
+                self.warn("repo: '{repo}' not found in organization: '{org}'".format(repo=repo_name, org=self.org()))
+                continue
+            repos.append(repo)
+        return repos
+
+    # the tracked repos counting data, i.e., with --active-only also without the repos not pushed to for commits
+    def _data_repos(self, data):
+        if not self.active_only() or 'pushed' not in self.active_rules() or data not in self.PUSHED_DATA:
+            return self.tracked_repos()
+        if self.__pushed_repos == None:
+            pushed_data = [data for data in self.data_names() if data in self.PUSHED_DATA]
+            self.__pushed_repos = self._active_repos(self.tracked_repos(), ['pushed'], pushed_data, "not pushed to, for commits")
+        return self.__pushed_repos
+
+    # --active-only skips the repos without activity in the dates window, each would cost at least one call per data
+    def _active_repos(self, repos, rules, data_names, reason="without activity"):
+        active_repos, skipped = ActivityFilter(rules, self.start_date(), self.end_date()).filter(repos)
+        for repo_name, rule in skipped.items():
+            Console.verbose("skipping repo: '{repo}' by --active-rules '{rule}'".format(repo=repo_name, rule=rule))
+        Console.print("Skipping {skipped} of {total} repos {reason}, saving at least {calls} API calls".format(skipped=len(skipped), total=len(repos), reason=reason, calls=len(skipped)*len(data_names)))
+        return active_repos
 
     def _init_repos_from_all_repos(self):
         repo_names = []
@@ -422,6 +915,19 @@ class Command:
         for repo in repos: repo_names.append(repo.name)
         self.args['--repos'] = repo_names
 
+    def check_dates(self):
+        for option in ['--since', '--until']:
+            try:
+                if self.args.get(option):
+                    datetime.strptime(self.args[option], self.DATE_FORMAT)
+            except ValueError:
+                Console.warn("Invalid {option} value '{date}', expected YYYY-MM-DD".format(option=option, date=self.args[option]))
+                return False
+        if self.start_date() > self.end_date():
+            Console.warn("Invalid --until value '{until}' before --since".format(until=self.until()))
+            return False
+        return True
+
     def check_month(self, month):
         if month in self.MONTHS_LOWER.keys():
             self.__month_number = self.MONTHS_LOWER[month]
@@ -451,7 +957,15 @@ class Command:
             return True
         return False
 
+    def check_backend(self, backend):
+        return backend in self.BACKENDS
+
+    def check_strategy(self, strategy):
+        return strategy in self.STRATEGIES
+
     def check_credentials(self):
+        if self.offline():
+            return True
         if self.credentials == None:
             Console.warn("Invalid credentials '{credentials}'".format(credentials=self.credentials))
             return False
@@ -461,15 +975,59 @@ class Command:
         return True
 
     def check_required_options(self):
-        if not self.check_month(self.month()):
+        if self.since() and not self.check_dates():
+            return False
+        elif not self.since() and not self.check_month(self.month()):
             Console.warn("Invalid month '{month}'".format(month=self.month()))
             return False
+        elif not self.check_option_values() or not self.check_options_combination():
+            return False
+        if self.all_users() and len(self.args['--users']) > 0:
+            self.warn("ignoring --users since --all-users is set")
+        return True
+
+    def check_option_values(self):
+        if self.period() and self.period() not in PERIODS:
+            Console.warn("Invalid period value '{period}'".format(period=self.period()))
+            return False
         elif not self.check_org(self.org()):
             Console.warn("Invalid org value '{org}'".format(org=self.org()))
             return False
         elif not self.check_state(self.state()):
             Console.warn("Invalid state value '{state}'".format(state=self.state()))
             return False
+        elif not self.check_backend(self.backend()):
+            Console.warn("Invalid backend value '{backend}'".format(backend=self.backend()))
+            return False
+        elif not self.check_strategy(self.strategy()):
+            Console.warn("Invalid strategy value '{strategy}'".format(strategy=self.strategy()))
+            return False
+        return True
+
+    def check_options_combination(self):
+        if self.backend() == 'async' and not AsyncGHClient.available():
+            Console.warn("The 'async' backend requires aiohttp, install it with: pip install aiohttp")
+            return False
+        elif self.estimate() and self.offline():
+            Console.warn("Cannot estimate GitHub API calls with --offline")
+            return False
+        elif self.args.get('--top') and not self.check_top():
+            return False
+        elif self.churn() and 'commits' not in self.data_names():
+            Console.warn("Cannot use --churn without counting commits")
+            return False
+        elif self.active_only() and not set(self.active_rules()).issubset(ACTIVITY_RULES):
+            Console.warn("Invalid --active-rules value '{rules}'".format(rules=self.args.get('--active-rules')))
+            return False
+        return True
+
+    def check_top(self):
+        if not self.all_users():
+            Console.warn("Cannot use --top without --all-users")
+            return False
+        elif self.top() == None or self.top() <= 0:
+            Console.warn("Invalid --top value '{top}'".format(top=self.args['--top']))
+            return False
         return True
 
     def check_rl_max(self):
@@ -512,10 +1070,30 @@ class Command:
         return datetime.now().year
 
     def start_date(self):
+        if self.since():
+            return datetime.strptime(self.since(), self.DATE_FORMAT)
         return datetime(month=self.month_number(), day=1, year=self.year())
 
+    # --until is included up to the end of that day, and defaults to now with --since
     def end_date(self):
-        return datetime(month=self.month_number(), day=self.month_last_day(), year=self.year())
+        if self.since():
+            if not self.until():
+                return datetime.utcnow()
+            return datetime.strptime(self.until(), self.DATE_FORMAT) + timedelta(days=1) - timedelta(seconds=1)
+        # inclusive of the whole last day, like --until
+        return datetime(month=self.month_number(), day=self.month_last_day(), year=self.year()) + timedelta(days=1) - timedelta(seconds=1)
+
+    def since(self):
+        return self.args.get('--since')
+
+    def until(self):
+        return self.args.get('--until')
+
+    def period(self):
+        return self.args.get('--period')
+
+    def period_keys(self):
+        return period_keys(self.period(), self.start_date(), self.end_date())
 
     def month_last_day(self):
         range = monthrange(self.year(), self.month_number())
@@ -530,9 +1108,41 @@ class Command:
     def month(self):
         return self.args['MONTH']
 
+    # --all-users counts the authors found instead
     def users(self):
+        if self.all_users():
+            return []
         return self.args['--users']
 
+    def active_only(self):
+        return self.args.get('--active-only', False)
+
+    def active_rules(self):
+        rules = self.args.get('--active-rules')
+        if not rules:
+            return DEFAULT_ACTIVITY_RULES
+        return rules.split(',')
+
+    def all_users(self):
+        return self.args.get('--all-users', False)
+
+    def churn(self):
+        return self.args.get('--churn', False)
+
+    def churn_data(self):
+        return self.CHURN_DATA if self.churn() else []
+
+    def top(self):
+        try:
+            return int(self.args.get('--top'))
+        except (TypeError, ValueError):
+            return None
+
+    def users_description(self):
+        if self.all_users():
+            return "all users"
+        return "{total_users} users".format(total_users=len(self.users()))
+
     def org(self):
         return self.args['ORG']
 
@@ -550,6 +1160,40 @@ class Command:
     def output(self):
         return self.args['--output']
 
+    def backend(self):
+        return self.args.get('--backend') or 'rest'
+
+    def offline(self):
+        return self.args.get('--offline', False)
+
+    def resume(self):
+        return self.args.get('--resume', False)
+
+    def estimate(self):
+        return self.args.get('--estimate', False)
+
+    def explain(self):
+        return self.args.get('--explain', False)
+
+    # the local store is not searched, nor are all users
+    def strategy(self):
+        if self.offline() or self.period() or self.all_users():
+            return 'list'
+        return self.args.get('--strategy') or 'list'
+
+    # the local store is answered from one thread
+    def workers(self):
+        if self.offline():
+            return 1
+        try:
+            return max(1, int(self.args.get('--workers') or self.BACKEND_WORKERS.get(self.backend(), 1)))
+        except ValueError:
+            Console.warn("Invalid --workers value '{workers}', using 1".format(workers=self.args.get('--workers')))
+        return 1
+
+    def store(self):
+        return self.args.get('--store') or EventStore.DEFAULT_STORE
+
     def file(self):
         return self.args['--file']
 
@@ -598,6 +1242,10 @@ class Command:
         if self.file() != None:
             Console.print("wrote output file: {file}".format(file=self.file()))
 
+        cost_summary = self.client.cost_summary()
+        if cost_summary:
+            Console.print(cost_summary)
+
         if not self.show_all_stats():
             Console.print("Showing only non-zero stats, use --show-all-stats to view all")
         Console.ok("OK")
@@ -615,19 +1263,31 @@ class Command:
             self._print_output_yml(output_map)
         elif self.output() in self.OUTPUT_CSV:
             self._print_output_csv(output_map)
+        elif self.output() in self.OUTPUT_JSONL:
+            self._print_output_jsonl(output_map)
         else:
             self._print_output_text(output_map)
         if self.summarize() and self.name() != 'stats':
             self._print_summarize_output()
 
     def execute(self):
-        self.fetch_repos()
         if not self.check_credentials():
             return 1
         elif not self.check_required_options():
             return 1
+        self.fetch_repos()
         func = self.dispatch()
-        rc = func()
+        if self.estimate():
+            func = self.print_estimate
+        rc = 1
+        try:
+            rc = func()
+        finally:
+            self.client.close()
+            self._close_stream_writer()
+            self._close_checkpoint(rc == None or rc == 0)
+            if self.__memo != None:
+                self.__memo.close()
         if rc == None:
             return 0
         else:
@@ -647,6 +1307,10 @@ class Command:
             return self.issues
         elif self.args['stats']:
             return self.stats
+        elif self.args.get('sync'):
+            return self.sync
+        elif self.args.get('invalidate'):
+            return self.invalidate
         else:
             raise Exception("Invalid subcommand")
 
@@ -658,15 +1322,17 @@ class Commits(Command):
         super().__init__(self.args, credentials, client)
         self._init_request(self.users_commits, self.name())
         self._init_users_stats(self.users_commits)
+        self._init_users_churn()
 
     def name(self):
       return "commits"
 
     def commits(self):
         self.start_comment()
-        Console.print("Getting commits for {total_users} users in {total_repos} repos via GitHub APIs... be patient".format(total_users=len(self.users()), total_repos=len(self.repos())))
+        Console.print("Getting commits for {users} in {total_repos} repos via GitHub APIs... be patient".format(users=self.users_description(), total_repos=len(self.repos())))
         self._update_users_commits()
         self.print_output(self.users_commits)
+        self._print_churn_output()
         self.end_comment()
         return 0
 
@@ -684,7 +1350,7 @@ class Reviews(Command):
 
     def reviews(self): 
         self.start_comment()
-        Console.print("Getting reviews for {total_users} users in {total_repos} repos via GitHub APIs... be patient".format(total_users=len(self.users()), total_repos=len(self.repos())))
+        Console.print("Getting reviews for {users} in {total_repos} repos via GitHub APIs... be patient".format(users=self.users_description(), total_repos=len(self.repos())))
         self._update_users_reviews()
         self.print_output(self.users_reviews)
         self.end_comment()
@@ -704,7 +1370,7 @@ class PRs(Command):
 
     def prs(self):
         self.start_comment()
-        Console.print("Getting prs for {total_users} users in {total_repos} repos via GitHub APIs... be patient".format(total_users=len(self.users()), total_repos=len(self.repos())))
+        Console.print("Getting prs for {users} in {total_repos} repos via GitHub APIs... be patient".format(users=self.users_description(), total_repos=len(self.repos())))
         self._update_users_prs()
         self.print_output(self.users_prs)
         self.end_comment()
@@ -724,7 +1390,7 @@ class Issues(Command):
 
     def issues(self):
         self.start_comment()
-        Console.print("Getting issues for {total_users} users in {total_repos} repos via GitHub APIs... be patient".format(total_users=len(self.users()), total_repos=len(self.repos())))
+        Console.print("Getting issues for {users} in {total_repos} repos via GitHub APIs... be patient".format(users=self.users_description(), total_repos=len(self.repos())))
         self._update_users_issues()
         self.print_output(self.users_issues)
         self.end_comment()
@@ -738,6 +1404,7 @@ class Stats(Command):
         self.users_prs = {}     # {user: {repo_name: pr_count},...}
         self.users_issues = {}  # {user: {repo_name: issue_count},...}
         self.users_reviews = {} # {user: {repo_name: review_count},...}
+        self.__shared_reviews_counts = {} # {repo_name: {user: review_count}} counted with the prs
         super().__init__(self.args, credentials, client)
         for data_tuple in [('commits', self.users_commits),
                            ('prs', self.users_prs),
@@ -745,10 +1412,12 @@ class Stats(Command):
                            ('reviews', self.users_reviews)]:
             self._init_request(data_tuple[1], data_tuple[0])
             self._init_users_stats(data_tuple[1])
+        self._init_users_churn()
 
     def print_stats_output(self):
         if self.stats_commits():
             self.print_output(self.users_commits)
+            self._print_churn_output()
         if self.stats_prs():
             self.print_output(self.users_prs)
         if self.stats_reviews():
@@ -761,6 +1430,38 @@ class Stats(Command):
     def name(self):
       return "stats"
 
+    # with --prs and --reviews listed, each repo PRs are listed once for both: counting the prs also
+    # counts the reviews of all users, which counting the reviews then takes
+    def share_prs_listing(self):
+        return self.stats_prs() and self.stats_reviews() and self.strategy() == 'list'
+
+    def _update_users_prs(self):
+        if not self.share_prs_listing():
+            return super()._update_users_prs()
+        self._update_users_data('prs', self.users_prs, self._shared_prs_counts, 'pr')
+
+    def _update_users_reviews(self):
+        if not self.share_prs_listing():
+            return super()._update_users_reviews()
+        self._update_users_data('reviews', self.users_reviews, self._shared_reviews_counts)
+
+    def _shared_prs_counts(self, repo, users):
+        all_users = None if self.all_users() else self.users()
+        prs_counts, reviews_counts = self.client.prs_reviews_counts(repo, all_users, self.start_date(), self.end_date(), self.state())
+        # checkpointed with the prs, so that they are not counted again when resuming
+        self.__shared_reviews_counts[repo.name] = self._checkpointed('reviews', repo.name, lambda: reviews_counts)
+        return prs_counts
+
+    # the prs of repos memoized or resumed from a checkpoint were not listed
+    def _shared_reviews_counts(self, repo, users):
+        reviews_counts = self.__shared_reviews_counts.pop(repo.name, None)
+        if reviews_counts == None:
+            return self.client.reviews_counts(repo, users, self.start_date(), self.end_date(), self.state())
+        return reviews_counts
+
+    def data_names(self):
+        return [data for data, selected in [('commits', self.stats_commits()), ('prs', self.stats_prs()), ('reviews', self.stats_reviews()), ('issues', self.stats_issues())] if selected]
+
     def stats(self):
         self.start_comment()
         if self.stats_commits():
@@ -774,3 +1475,79 @@ class Stats(Command):
         self.print_stats_output()
         self.end_comment()
         return 0
+
+# sync command group
+class Sync(Command):
+    def __init__(self, args, credentials, client):
+        self.args = args
+        super().__init__(self.args, credentials, client)
+
+    def name(self):
+      return "sync"
+
+    def check_required_options(self):
+        if not self.check_org(self.org()):
+            Console.warn("Invalid org value '{org}'".format(org=self.org()))
+            return False
+        elif self.offline():
+            Console.warn("Cannot sync with --offline")
+            return False
+        elif self.estimate():
+            Console.warn("Cannot estimate sync, its API calls depend on what is already in the store")
+            return False
+        elif self.active_only():
+            Console.warn("Cannot sync with --active-only, sync updates the store from the last synced items")
+            return False
+        # the store is synced from PyGithub repos, which the async backend does not list
+        elif self.backend() == 'async':
+            Console.warn("Cannot sync with --backend=async")
+            return False
+        return True
+
+    def sync(self):
+        self.start_comment()
+        store = EventStore(self.store())
+        repos = self.tracked_repos()
+        Console.print("Syncing {total_repos} repos of organization: '{org}' into: '{store}'".format(total_repos=len(repos), org=self.org(), store=store.path))
+        synced = []
+        try:
+            for count, repo in enumerate(repos, 1):
+                Console.progress(count, len(repos), status="syncing repos")
+                counts = store.sync_repo(self.client, self.org(), repo)
+                synced.append([repo.name, counts['prs'], counts['issues'], counts['weeks']])
+        finally:
+            store.close()
+        Console.println(2)
+        print(tabulate(synced, headers=['repo', 'prs', 'issues', 'weeks']))
+        Console.println()
+        Console.ok("OK")
+        return 0
+
+# invalidate command group
+class Invalidate(Command):
+    def __init__(self, args, credentials, client):
+        self.args = args
+        super().__init__(self.args, credentials, client)
+
+    def name(self):
+      return "invalidate"
+
+    # no GitHub API calls
+    def check_credentials(self):
+        return True
+
+    def check_required_options(self):
+        if not self.check_org(self.org()):
+            Console.warn("Invalid org value '{org}'".format(org=self.org()))
+            return False
+        return True
+
+    def invalidate(self):
+        memo = ResultsMemo(self.args.get('--memo') or ResultsMemo.DEFAULT_MEMO)
+        try:
+            deleted = memo.invalidate(self.org(), [repo for repo in self.repos() if repo not in self.skip_repos()], self.users())
+        finally:
+            memo.close()
+        Console.print("Invalidated {deleted} memoized counts of organization: '{org}' in: '{memo}'".format(deleted=deleted, org=self.org(), memo=memo.path))
+        Console.ok("OK")
+        return 0
@@ -12,12 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import io, os, tempfile
+import io, os, json, time, tempfile, threading, subprocess
 
 from unittest import TestCase
 from unittest.mock import patch, Mock
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from cli import *
 
@@ -49,6 +49,26 @@ class TestCLI(TestCase):
                          'issues': False,
                          'stats': False}
 
+    def test_access_tokens(self):
+        credentials = Credentials({'gh_access_token': 'token0', 'gh_access_tokens': ['token1', 'token0', 'token2']})
+        with patch.dict(os.environ, {'GH_ACCESS_TOKEN': '', 'GH_ACCESS_TOKENS': ''}):
+            self.assertEqual(credentials.access_tokens(), ['token0', 'token1', 'token2'])
+        with patch.dict(os.environ, {'GH_ACCESS_TOKEN': '', 'GH_ACCESS_TOKENS': 'token3, token4'}):
+            self.assertEqual(credentials.access_tokens(), ['token0', 'token3', 'token4'])
+
+    def test_token_pool(self):
+        self.arguments['reviews'] = True
+        with patch.dict(os.environ, {'GH_ACCESS_TOKENS': 'token1,token2'}):
+            command = CLI(self.arguments).command()
+        self.assertTrue(isinstance(command.client.adaptive_rate_limiter, TokenPool))
+        self.assertEqual(command.client.adaptive_rate_limiter.tokens, ['fake-access-token', 'token1', 'token2'])
+        # the tokens are still pooled with a fixed --rate-limit
+        self.arguments['--rate-limit'] = True
+        with patch.dict(os.environ, {'GH_ACCESS_TOKENS': 'token1,token2'}):
+            command = CLI(self.arguments).command()
+        self.assertTrue(isinstance(command.client.adaptive_rate_limiter, TokenPool))
+        self.assertTrue(command.rate_limit_data.enabled())
+
     def test_command(self):
         self.arguments['commits'] = True
         cli = CLI(self.arguments)
@@ -70,6 +90,21 @@ class TestCLI(TestCase):
         cli = CLI(self.arguments)
         self.assertTrue(cli.command() != None)
 
+    def test_command_backend(self):
+        self.arguments['reviews'] = True
+        self.assertTrue(isinstance(CLI(self.arguments).command().client, GHClient))
+        self.arguments['--backend'] = 'graphql'
+        self.assertTrue(isinstance(CLI(self.arguments).command().client, GHGraphQLClient))
+        self.arguments['--backend'] = 'async'
+        self.assertTrue(isinstance(CLI(self.arguments).command().client, AsyncGHClient))
+        self.arguments['--backend'] = 'git'
+        with tempfile.TemporaryDirectory() as mirrors_dir:
+            self.arguments['--mirrors-dir'] = mirrors_dir
+            self.assertTrue(isinstance(CLI(self.arguments).command().client, GHGitClient))
+        self.arguments['--backend'] = 'rest'
+        self.arguments['--strategy'] = 'auto'
+        self.assertTrue(isinstance(CLI(self.arguments).command().client, GHGraphQLClient))
+
     def test_dispatch(self):
         for command_name in ['commits', 'stats']:
             self.arguments[command_name] = True
@@ -116,6 +151,7 @@ class CommandTestCase:
             def __init__(self, name):
                 self.name = name
         client.repos.return_value = [Repo('fake-repo1'), Repo('fake-repo2'), Repo('fake-repo3')]
+        client.repo.side_effect = lambda org, name: next((repo for repo in client.repos.return_value if repo.name == name), None)
         return client
 
     def test_verbose(self):
@@ -216,6 +252,13 @@ class CommandTestCase:
         self.assertFalse(cli.command().check_org(''))
         self.assertFalse(cli.command().check_org(None))
 
+    def test_check_backend(self):
+        cli = CLI(self.TEST_ARGS.copy())
+        self.assertTrue(cli.command().check_backend('rest'))
+        self.assertTrue(cli.command().check_backend('graphql'))
+        self.assertFalse(cli.command().check_backend('fake-backend'))
+        self.assertEqual(cli.command().backend(), 'rest')
+
     def test_check_state(self):
         test_args = self.TEST_ARGS.copy()
         cli = CLI(test_args)
@@ -239,6 +282,15 @@ class CommandTestCase:
         test_args['--state'] = 'fake-state'
         self.assertFalse(cli.command().check_required_options())
 
+    # without aiohttp the async backend is reported rather than failing when the client is created
+    @patch.object(AsyncGHClient, 'available', return_value=False)
+    def test_check_required_options_async(self, available):
+        test_args = dict(self.TEST_ARGS, **{'--backend': 'async'})
+        command = CLI(test_args).command()
+        self.assertTrue(isinstance(command.client, AsyncGHClient))
+        self.assertFalse(command.check_required_options())
+        self.assertEqual(command.execute(), 1)
+
     def test_println(self):
         stdout = sys.stdout
         sys.stdout = io.StringIO()
@@ -295,7 +347,7 @@ class CommandTestCase:
         test_args['MONTH'] = 'march'
         cli = CLI(test_args)
         year = cli.command().year()
-        self.assertEqual(cli.command().end_date(), datetime(year=year, month=3, day=31))
+        self.assertEqual(cli.command().end_date(), datetime(year=year, month=3, day=31, hour=23, minute=59, second=59))
 
     def test_month_last_day(self):
         test_args = self.TEST_ARGS.copy()
@@ -524,6 +576,20 @@ class CommandTestCase:
         self.assertTrue(cli.command().rate_limit_data.enabled())
         self.assertEqual(cli.command().rate_limit_data.sleep(), 30*60)
 
+    def test_adaptive_rate_limiter(self):
+        test_args = self.TEST_ARGS.copy()
+        cli = CLI(test_args)
+        self.assertTrue(isinstance(cli.command().client.adaptive_rate_limiter, AdaptiveRateLimiter))
+
+        test_args['--rate-limit'] = True
+        cli = CLI(test_args)
+        self.assertEqual(cli.command().client.adaptive_rate_limiter, None)
+
+        for strategy in ['search', 'auto']:
+            test_args['--strategy'] = strategy
+            cli = CLI(test_args)
+            self.assertTrue(isinstance(cli.command().client.adaptive_rate_limiter, AdaptiveRateLimiter))
+
     def test_rate_limit_True_values(self):
         test_args = self.TEST_ARGS.copy()
         test_args['--rate-limit'] = True
@@ -545,7 +611,7 @@ class TestCommits(CommandTestCase, TestCase):
     @patch('client.GHClient')
     def __create_mock_client_commits(self, MockGHClient):
         client = MockGHClient()
-        client.commits_count.return_value = 0
+        client.commits_counts.return_value = {}
         return client
 
     def test_execute(self):
@@ -571,7 +637,7 @@ class TestReviews(CommandTestCase, TestCase):
     @patch('client.GHClient')
     def __create_mock_client_reviews(self, MockGHClient):
         client = MockGHClient()
-        client.reviews_count.return_value = 0
+        client.reviews_counts.return_value = {}
         return client
 
     def test_execute(self):
@@ -604,7 +670,7 @@ class TestPRs(CommandTestCase, TestCase):
     @patch('client.GHClient')
     def __create_mock_client_prs(self, MockGHClient):
         client = MockGHClient()
-        client.prs_count.return_value = 0
+        client.prs_counts.return_value = {}
         return client
 
     def test_execute(self):
@@ -637,7 +703,7 @@ class TestIssues(CommandTestCase, TestCase):
     @patch('client.GHClient')
     def __create_mock_client_issues(self, MockGHClient):
         client = MockGHClient()
-        client.issues_count.return_value = 0
+        client.issues_counts.return_value = {}
         return client
 
     def test_execute(self):
@@ -674,10 +740,25 @@ class TestStats(CommandTestCase, TestCase):
     @patch('client.GHClient')
     def __create_mock_client_stats(self, MockGHClient):
         client = MockGHClient()
-        client.issues_count.return_value = 0
-        client.commits_count.return_value = 1
-        client.reviews_count.return_value = 2
-        client.prs_count.return_value = 3
+        client.issues_counts.return_value = {'fake-user1': 0}
+        client.commits_counts.return_value = {'fake-user1': 1}
+        client.commits_churn_counts.return_value = ({'fake-user1': 1}, {'fake-user1': 10}, {'fake-user1': 4})
+        client.reviews_counts.return_value = {'fake-user1': 2}
+        client.prs_counts.return_value = {'fake-user1': 3}
+        client.prs_reviews_counts.side_effect = lambda *args: (client.prs_counts(*args), client.reviews_counts(*args))
+        return client
+
+    def __create_mock_client_stats_repos(self):
+        client = self.__create_mock_client_stats()
+        class Repo:
+            def __init__(self, name):
+                self.name = name
+        class Repos(list):
+            @property
+            def totalCount(self):
+                return len(self)
+        client.repos.return_value = Repos([Repo('fake-repo1'), Repo('fake-repo2'), Repo('fake-repo3')])
+        client.repo.side_effect = lambda org, name: next((repo for repo in client.repos.return_value if repo.name == name), None)
         return client
 
     def test_execute(self):
@@ -699,5 +780,612 @@ class TestStats(CommandTestCase, TestCase):
         rc = cli.command(client).execute()
         self.assertEqual(rc, 0)
 
+    def test_stats_single_pass_per_repo(self):
+        self.arguments['--users'] = ['fake-user1', 'fake-user2']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        command = CLI(self.arguments).command(client)
+        rc = command.execute()
+        self.assertEqual(rc, 0)
+        for counts_func in [client.commits_counts, client.prs_counts, client.reviews_counts, client.issues_counts]:
+            self.assertEqual(counts_func.call_count, 2)
+        self.assertEqual(command.users_prs['fake-user1']['fake-repo1'], 3)
+        self.assertEqual(command.users_prs['fake-user2']['fake-repo2'], 0)
+        self.assertEqual(command.repos_stats['fake-repo2']['reviews'], 2)
+        self.assertEqual(command.summary_stats['commits']['fake-repo1'], 1)
+
+    def test_stats_workers(self):
+        self.arguments['--users'] = ['fake-user1', 'fake-user2']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2', 'fake-repo3']
+        self.arguments['--workers'] = '3'
+        client = self.__create_mock_client_stats_repos()
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.workers(), 3)
+        client.set_workers.assert_called_with(3)
+        rc = command.execute()
+        self.assertEqual(rc, 0)
+        self.assertEqual(client.prs_counts.call_count, 3)
+        for repo in self.arguments['--repos']:
+            self.assertEqual(command.users_prs['fake-user1'][repo], 3)
+            self.assertEqual(command.repos_stats[repo]['reviews'], 2)
+
+    @patch.object(Command, 'STATS_RETRY_BACKOFF', 0)
+    def test_stats_commits_computing(self):
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        computing = ['fake-repo2']
+        def commits_counts(repo, users, start_date, end_date):
+            if repo.name in computing:
+                computing.remove(repo.name)
+                raise StatsComputingException('computing')
+            return {'fake-user1': 1}
+        client.commits_counts.side_effect = commits_counts
+        command = CLI(self.arguments).command(client)
+        rc = command.execute()
+        self.assertEqual(rc, 0)
+        self.assertEqual(client.commits_counts.call_count, 3)
+        self.assertEqual(command.users_commits['fake-user1'], {'fake-repo1': 1, 'fake-repo2': 1})
+
+    @patch.object(Command, 'STATS_RETRY_BACKOFF', 0)
+    def test_stats_commits_never_computed(self):
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        def commits_counts(repo, users, start_date, end_date):
+            if repo.name == 'fake-repo2':
+                raise StatsComputingException('computing')
+            return {'fake-user1': 1}
+        client.commits_counts.side_effect = commits_counts
+        command = CLI(self.arguments).command(client)
+        stdout = sys.stdout
+        sys.stdout = io.StringIO()
+        try:
+            rc = command.execute()
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(rc, 0)
+        self.assertEqual(client.commits_counts.call_count, 2 + Command.STATS_RETRIES)
+        self.assertEqual(command.users_commits['fake-user1'], {'fake-repo1': 1})
+        self.assertTrue("not counting 'commits' of repo: 'fake-repo2'" in output)
+
+    def test_stats_commits_error(self):
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2', 'fake-repo3']
+        self.arguments['--skip-repos'] = []
+        client = self.__create_mock_client_stats_repos()
+        released = threading.Event()
+        def commits_counts(repo, users, start_date, end_date):
+            if repo.name == 'fake-repo1':
+                raise Exception('fake-error')
+            released.wait(5)
+            return {'fake-user1': 1}
+        client.commits_counts.side_effect = commits_counts
+        command = CLI(self.arguments).command(client)
+        try:
+            with self.assertRaises(Exception):
+                command.execute()
+            # the error surfaces without waiting for the other repos, which are cancelled unless already counting
+            self.assertTrue(client.commits_counts.call_count < 3)
+        finally:
+            released.set()
+
+    def test_stats_named_repos(self):
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo3', 'fake-repo4']
+        self.arguments['--skip-repos'] = ['fake-repo3']
+        client = self.__create_mock_client_stats_repos()
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        # named repos are resolved once for all data, without listing the org
+        self.assertEqual(client.repos.call_count, 0)
+        self.assertEqual([args[0][1] for args in client.repo.call_args_list], ['fake-repo1', 'fake-repo4'])
+        self.assertEqual(client.prs_counts.call_count, 1)
+        self.assertEqual(command.users_prs['fake-user1']['fake-repo1'], 3)
+
+    def test_stats_active_only(self):
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2', 'fake-repo3']
+        self.arguments['--active-only'] = True
+        client = self.__create_mock_client_stats_repos()
+        client.repos.return_value[1].pushed_at = datetime(2019, 1, 1)
+        client.repos.return_value[2].pushed_at = datetime.now()
+        client.repos.return_value[2].created_at = datetime.now() + timedelta(days=1)
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual([repo.name for repo in command.tracked_repos()], ['fake-repo1', 'fake-repo2'])
+        # fake-repo2 was not pushed to, which only rules out commits
+        self.assertEqual(client.prs_counts.call_count, 2)
+        self.assertEqual([args[0][0].name for args in client.commits_counts.call_args_list], ['fake-repo1'])
+        self.assertEqual(command.users_prs['fake-user1']['fake-repo2'], 3)
+        self.arguments['--active-rules'] = 'pushed,fake-rule'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats_repos()).execute(), 1)
+
+    def test_stats_shared_prs_listing(self):
+        self.arguments['--users'] = ['fake-user1', 'fake-user2']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        client.prs_reviews_counts.side_effect = None
+        client.prs_reviews_counts.return_value = ({'fake-user1': 3, 'fake-user2': 0}, {'fake-user1': 2, 'fake-user2': 1})
+        command = CLI(self.arguments).command(client)
+        self.assertTrue(command.share_prs_listing())
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(client.prs_reviews_counts.call_count, 2)
+        self.assertEqual(client.prs_counts.call_count, 0)
+        self.assertEqual(client.reviews_counts.call_count, 0)
+        self.assertEqual(command.users_prs['fake-user1'], {'fake-repo1': 3, 'fake-repo2': 3})
+        self.assertEqual(command.users_reviews['fake-user2'], {'fake-repo1': 1, 'fake-repo2': 1})
+        self.arguments['--strategy'] = 'search'
+        self.assertFalse(CLI(self.arguments).command(client).share_prs_listing())
+
+    def test_stats_search_strategy(self):
+        self.arguments['--users'] = ['fake-user1', 'fake-user2']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        self.arguments['--strategy'] = 'search'
+        client = self.__create_mock_client_stats_repos()
+        # fake-user2 has too many results to search so is listed
+        client.search_counts.side_effect = lambda org, kind, users, start_date, end_date, state: {'fake-user1': {'fake-repo1': 5, 'fake-repo3': 1}}
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(client.search_counts.call_count, 2)
+        self.assertEqual(client.prs_counts.call_args[0][1], ['fake-user2'])
+        self.assertEqual(command.users_prs['fake-user1']['fake-repo1'], 5)
+        self.assertEqual(command.users_issues['fake-user1']['fake-repo1'], 5)
+        self.assertNotIn('fake-repo3', command.users_prs['fake-user1'])
+        self.assertEqual(client.reviews_counts.call_args[0][1], ['fake-user1', 'fake-user2'])
+
+    def test_stats_auto_strategy(self):
+        self.arguments['--users'] = ['fake-user1', 'fake-user2']
+        self.arguments['--repos'] = ['fake-repo1']
+        self.arguments['--strategy'] = 'auto'
+        self.arguments['--explain'] = True
+        client = self.__create_mock_client_stats_repos()
+        client.prs_total.return_value = 3000
+        client.issues_total.return_value = 10
+        client.search_counts.side_effect = lambda org, kind, users, start_date, end_date, state, repo_name: {user: {repo_name: 4} for user in users}
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        # prs are searched in fake-repo1, issues listed, and reviews fetched with GraphQL
+        self.assertEqual(client.search_counts.call_count, 1)
+        self.assertEqual(client.search_counts.call_args[0][-1], 'fake-repo1')
+        self.assertEqual(command.users_prs['fake-user2']['fake-repo1'], 4)
+        self.assertEqual(client.prs_counts.call_count, 0)
+        self.assertEqual(client.issues_counts.call_count, 1)
+        self.assertEqual(client.reviews_counts.call_count, 1)
+        self.assertEqual(client.list_reviews_counts.call_count, 0)
+        self.assertEqual(client.prs_total.call_count, 1)
+
+    def test_stats_estimate(self):
+        self.arguments['--users'] = ['fake-user1', 'fake-user2']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        self.arguments['--estimate'] = True
+        client = self.__create_mock_client_stats_repos()
+        client.adaptive_rate_limiter = AdaptiveRateLimiter()
+        client.prs_total.return_value = 60
+        client.issues_total.return_value = 0
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.data_names(), ['commits', 'prs', 'reviews', 'issues'])
+        self.assertEqual(command.execute(), 0)
+        # only the totals of the repos are fetched
+        self.assertEqual(client.prs_total.call_count, 2)
+        self.assertEqual(client.prs_counts.call_count, 0)
+        self.assertEqual(client.reviews_counts.call_count, 0)
+        self.assertEqual(client.commits_counts.call_count, 0)
+
+    def test_stats_estimate_no_repos(self):
+        self.arguments['--repos'] = []
+        self.arguments['--estimate'] = True
+        command = CLI(self.arguments).command(self.__create_mock_client_stats_repos())
+        self.assertEqual(command.execute(), 0)
+
+    def test_stats_resume(self):
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2', 'fake-repo3']
+        checkpoint_dir = tempfile.TemporaryDirectory()
+        self.arguments['--checkpoint'] = os.path.join(checkpoint_dir.name, 'checkpoint.json')
+        client = self.__create_mock_client_stats_repos()
+        def reviews_counts(repo, users, start_date, end_date, state):
+            if repo.name == 'fake-repo2':
+                raise Exception("fake-access-token expired")
+            return {'fake-user1': 2}
+        client.reviews_counts.side_effect = reviews_counts
+        with self.assertRaises(Exception):
+            CLI(self.arguments).command(client).execute()
+        self.assertTrue(os.path.exists(self.arguments['--checkpoint']))
+        # only the prs and reviews of fake-repo2, from one listing of its PRs, and the issues are left
+        self.arguments['--resume'] = True
+        client = self.__create_mock_client_stats_repos()
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(client.commits_counts.call_count, 0)
+        self.assertEqual(client.prs_reviews_counts.call_count, 1)
+        self.assertEqual(client.reviews_counts.call_count, 1)
+        self.assertEqual(client.issues_counts.call_count, 3)
+        self.assertEqual(command.users_reviews['fake-user1'], {'fake-repo1': 2, 'fake-repo2': 2, 'fake-repo3': 2})
+        self.assertFalse(os.path.exists(self.arguments['--checkpoint']))
+        checkpoint_dir.cleanup()
+
+    # the counting worker threads share one checkpoint
+    def test_stats_checkpoint_workers(self):
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2', 'fake-repo3']
+        self.arguments['--workers'] = '3'
+        checkpoint_dir = tempfile.TemporaryDirectory()
+        self.arguments['--checkpoint'] = os.path.join(checkpoint_dir.name, 'checkpoint.json')
+        checkpoints = []
+        def slow_checkpoint(path, request):
+            time.sleep(0.05)
+            checkpoints.append(Checkpoint(path, request))
+            return checkpoints[-1]
+        with patch('cli.Checkpoint', side_effect=slow_checkpoint):
+            self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats_repos()).execute(), 0)
+        self.assertEqual(len(checkpoints), 1)
+        checkpoint_dir.cleanup()
+
+    @patch.object(Stats, 'year', return_value=2020)
+    def test_stats_memo(self, year):
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        memo_dir = tempfile.TemporaryDirectory()
+        self.arguments['--memo'] = os.path.join(memo_dir.name, 'memo.db')
+        command = CLI(self.arguments).command(self.__create_mock_client_stats_repos())
+        self.assertEqual(command.execute(), 0)
+        # reviews are collected again but the counts of March 2020 are final
+        client = self.__create_mock_client_stats_repos()
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(client.commits_counts.call_count, 0)
+        self.assertEqual(client.prs_counts.call_count, 0)
+        self.assertEqual(client.issues_counts.call_count, 0)
+        self.assertEqual(client.reviews_counts.call_count, 2)
+        self.assertEqual(command.users_prs['fake-user1'], {'fake-repo1': 3, 'fake-repo2': 3})
+        self.assertEqual(command.users_commits['fake-user1'], {'fake-repo1': 1, 'fake-repo2': 1})
+        # open counts change as the items are closed so are not memoized
+        open_arguments = dict(self.arguments, **{'--state': 'open'})
+        CLI(open_arguments).command(self.__create_mock_client_stats_repos()).execute()
+        client = self.__create_mock_client_stats_repos()
+        self.assertEqual(CLI(open_arguments).command(client).execute(), 0)
+        self.assertEqual(client.commits_counts.call_count, 0)
+        self.assertEqual(client.prs_counts.call_count, 2)
+        self.assertEqual(client.issues_counts.call_count, 2)
+        # after invalidating fake-repo1 only it is collected again
+        invalidate_arguments = dict(self.arguments, stats=False, invalidate=True, MONTH=None, **{'--repos': ['fake-repo1']})
+        self.assertEqual(CLI(invalidate_arguments).command(self.__create_mock_client_stats()).execute(), 0)
+        client = self.__create_mock_client_stats_repos()
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(client.commits_counts.call_args[0][0].name, 'fake-repo1')
+        self.assertEqual(client.commits_counts.call_count, 1)
+        self.assertEqual(client.prs_counts.call_count, 1)
+        memo_dir.cleanup()
+
+    # the lines added and deleted are memoized with the commits, so no contributors stats are fetched again
+    @patch.object(Stats, 'year', return_value=2020)
+    def test_stats_memo_churn(self, year):
+        self.arguments['--churn'] = True
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        memo_dir = tempfile.TemporaryDirectory()
+        self.arguments['--memo'] = os.path.join(memo_dir.name, 'memo.db')
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats_repos()).execute(), 0)
+        client = self.__create_mock_client_stats_repos()
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(client.commits_churn_counts.call_count, 0)
+        self.assertEqual(command.users_churn['net']['fake-user1'], {'fake-repo1': 6, 'fake-repo2': 6})
+        memo_dir.cleanup()
+
+    def test_stats_memo_recent_month(self):
+        self.arguments['MONTH'] = datetime.now().strftime('%b').lower()
+        self.arguments['--memo'] = os.path.join(tempfile.gettempdir(), 'fake-memo.db')
+        command = CLI(self.arguments).command(self.__create_mock_client_stats())
+        self.assertEqual(command.memo(), None)
+        self.arguments['MONTH'] = 'jan'
+        self.arguments['--no-memo'] = True
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).memo(), None)
+
+    def test_stats_period(self):
+        self.arguments['MONTH'] = None
+        self.arguments['--since'] = '2020-01-01'
+        self.arguments['--until'] = '2020-03-31'
+        self.arguments['--period'] = 'month'
+        self.arguments['--strategy'] = 'search'
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        for counts_func in [client.commits_counts, client.prs_counts, client.reviews_counts, client.issues_counts]:
+            counts_func.return_value = {'fake-user1': {'2020-01': 2, '2020-03': 1}}
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        client.set_period.assert_called_with('month')
+        self.assertEqual(client.prs_counts.call_args[0][2:4], (datetime(2020, 1, 1), datetime(2020, 3, 31, 23, 59, 59)))
+        self.assertEqual(client.search_counts.call_count, 0)
+        self.assertEqual(command.users_prs['fake-user1']['fake-repo1'], {'2020-01': 2, '2020-02': 0, '2020-03': 1})
+        self.assertEqual(command.users_prs['request']['since'], '2020-01-01')
+        self.assertEqual(command.repos_stats['fake-repo2']['reviews'], 3)
+        rows = command._extract_user_repo_data('prs', command.users_prs)
+        self.assertEqual(rows[0], ['user', 'repo', 'data', 'month', 'count'])
+        self.assertEqual(rows[1:3], [['fake-user1', 'fake-repo1', 'prs', '2020-01', 2], ['fake-user1', 'fake-repo1', 'prs', '2020-03', 1]])
+
+    def test_stats_all_users(self):
+        self.arguments['--all-users'] = True
+        self.arguments['--top'] = '2'
+        self.arguments['--strategy'] = 'search'
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        client.prs_counts.side_effect = lambda repo, users, *args: {'fake-repo1': {'user0': 1, 'user1': 5}, 'fake-repo2': {'user2': 3, 'user0': 3}}[repo.name]
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(client.prs_counts.call_args[0][1], None)
+        self.assertEqual(client.search_counts.call_count, 0)
+        self.assertEqual(list(command.users_prs), ['request', 'user1', 'user0'])
+        self.assertEqual(command.users_prs['user0'], {'fake-repo1': 1, 'fake-repo2': 3})
+        self.assertEqual(command.repos_stats['fake-repo2']['prs'], 3)
+        rows = command._extract_user_repo_data('prs', command.users_prs)
+        self.assertEqual([row[0] for row in rows[1:]], ['user1', 'user0', 'user0'])
+
+    def test_top_invalid(self):
+        self.arguments['--top'] = '2'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).execute(), 1)
+        self.arguments['--all-users'] = True
+        self.arguments['--top'] = '0'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).execute(), 1)
+
+    def test_stats_summary_tables(self):
+        self.arguments['--summarize'] = True
+        self.arguments['--users'] = ['fake-user1', 'fake-user2']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2', 'fake-repo3']
+        self.arguments['--skip-repos'] = ['fake-repo3']
+        client = self.__create_mock_client_stats_repos()
+        client.prs_counts.side_effect = lambda repo, users, *args: {'fake-repo1': {'fake-user1': 3}, 'fake-repo2': {'fake-user1': 1, 'fake-user2': 4}}[repo.name]
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        _, table = command._extract_summary_stats_table()
+        self.assertEqual([row for row in table if row[0] == 'prs'], [['prs', 'fake-repo1', 3], ['prs', 'fake-repo2', 5]])
+        self.assertEqual(len(table), 2 * len(command.summary_stats))
+        _, table = command._extract_repos_stats_table()
+        self.assertEqual([row for row in table if row[0] == 'fake-repo2'], [['fake-repo2', 'commits', 1], ['fake-repo2', 'prs', 5], ['fake-repo2', 'reviews', 2]])
+        rows = command._extract_user_repo_data('prs', command.users_prs)
+        self.assertEqual(rows[1:], [['fake-user1', 'fake-repo1', 'prs', 3], ['fake-user1', 'fake-repo2', 'prs', 1], ['fake-user2', 'fake-repo2', 'prs', 4]])
+
+    def test_stats_jsonl_streamed(self):
+        self.arguments['--output'] = 'jsonl'
+        self.arguments['--summarize'] = True
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        with tempfile.TemporaryDirectory() as output_dir:
+            self.arguments['--file'] = os.path.join(output_dir, 'stats.jsonl')
+            client.commits_counts.return_value = {'fake-user1': 1}
+            command = CLI(self.arguments).command(client)
+            # the rows of each repo are in the file once it is counted, checked as each repo is streamed
+            streamed = []
+            stream_counts = command._stream_counts
+            def check_stream_counts(users_map, repo_name, users, users_counts):
+                stream_counts(users_map, repo_name, users, users_counts)
+                if users_map['request']['data'] == 'commits':
+                    with open(self.arguments['--file']) as output_file:
+                        streamed.append((repo_name, len(output_file.readlines())))
+            command._stream_counts = check_stream_counts
+            self.assertEqual(command.execute(), 0)
+            self.assertEqual(sorted(repo_name for repo_name, _ in streamed), ['fake-repo1', 'fake-repo2'])
+            self.assertEqual([lines for _, lines in streamed], [1, 2])
+            with open(self.arguments['--file']) as output_file:
+                lines = [json.loads(line) for line in output_file]
+        rows = [line for line in lines if 'user' in line]
+        self.assertEqual(sorted((row['data'], row['repo'], row['count']) for row in rows if row['data'] in ['commits', 'prs']),
+                         [('commits', 'fake-repo1', 1), ('commits', 'fake-repo2', 1), ('prs', 'fake-repo1', 3), ('prs', 'fake-repo2', 3)])
+        self.assertEqual(rows[0]['org'], 'knative')
+        self.assertTrue({'org': 'knative', 'repo': 'fake-repo1', 'data': 'reviews', 'total': 2} in lines)
+
+    def test_stats_csv_streamed(self):
+        self.arguments['--output'] = 'csv'
+        self.arguments['--commits'] = False
+        self.arguments['--reviews'] = False
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        client.issues_counts.return_value = {'fake-user1': 2}
+        with tempfile.TemporaryDirectory() as output_dir:
+            self.arguments['--file'] = os.path.join(output_dir, 'stats.csv')
+            command = CLI(self.arguments).command(client)
+            self.assertEqual(command.execute(), 0)
+            with open(self.arguments['--file']) as output_file:
+                lines = output_file.read().splitlines()
+        self.assertEqual(lines[:7], ['', 'org,state,year,month,data', 'knative,closed,{year},mar,prs'.format(year=command.year()), '',
+                                     'user,repo,data,count', 'fake-user1,fake-repo1,prs,3', 'fake-user1,fake-repo2,prs,3'])
+        self.assertEqual(lines[7:], ['', 'org,state,year,month,data', 'knative,closed,{year},mar,issues'.format(year=command.year()), '',
+                                     'user,repo,data,count', 'fake-user1,fake-repo1,issues,2', 'fake-user1,fake-repo2,issues,2'])
+
+    def test_stats_churn(self):
+        self.arguments['--churn'] = True
+        self.arguments['--summarize'] = True
+        self.arguments['--users'] = ['fake-user1', 'fake-user2']
+        self.arguments['--repos'] = ['fake-repo1', 'fake-repo2']
+        client = self.__create_mock_client_stats_repos()
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(client.commits_churn_counts.call_count, 2)
+        self.assertEqual(client.commits_counts.call_count, 0)
+        self.assertEqual(command.users_commits['fake-user1'], {'fake-repo1': 1, 'fake-repo2': 1})
+        self.assertEqual(command.users_churn['additions']['fake-user1'], {'fake-repo1': 10, 'fake-repo2': 10})
+        self.assertEqual(command.users_churn['net']['fake-user1'], {'fake-repo1': 6, 'fake-repo2': 6})
+        self.assertEqual(command.repos_stats['fake-repo1']['deletions'], 4)
+        self.assertEqual(command.summary_stats['net']['fake-repo2'], 6)
+
+    def test_stats_churn_period(self):
+        self.arguments['--churn'] = True
+        self.arguments['MONTH'] = None
+        self.arguments['--since'] = '2020-01-01'
+        self.arguments['--until'] = '2020-02-29'
+        self.arguments['--period'] = 'month'
+        self.arguments['--users'] = ['fake-user1']
+        self.arguments['--repos'] = ['fake-repo1']
+        client = self.__create_mock_client_stats_repos()
+        client.commits_churn_counts.return_value = ({'fake-user1': {'2020-01': 1}}, {'fake-user1': {'2020-01': 5, '2020-02': 1}}, {'fake-user1': {'2020-02': 3}})
+        command = CLI(self.arguments).command(client)
+        self.assertEqual(command.execute(), 0)
+        self.assertEqual(command.users_churn['net']['fake-user1'], {'fake-repo1': {'2020-01': 5, '2020-02': -2}})
+
+    def test_stats_churn_without_commits(self):
+        self.arguments['--churn'] = True
+        self.arguments['--commits'] = False
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).execute(), 1)
+
+    def test_since_invalid(self):
+        self.arguments['MONTH'] = None
+        self.arguments['--since'] = '2020-13-01'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).execute(), 1)
+        self.arguments['--since'] = '2020-03-01'
+        self.arguments['--until'] = '2020-01-31'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).execute(), 1)
+        self.arguments['--until'] = None
+        self.arguments['--period'] = 'fake-period'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).execute(), 1)
+
+    def test_estimate_offline(self):
+        self.arguments['--estimate'] = True
+        self.arguments['--offline'] = True
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).execute(), 1)
+
+    def test_strategy_invalid(self):
+        self.arguments['--strategy'] = 'fake-strategy'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).execute(), 1)
+
+    def test_workers_invalid(self):
+        self.arguments['--workers'] = 'fake-workers'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).workers(), 1)
+
+    def test_workers_backend_default(self):
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).workers(), 1)
+        self.arguments['--backend'] = 'async'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).workers(), Command.BACKEND_WORKERS['async'])
+        self.arguments['--workers'] = '2'
+        self.assertEqual(CLI(self.arguments).command(self.__create_mock_client_stats()).workers(), 2)
+
+class TestSync(CommandTestCase, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.arguments['sync'] = True
+        self.arguments['MONTH'] = None
+        self.arguments['--repos'] = ['fake-repo1']
+        self.store_file, self.arguments['--store'] = tempfile.mkstemp()
+
+    def tearDown(self):
+        os.close(self.store_file)
+        os.remove(self.arguments['--store'])
+
+    def command_name(self):
+        return "sync"
+
+    @patch('client.GHClient')
+    def __create_mock_client_sync(self, MockGHClient):
+        client = MockGHClient()
+        repo = Mock(full_name='knative/fake-repo1')
+        repo.name = 'fake-repo1'
+        repo.get_pulls.return_value = []
+        repo.get_issues.return_value = []
+        repo.get_stats_contributors.return_value = []
+        class Repos(list):
+            @property
+            def totalCount(self):
+                return len(self)
+        client.repos.return_value = Repos([repo])
+        client.repo.side_effect = lambda org, name: next((repo for repo in client.repos.return_value if repo.name == name), None)
+        return client
+
+    def test_execute(self):
+        client = self.__create_mock_client_sync()
+        rc = CLI(self.arguments).command(client).execute()
+        self.assertEqual(rc, 0)
+        store = EventStore(self.arguments['--store'])
+        self.assertEqual(store.repos('knative'), [('fake-repo1', 'knative/fake-repo1')])
+        store.close()
+
+    def test_offline(self):
+        self.arguments['--offline'] = True
+        self.assertFalse(CLI(self.arguments).command().check_required_options())
+
+    def test_backend(self):
+        self.arguments['--backend'] = 'async'
+        self.assertFalse(CLI(self.arguments).command(self.__create_mock_client_sync()).check_required_options())
+        self.arguments['--backend'] = 'graphql'
+        self.assertTrue(CLI(self.arguments).command(self.__create_mock_client_sync()).check_required_options())
+
+class TestGitBackend(TestCase):
+    def __git(self, *args, env={}):
+        subprocess.run(['git'] + list(args), check=True, capture_output=True, env=dict(os.environ, **env))
+
+    def __commit(self, source, date):
+        env = {'GIT_AUTHOR_NAME': 'fake', 'GIT_AUTHOR_EMAIL': '1+fake-user1@users.noreply.github.com', 'GIT_AUTHOR_DATE': date,
+               'GIT_COMMITTER_NAME': 'fake', 'GIT_COMMITTER_EMAIL': 'fake@example.com', 'GIT_COMMITTER_DATE': date}
+        self.__git('-C', source, 'commit', '--quiet', '--allow-empty', '-m', date, env=env)
+
+    # commits of the whole last day of MONTH are counted
+    def test_commits_last_day(self):
+        year = datetime.now().year
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = os.path.join(tmp_dir, 'source')
+            self.__git('init', '--quiet', source)
+            self.__commit(source, '{year}-01-31T18:00:00Z'.format(year=year))
+            self.__commit(source, '{year}-02-01T00:00:00Z'.format(year=year))
+            mirrors = GitMirrors(os.path.join(tmp_dir, 'mirrors'))
+            client = GHGitClient('fake-access-token', mirrors, Mock())
+            client.mirror_url = lambda repo: source
+            repo = Mock(full_name='fake-org/fake-repo1')
+            repo.name = 'fake-repo1'
+            client.repo = lambda org, name: repo
+            arguments = dict(CommandTestCase.TEST_ARGS, stats=False, commits=True, **{'--backend': 'git', '--users': ['fake-user1'], '--repos': ['fake-repo1'], '--skip-repos': []})
+            command = CLI(arguments).command(client)
+            self.assertEqual(command.execute(), 0)
+            self.assertEqual(command.users_commits['fake-user1'], {'fake-repo1': 1})
+            mirrors.close()
+
+class TestOffline(TestCase):
+    def test_offline_client(self):
+        store_file, store_path = tempfile.mkstemp()
+        try:
+            arguments = CommandTestCase.TEST_ARGS.copy()
+            arguments.update({'--offline': True, '--store': store_path, '--access-token': ''})
+            command = CLI(arguments).command()
+            self.assertTrue(isinstance(command.client, StoreClient))
+            self.assertTrue(command.check_credentials())
+            self.assertEqual(command.execute(), 0)
+            command.client.store.close()
+        finally:
+            os.close(store_file)
+            os.remove(store_path)
+
+    # the synced repo is counted on a counting worker thread, not the thread that opened the store
+    def test_offline_synced_repo(self):
+        store_file, store_path = tempfile.mkstemp()
+        output_file, output_path = tempfile.mkstemp()
+        try:
+            repo = Mock(full_name='fake-org/fake-repo1')
+            repo.name = 'fake-repo1'
+            pr = Mock(number=1, user=Mock(login='fake-user1'), state='closed', created_at=datetime(datetime.now().year, 1, 10), updated_at=datetime(datetime.now().year, 1, 11))
+            pr.get_reviews.return_value = []
+            repo.get_pulls.return_value = [pr]
+            repo.get_issues.return_value = []
+            repo.get_stats_contributors.return_value = []
+            store = EventStore(store_path)
+            store.sync_repo(GHClient('fake-access-token', Mock()), 'fake-org', repo)
+            store.close()
+            arguments = CommandTestCase.TEST_ARGS.copy()
+            arguments.update({'--offline': True, '--store': store_path, '--access-token': '', '--repos': ['fake-repo1'], '--skip-repos': [],
+                              '--prs': True, '--output': 'csv', '--file': output_path})
+            command = CLI(arguments).command()
+            self.assertEqual(command.execute(), 0)
+            command.client.store.close()
+            with open(output_path) as f:
+                self.assertIn('fake-user1', f.read())
+        finally:
+            os.close(store_file)
+            os.remove(store_path)
+            os.close(output_file)
+            os.remove(output_path)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
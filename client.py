@@ -12,129 +12,311 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
-from github import Github
+from github import Github, UnknownObjectException
 
 from common import *
+from connection import install_connection
+from periods import period_key
+
+SEARCH_DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# sparse counts of every author seen, for counts methods called with authors=None
+class AllAuthorsCounts(Counter):
+    def __contains__(self, author):
+        return author != None
 
 class GHClient:
-    def __init__(self, access_token, client=None):
+    # the Search API returns at most this many results of a query
+    SEARCH_MAX_RESULTS = 1000
+    # like the issues listing, issues searches also match PRs
+    SEARCH_KINDS = {'pr': 'is:pr ', 'issue': ''}
+    def __init__(self, access_token, client=None, cache=None, base_url=None):
         self.client = client
         self.access_token = access_token
+        self.cache = cache
+        self.base_url = base_url
         self.rate_limit_data = RateLimitData(0, 0)
-        self.api_calls = 0
+        self.rate_limiter = RateLimiter(self.rate_limit_data)
+        self.adaptive_rate_limiter = None
+        self.workers = 1
+        self.executor = None
+        self.period = None
+        self.__repos = {}
+        self.__repos_by_name = {}
 
+    # weeks are compared with their year for ranges over several years
     def _week_in(self, week_date, start_date, end_date):
-        week_number = week_date.date().isocalendar()[1]
-        start_week = start_date.date().isocalendar()[1]
-        end_week = end_date.date().isocalendar()[1]
+        week_number = tuple(week_date.date().isocalendar()[:2])
+        start_week = tuple(start_date.date().isocalendar()[:2])
+        end_week = tuple(end_date.date().isocalendar()[:2])
         if week_number >= start_week and week_number <= end_week:
             return True
         return False
 
+    # authors=None counts all authors
     def _init_authors_count_map(self, authors):
+        if authors == None:
+            return AllAuthorsCounts()
         authors_count = {}
         for author in authors:
-            authors_count[author] = 0
+            authors_count[author] = 0 if self.period == None else {}
         return authors_count
 
+    # counts are {author: count}, or {author: {period_key: count}} when counting per period
+    def _count(self, counts, author, date, count=1):
+        if self.period == None:
+            counts[author] += count
+        else:
+            key = period_key(self.period, to_utc(date))
+            author_counts = counts.setdefault(author, {})
+            author_counts[key] = author_counts.get(key, 0) + count
+
     def _count_check_api_calls(self):
-        if not self.rate_limit_data.enabled:
-            return
-        self.api_calls += 1
-        if self.api_calls >= self.rate_limit_data.max_calls():
-            Console.println()
-            Console.warn("Rate limit API calls reach '{max_calls}' and sleeping for '{sleep}' seconds".format(max_calls=self.rate_limit_data.max_calls(), sleep=self.rate_limit_data.sleep()))
-            time.sleep(self.rate_limit_data.sleep())
-            self.api_calls = 0
+        self.rate_limiter.count_call()
+
+    # calls func on each item, in parallel on the threads of the client executor, which is shared by the repos
+    # counted in parallel: at most self.workers items are in flight, on top of the listings of the --workers
+    # threads counting repos, so up to about twice self.workers requests are in flight in total
+    def _map(self, func, items):
+        if self.executor == None:
+            return map(func, items)
+        return list(self.executor.map(func, items))
 
     def set_rate_limit_data(self, rl):
         self.rate_limit_data = rl
+        self.rate_limiter = RateLimiter(rl)
+
+    # paces every HTTP request, including pages of listings, from GitHub rate limit headers
+    def set_adaptive_rate_limiter(self, limiter):
+        self.adaptive_rate_limiter = limiter
+
+    def set_workers(self, workers):
+        self.workers = workers
+        if self.executor != None:
+            self.executor.shutdown()
+        self.executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
 
+    # the *_counts methods then count per 'week', 'month', or 'quarter' in one pass
+    def set_period(self, period):
+        self.period = period
+
+    def cost_summary(self):
+        summaries = []
+        if self.adaptive_rate_limiter != None:
+            summaries.append("GitHub API calls: {calls}, rate limit sleeps: {slept} seconds".format(calls=self.adaptive_rate_limiter.calls(), slept=int(self.adaptive_rate_limiter.slept())))
+            if isinstance(self.adaptive_rate_limiter, TokenPool):
+                summaries.append(self.adaptive_rate_limiter.summary())
+        if self.cache != None:
+            summaries.append("GitHub API cache: {hits} responses revalidated, {misses} fetched".format(hits=self.cache.hits, misses=self.cache.misses))
+        return '\n'.join(summaries)
+
+    # PyGithub's own persistent connection is not thread safe, the installed one is
     def get_client(self):
         if self.client == None:
-            self.client = Github(self.access_token)
+            install_connection(self.cache, self.adaptive_rate_limiter)
+            if self.base_url != None:
+                self.client = Github(self.access_token, base_url=self.base_url)
+            else:
+                self.client = Github(self.access_token)
         return self.client
 
+    # PyGithub connections are released by the Github client itself
+    def close(self):
+        pass
+
+    # the repos of org are listed once per client, i.e., once per process
     def repos(self, org):
+        if org not in self.__repos:
+            self.__repos[org] = Repos(self._list_repos(org))
+            self.__repos_by_name[org] = {repo.name: repo for repo in self.__repos[org]}
+        return self.__repos[org]
+
+    def _list_repos(self, org):
         self._count_check_api_calls()
         ghorg = self.get_client().get_organization(org)
         return ghorg.get_repos()
 
-    def reviews_count(self, repo, author, start_date, end_date, pr_state='close'):
+    # one call for a named repo of org, unless org is already listed, or None when there is no such repo
+    def repo(self, org, name):
+        if org in self.__repos:
+            return self.__repos_by_name[org].get(name)
+        return self._get_repo(org, name)
+
+    def _get_repo(self, org, name):
         self._count_check_api_calls()
-        prs = repo.get_pulls(state=pr_state)
-        reviews_count = 0
+        try:
+            return self.get_client().get_repo("{org}/{name}".format(org=org, name=name))
+        except UnknownObjectException:
+            return None
+
+    # items must be listed newest first on date_attr, e.g., sort='created', direction='desc'
+    # so that paging stops at the first item older than start_date
+    def _items_in(self, items, start_date, end_date, date_attr='created_at'):
+        for item in items:
+            item_date = to_utc(getattr(item, date_attr))
+            if item_date > end_date:
+                continue
+            if item_date < start_date:
+                break
+            yield item
+
+    # reviews submitted after start_date update their PR, so PRs are listed by
+    # most recently updated and paging stops at the first PR not updated since start_date
+    def _prs_updated_since(self, repo, start_date, pr_state):
+        prs = repo.get_pulls(state=pr_state, sort='updated', direction='desc')
         for pr in prs:
+            if to_utc(pr.updated_at) < start_date:
+                break
+            yield pr
+
+    # yields (pr, reviews) for PRs updated since start_date, fetching reviews on self.workers threads
+    def _prs_reviews(self, repo, start_date, pr_state):
+        def pr_reviews(pr):
             self._count_check_api_calls()
-            reviews = pr.get_reviews()
+            return pr, list(pr.get_reviews())
+        return self._map(pr_reviews, self._prs_updated_since(repo, start_date, pr_state))
+
+    def _prs_created_in(self, repo, start_date, end_date, state):
+        prs = repo.get_pulls(state=state, sort='created', direction='desc')
+        return self._items_in(prs, start_date, end_date)
+
+    def _issues_created_in(self, repo, start_date, end_date, state):
+        issues = repo.get_issues(state=state, since=start_date, sort='created', direction='desc')
+        return self._items_in(issues, start_date, end_date)
+
+    def reviews_count(self, repo, author, start_date, end_date, pr_state='close'):
+        self._count_check_api_calls()
+        reviews_count = 0
+        for pr, reviews in self._prs_reviews(repo, start_date, pr_state):
             for r in reviews:
                 try:
-                    if r.user.login == author and (r.submitted_at >= start_date and r.submitted_at <= end_date):
+                    if r.user.login == author and (to_utc(r.submitted_at) >= start_date and to_utc(r.submitted_at) <= end_date):
                         reviews_count += 1
                 except Exception as e:
                     Console.warn("problem reading review: {r_id} from pr: {pr_id}, message: {message}".format(r_id=r.id, pr_id=pr.id, message=e.__str__()))
         return reviews_count
 
+    def _count_reviews(self, reviews_counts, pr, reviews, start_date, end_date):
+        for r in reviews:
+            try:
+                if r.user.login in reviews_counts and (to_utc(r.submitted_at) >= start_date and to_utc(r.submitted_at) <= end_date):
+                    self._count(reviews_counts, r.user.login, r.submitted_at)
+            except Exception as e:
+                Console.warn("problem reading review: {r_id} from pr: {pr_id}, message: {message}".format(r_id=r.id, pr_id=pr.id, message=e.__str__()))
+
     def reviews_counts(self, repo, authors, start_date, end_date, pr_state='close'):
         self._count_check_api_calls()
-        prs = repo.get_pulls(state=pr_state)
         reviews_counts = self._init_authors_count_map(authors)
-        for pr in prs:
-            self._count_check_api_calls()
-            reviews = pr.get_reviews()
-            for r in reviews:
-                try:
-                    if r.user.login in authors and (r.submitted_at >= start_date and r.submitted_at <= end_date):
-                        if r.user.login in reviews_counts:
-                            reviews_counts[r.user.login] += 1
-                except Exception as e:
-                    Console.warn("problem reading review: {r_id} from pr: {pr_id}, message: {message}".format(r_id=r.id, pr_id=pr.id, message=e.__str__()))
+        for pr, reviews in self._prs_reviews(repo, start_date, pr_state):
+            self._count_reviews(reviews_counts, pr, reviews, start_date, end_date)
         return reviews_counts
 
+    # returns (prs_counts, reviews_counts) from the one listing of the PRs updated since start_date, which
+    # has every PR created since then, instead of also listing the PRs by creation date for the prs counts
+    def prs_reviews_counts(self, repo, authors, start_date, end_date, state='close'):
+        self._count_check_api_calls()
+        prs_counts = self._init_authors_count_map(authors)
+        reviews_counts = self._init_authors_count_map(authors)
+        for pr, reviews in self._prs_reviews(repo, start_date, state):
+            created_at = to_utc(pr.created_at)
+            if pr.user != None and pr.user.login in prs_counts and created_at >= start_date and created_at <= end_date:
+                self._count(prs_counts, pr.user.login, pr.created_at)
+            self._count_reviews(reviews_counts, pr, reviews, start_date, end_date)
+        return prs_counts, reviews_counts
+
     def prs_count(self, repo, author, start_date, end_date, state='close'):
         self._count_check_api_calls()
-        prs = repo.get_pulls(state=state)
         prs_count = 0
-        for pr in prs:
-            if pr.user.login == author and (pr.created_at >= start_date and pr.created_at <= end_date):
+        for pr in self._prs_created_in(repo, start_date, end_date, state):
+            if pr.user.login == author:
                 prs_count += 1
         return prs_count
 
     def prs_counts(self, repo, authors, start_date, end_date, state='close'):
         self._count_check_api_calls()
-        prs = repo.get_pulls(state=state)
         prs_counts = self._init_authors_count_map(authors)
-        for pr in prs:
-            if pr.user.login in authors and (pr.created_at >= start_date and pr.created_at <= end_date):
-                if pr.user.login in prs_counts:
-                    prs_counts[pr.user.login] += 1
+        for pr in self._prs_created_in(repo, start_date, end_date, state):
+            if pr.user.login in prs_counts:
+                self._count(prs_counts, pr.user.login, pr.created_at)
         return prs_counts
 
     def issues_count(self, repo, author, start_date, end_date, state='close'):
         self._count_check_api_calls()
-        issues = repo.get_issues(state=state, since=start_date)
         issues_count = 0
-        for i in issues:
-            if i.user.login == author and (i.created_at >= start_date and i.created_at <= end_date):
+        for i in self._issues_created_in(repo, start_date, end_date, state):
+            if i.user.login == author:
                 issues_count += 1
         return issues_count
 
     def issues_counts(self, repo, authors, start_date, end_date, state='close'):
         self._count_check_api_calls()
-        issues = repo.get_issues(state=state, since=start_date)
         issues_counts = self._init_authors_count_map(authors)
-        for i in issues:
-            if i.user.login in authors and (i.created_at >= start_date and i.created_at <= end_date):
-                if i.user.login in issues_counts:
-                    issues_counts[i.user.login] += 1
+        for i in self._issues_created_in(repo, start_date, end_date, state):
+            if i.user.login in issues_counts:
+                self._count(issues_counts, i.user.login, i.created_at)
         return issues_counts
 
+    # searches all repos of org, or only repo_name
+    def _search_query(self, org, kind, author, start_date, end_date, state, repo_name=None):
+        scope = "org:{org}".format(org=org) if repo_name == None else "repo:{org}/{repo}".format(org=org, repo=repo_name)
+        return "{scope} {kind}author:{author} is:{state} created:{start}..{end}".format(scope=scope, kind=self.SEARCH_KINDS[kind], author=author, state=state,
+                                                                                       start=start_date.strftime(SEARCH_DATE_FORMAT), end=end_date.strftime(SEARCH_DATE_FORMAT))
+
+    # returns {repo_name: count} of the items found by query, or None when there are more than the Search API returns;
+    # a search in repo_name only needs the total of its first page, which is exact whatever the number of items
+    def _search_repos_counts(self, query, repo_name=None):
+        self._count_check_api_calls()
+        results = self.get_client().search_issues(query)
+        if repo_name != None:
+            return {repo_name: results.totalCount} if results.totalCount > 0 else {}
+        repos_counts = {}
+        for item in results:
+            if results.totalCount > self.SEARCH_MAX_RESULTS:
+                return None
+            item_repo_name = item.repository_url.split('/')[-1]
+            repos_counts[item_repo_name] = repos_counts.get(item_repo_name, 0) + 1
+        return repos_counts
+
+    # returns {author: {repo_name: count}} of the PRs or issues created by each author in all repos of org, or in repo_name,
+    # from one search per author, authors with too many results to search are left out to be listed instead
+    def search_counts(self, org, kind, authors, start_date, end_date, state='closed', repo_name=None):
+        authors_repos_counts = self._map(lambda author: self._search_repos_counts(self._search_query(org, kind, author, start_date, end_date, state, repo_name), repo_name), authors)
+        return self._search_counts(kind, authors, authors_repos_counts)
+
+    def _search_counts(self, kind, authors, authors_repos_counts):
+        search_counts = {}
+        for author, repos_counts in zip(authors, authors_repos_counts):
+            if repos_counts == None:
+                Console.warn("more than {max_results} {kind}s of user: '{author}' to search, listing them instead".format(max_results=self.SEARCH_MAX_RESULTS, kind=kind, author=author))
+                continue
+            search_counts[author] = repos_counts
+        return search_counts
+
+    # totals of a listing cost one call for its first page of one item
+    def prs_total(self, repo, state='closed'):
+        self._count_check_api_calls()
+        return repo.get_pulls(state=state).totalCount
+
+    def issues_total(self, repo, state='closed'):
+        self._count_check_api_calls()
+        return repo.get_issues(state=state).totalCount
+
+    # PyGithub returns None for the 202 of stats still being computed, and for the 204 of empty repos
+    def _stats_contributors(self, repo):
+        stats_contributors = repo.get_stats_contributors()
+        if stats_contributors == None:
+            if repo.size == 0:
+                return []
+            raise StatsComputingException("contributors stats for repo: '{repo}' are being computed by GitHub".format(repo=repo.full_name))
+        return stats_contributors
+
     def commits_count(self, repo, author, start_date, end_date):
         commits_count = 0
         self._count_check_api_calls()
-        for sc in repo.get_stats_contributors():
+        for sc in self._stats_contributors(repo):
             if sc.author.login == author:
                 for w in sc.weeks:
                     if self._week_in(w.w, start_date, end_date): 
@@ -142,12 +324,20 @@ class GHClient:
         return commits_count
 
     def commits_counts(self, repo, authors, start_date, end_date):
+        return self.commits_churn_counts(repo, authors, start_date, end_date)[0]
+
+    # returns (commits_counts, additions_counts, deletions_counts) since each week of the contributors
+    # stats also has the lines added and deleted by its commits
+    def commits_churn_counts(self, repo, authors, start_date, end_date):
         commits_counts = self._init_authors_count_map(authors)
+        additions_counts = self._init_authors_count_map(authors)
+        deletions_counts = self._init_authors_count_map(authors)
         self._count_check_api_calls()
-        for sc in repo.get_stats_contributors():
-            if sc.author.login in authors:
+        for sc in self._stats_contributors(repo):
+            if sc.author != None and sc.author.login in commits_counts:
                 for w in sc.weeks:
                     if self._week_in(w.w, start_date, end_date):
-                        if sc.author.login in commits_counts:
-                            commits_counts[sc.author.login] += w.c
-        return commits_counts
+                        self._count(commits_counts, sc.author.login, w.w, w.c)
+                        self._count(additions_counts, sc.author.login, w.w, w.a)
+                        self._count(deletions_counts, sc.author.login, w.w, w.d)
+        return commits_counts, additions_counts, deletions_counts
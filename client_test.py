@@ -16,6 +16,7 @@ import os, cli, unittest
 
 from unittest.mock import patch, Mock
 from datetime import datetime, timedelta
+from github import UnknownObjectException
 from client import *
 
 class TestGHClient(unittest.TestCase):
@@ -44,6 +45,7 @@ class TestGHClient(unittest.TestCase):
                 self.no = no
                 self.user = FakeUser(no)
                 self.created_at = datetime.now()
+                self.updated_at = self.created_at
 
         class FakeReview(Fake):
             def __init__(self, no):
@@ -66,6 +68,8 @@ class TestGHClient(unittest.TestCase):
             def __init__(self, commit_count):
                 self.w = datetime.now()
                 self.c = commit_count
+                self.a = 10 * commit_count
+                self.d = commit_count
 
         class FakeStatContributor(Fake):
             def __init__(self, no, weeks):
@@ -77,13 +81,13 @@ class TestGHClient(unittest.TestCase):
             def __init__(self, name):
                 self.name = name
 
-            def get_pulls(self, state='close'):
+            def get_pulls(self, state='close', sort=None, direction=None):
                 fake_reviews0 = [FakeReview(0), FakeReview(0), FakeReview(0)]
                 fake_reviews1 = [FakeReview(1), FakeReview(1)]
                 fake_reviews2 = [FakeReview(2)]
                 return [FakePullRequest(0, fake_reviews0), FakePullRequest(1, fake_reviews1), FakePullRequest(1), FakePullRequest(2), FakePullRequest(2, fake_reviews2), FakePullRequest(2)]
 
-            def get_issues(self, since=datetime.now(), state='close'):
+            def get_issues(self, since=datetime.now(), state='close', sort=None, direction=None):
                 return [FakeIssue(0), FakeIssue(1), FakeIssue(1), FakeIssue(2), FakeIssue(2), FakeIssue(2)]
 
             def get_stats_contributors(self):
@@ -103,6 +107,22 @@ class TestGHClient(unittest.TestCase):
         self.assertTrue(self.client.repos('fake-org') != None)
         self.assertTrue(len(self.client.repos('fake-org')) == 3)
 
+    def test_repos_listed_once(self):
+        self.client.repos('fake-org')
+        self.client.repos('fake-org')
+        self.assertEqual(self.client.get_client().get_organization.call_count, 1)
+        self.assertEqual(self.client.repo('fake-org', 'fake-repo1').name, 'fake-repo1')
+        self.assertEqual(self.client.repo('fake-org', 'unknown-repo'), None)
+        self.assertEqual(self.client.get_client().get_repo.call_count, 0)
+
+    def test_repo(self):
+        ghclient = self.client.get_client()
+        ghclient.get_repo.side_effect = lambda full_name: Mock(full_name=full_name)
+        self.assertEqual(self.client.repo('fake-org', 'fake-repo1').full_name, 'fake-org/fake-repo1')
+        ghclient.get_repo.side_effect = UnknownObjectException(404, {'message': 'Not Found'}, {})
+        self.assertEqual(self.client.repo('fake-org', 'unknown-repo'), None)
+        self.assertEqual(ghclient.get_organization.call_count, 0)
+
     def test_reviews_count(self):
         fake_repo = self.client.repos('fake-org')[0]
         reviews_count = self.client.reviews_count(fake_repo, 'user0', self.start_date, datetime.now()+timedelta(days=1))
@@ -139,6 +159,125 @@ class TestGHClient(unittest.TestCase):
         self.assertTrue(issues_counts['user1'] == 2)
         self.assertTrue(issues_counts['user2'] == 3)
 
+    def __listing(self, items):
+        for item in items:
+            yield item
+        self.fail("listing paged past start_date")
+
+    def __fake_item(self, login, date):
+        return Mock(user=Mock(login=login), created_at=date, updated_at=date, submitted_at=date)
+
+    def __fake_repo_listing(self):
+        end_date = self.start_date + timedelta(days=1)
+        newer = self.__fake_item('user0', end_date + timedelta(days=1))
+        inside = self.__fake_item('user0', self.start_date + timedelta(hours=1))
+        older = self.__fake_item('user0', self.start_date - timedelta(days=1))
+        inside.get_reviews.return_value = [self.__fake_item('user0', self.start_date + timedelta(hours=2))]
+        newer.get_reviews.return_value = [self.__fake_item('user0', end_date + timedelta(days=1))]
+        repo = Mock()
+        repo.get_pulls.side_effect = lambda **kwargs: self.__listing([newer, inside, older])
+        repo.get_issues.side_effect = lambda **kwargs: self.__listing([newer, inside, older])
+        return repo, end_date
+
+    def test_prs_counts_stops_at_start_date(self):
+        repo, end_date = self.__fake_repo_listing()
+        prs_counts = self.client.prs_counts(repo, ['user0'], self.start_date, end_date, 'closed')
+        self.assertEqual(prs_counts['user0'], 1)
+        repo.get_pulls.assert_called_with(state='closed', sort='created', direction='desc')
+
+    def test_issues_counts_stops_at_start_date(self):
+        repo, end_date = self.__fake_repo_listing()
+        issues_counts = self.client.issues_counts(repo, ['user0'], self.start_date, end_date, 'closed')
+        self.assertEqual(issues_counts['user0'], 1)
+        repo.get_issues.assert_called_with(state='closed', since=self.start_date, sort='created', direction='desc')
+
+    def test_reviews_counts_stops_at_start_date(self):
+        repo, end_date = self.__fake_repo_listing()
+        reviews_counts = self.client.reviews_counts(repo, ['user0'], self.start_date, end_date, 'closed')
+        self.assertEqual(reviews_counts['user0'], 1)
+        repo.get_pulls.assert_called_with(state='closed', sort='updated', direction='desc')
+
+    def test_counts_period(self):
+        repo = Mock()
+        items = [self.__fake_item('user0', datetime(2020, 8, 3)), self.__fake_item('user1', datetime(2020, 7, 20)),
+                 self.__fake_item('user0', datetime(2020, 7, 2)), self.__fake_item('user0', datetime(2020, 7, 1))]
+        repo.get_pulls.side_effect = lambda **kwargs: iter(items)
+        self.client.set_period('month')
+        prs_counts = self.client.prs_counts(repo, ['user0', 'user1', 'user2'], datetime(2020, 7, 1), datetime(2020, 8, 31), 'closed')
+        self.assertEqual(prs_counts, {'user0': {'2020-07': 2, '2020-08': 1}, 'user1': {'2020-07': 1}, 'user2': {}})
+
+    def test_counts_all_authors(self):
+        repo = Mock()
+        items = [self.__fake_item('user0', datetime(2020, 8, 3)), self.__fake_item('user1', datetime(2020, 7, 20)),
+                 self.__fake_item('user0', datetime(2020, 7, 2)), self.__fake_item('user3', datetime(2020, 6, 30))]
+        repo.get_pulls.side_effect = lambda **kwargs: iter(items)
+        self.assertEqual(self.client.prs_counts(repo, None, datetime(2020, 7, 1), datetime(2020, 8, 31), 'closed'), {'user0': 2, 'user1': 1})
+        self.client.set_period('month')
+        self.assertEqual(self.client.prs_counts(repo, None, datetime(2020, 7, 1), datetime(2020, 8, 31), 'closed'), {'user0': {'2020-07': 1, '2020-08': 1}, 'user1': {'2020-07': 1}})
+
+    def test_reviews_counts_all_authors(self):
+        fake_repo = self.client.repos('fake-org')[0]
+        reviews_counts = self.client.reviews_counts(fake_repo, None, self.start_date, datetime.now()+timedelta(days=1))
+        self.assertEqual(reviews_counts, {'user0': 3, 'user1': 2, 'user2': 1})
+
+    def test_week_in_over_years(self):
+        self.assertTrue(self.client._week_in(datetime(2020, 12, 30), datetime(2020, 12, 1), datetime(2021, 1, 31)))
+        self.assertTrue(self.client._week_in(datetime(2021, 1, 6), datetime(2020, 12, 1), datetime(2021, 1, 31)))
+        self.assertFalse(self.client._week_in(datetime(2021, 1, 6), datetime(2020, 1, 1), datetime(2020, 1, 31)))
+
+    def test_prs_reviews_counts(self):
+        fake_repo = self.client.repos('fake-org')[0]
+        authors, end_date = ['user0', 'user1', 'user2'], datetime.now()+timedelta(days=1)
+        self.assertEqual(self.client.prs_reviews_counts(fake_repo, authors, self.start_date, end_date),
+                         (self.client.prs_counts(fake_repo, authors, self.start_date, end_date), self.client.reviews_counts(fake_repo, authors, self.start_date, end_date)))
+
+    def test_reviews_counts_workers(self):
+        self.client.set_workers(4)
+        fake_repo = self.client.repos('fake-org')[0]
+        reviews_counts = self.client.reviews_counts(fake_repo, ['user0', 'user1', 'user2'], self.start_date, datetime.now()+timedelta(days=1))
+        self.assertEqual(reviews_counts, {'user0': 3, 'user1': 2, 'user2': 1})
+        # repos counted in parallel share the client executor
+        executor = self.client.executor
+        self.client.reviews_counts(fake_repo, ['user0'], self.start_date, datetime.now()+timedelta(days=1))
+        self.assertIs(self.client.executor, executor)
+        self.assertEqual(executor._max_workers, 4)
+
+    def test_count_check_api_calls(self):
+        self.client.set_rate_limit_data(RateLimitData(100, 1, True))
+        fake_repo = self.client.repos('fake-org')[0]
+        self.client.reviews_counts(fake_repo, ['user0'], self.start_date, datetime.now()+timedelta(days=1))
+        # repos listing, PRs listing, and one reviews listing per PR
+        self.assertEqual(self.client.rate_limiter.calls(), 8)
+
+    def __search_results(self, repos_names, total_count=None):
+        results = Mock()
+        results.__iter__ = lambda _: iter([Mock(repository_url="https://api.github.com/repos/fake-org/{name}".format(name=name)) for name in repos_names])
+        results.totalCount = len(repos_names) if total_count == None else total_count
+        return results
+
+    def test_search_counts(self):
+        end_date = datetime(2020, 7, 31)
+        searches = {'user0': self.__search_results(['fake-repo0', 'fake-repo1', 'fake-repo0']), 'user1': self.__search_results([])}
+        self.client.get_client().search_issues.side_effect = lambda query: searches[query.split('author:')[1].split()[0]]
+        search_counts = self.client.search_counts('fake-org', 'pr', ['user0', 'user1'], datetime(2020, 7, 1), end_date, 'closed')
+        self.assertEqual(search_counts, {'user0': {'fake-repo0': 2, 'fake-repo1': 1}, 'user1': {}})
+        self.client.get_client().search_issues.assert_called_with('org:fake-org is:pr author:user1 is:closed created:2020-07-01T00:00:00Z..2020-07-31T00:00:00Z')
+
+    def test_search_counts_too_many_results(self):
+        self.client.get_client().search_issues.return_value = self.__search_results(['fake-repo0'], 1001)
+        search_counts = self.client.search_counts('fake-org', 'issue', ['user0'], datetime(2020, 7, 1), datetime(2020, 7, 31), 'open')
+        self.assertEqual(search_counts, {})
+        self.client.get_client().search_issues.assert_called_with('org:fake-org author:user0 is:open created:2020-07-01T00:00:00Z..2020-07-31T00:00:00Z')
+
+    # a search in one repo only reads the total, even with more items than the Search API returns
+    def test_search_counts_repo(self):
+        results = self.__search_results([], 1500)
+        results.__iter__ = Mock(side_effect=AssertionError('searched items iterated'))
+        self.client.get_client().search_issues.return_value = results
+        search_counts = self.client.search_counts('fake-org', 'pr', ['user0'], datetime(2020, 7, 1), datetime(2020, 7, 31), 'closed', 'fake-repo0')
+        self.assertEqual(search_counts, {'user0': {'fake-repo0': 1500}})
+        self.client.get_client().search_issues.assert_called_with('repo:fake-org/fake-repo0 is:pr author:user0 is:closed created:2020-07-01T00:00:00Z..2020-07-31T00:00:00Z')
+
     def test_commits_count(self):
         fake_repo = self.client.repos('fake-org')[0]
         commits_count = self.client.commits_count(fake_repo, 'user0', self.start_date, datetime.now()+timedelta(days=1))
@@ -151,5 +290,20 @@ class TestGHClient(unittest.TestCase):
         self.assertTrue(commits_counts['user1'] == 1)
         self.assertTrue(commits_counts['user2'] == 0)
 
+    def test_commits_churn_counts(self):
+        fake_repo = self.client.repos('fake-org')[0]
+        commits_counts, additions_counts, deletions_counts = self.client.commits_churn_counts(fake_repo, ['user0', 'user1'], self.start_date, datetime.now()+timedelta(days=1))
+        self.assertEqual(commits_counts, {'user0': 3, 'user1': 1})
+        self.assertEqual(additions_counts, {'user0': 30, 'user1': 10})
+        self.assertEqual(deletions_counts, {'user0': 3, 'user1': 1})
+
+    def test_commits_counts_computing(self):
+        fake_repo = Mock(full_name='fake-org/fake-repo0', size=10)
+        fake_repo.get_stats_contributors.return_value = None
+        with self.assertRaises(StatsComputingException):
+            self.client.commits_counts(fake_repo, ['user0'], self.start_date, datetime.now())
+        fake_repo.size = 0
+        self.assertEqual(self.client.commits_counts(fake_repo, ['user0'], self.start_date, datetime.now()), {'user0': 0})
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -12,11 +12,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import sys
+import sys, math, time, threading
+from datetime import timezone
 from random import randint
 
 VERBOSE=False
 
+# GitHub answers 202 while it computes the stats of a repo, which are ready on a later request
+class StatsComputingException(Exception):
+    pass
+
+# PyGithub 2 dates are timezone aware while ght dates are naive UTC
+def to_utc(date):
+    if date != None and date.tzinfo != None:
+        return date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+# repos of an org listing, with the totalCount of PyGithub paginated lists
+class Repos(list):
+    @property
+    def totalCount(self):
+        return len(self)
+
 class Colors:
     HEADER = '\033[95m'
     OKBLUE = '\033[94m'
@@ -92,5 +109,238 @@ class RateLimitData:
     def set_max_calls(self, int_value):
         self.__max_calls = int_value
 
+    # seconds RateLimiter sleeps to make calls, on average when random
+    def projected_sleep(self, calls):
+        if not self.__enabled or self.__max_calls <= 0:
+            return 0
+        if self.__random:
+            return (calls // ((self.__max_calls + 1) / 2)) * (self.__sleep + 1) / 2
+        return (calls // self.__max_calls) * self.__sleep
+
     def set_sleep(self, int_value):
         self.__sleep = int_value
+
+# Thread safe count of API calls that sleeps once RateLimitData max calls are reached,
+# shared by all threads collecting stats
+class RateLimiter:
+    def __init__(self, rate_limit_data):
+        self.rate_limit_data = rate_limit_data
+        self.__lock = threading.Lock()
+        self.__calls = 0
+        self.__max_calls = None
+        self.__total_calls = 0
+
+    def calls(self):
+        return self.__calls
+
+    def total_calls(self):
+        return self.__total_calls
+
+    def count_call(self):
+        with self.__lock:
+            self.__total_calls += 1
+            if not self.rate_limit_data.enabled():
+                return
+            if self.__max_calls == None:
+                self.__max_calls = self.rate_limit_data.max_calls()
+            self.__calls += 1
+            if self.__calls >= self.__max_calls:
+                sleep = self.rate_limit_data.sleep()
+                Console.println()
+                Console.warn("Rate limit API calls reach '{max_calls}' and sleeping for '{sleep}' seconds".format(max_calls=self.__max_calls, sleep=sleep))
+                # sleeping with the lock held also pauses the other threads
+                time.sleep(sleep)
+                self.__calls = 0
+                self.__max_calls = None
+
+# seconds waiting for quota resets to make calls with remaining calls left of a limit per window
+def projected_quota_sleep(calls, remaining, limit, reset_in, window):
+    if calls <= remaining or limit <= 0:
+        return 0
+    return max(0, reset_in) + (math.ceil((calls - remaining) / limit) - 1) * window
+
+# Paces API calls from the X-RateLimit-* headers of GitHub responses, per API resource,
+# e.g., 'core', 'search', or 'graphql', and sleeps only until the quota actually resets
+class AdaptiveRateLimiter:
+    # full speed until the remaining quota is under this fraction of the limit, then
+    # the remaining calls are spread evenly until the reset time
+    PACE_BELOW = 0.2
+    MAX_RETRIES = 3
+    # GitHub asks to wait at least a minute, then exponentially longer, before retrying
+    # a secondary rate limit that came without a Retry-After header
+    SECONDARY_BACKOFF = 60
+    WARN_SLEEP = 5
+    WINDOWS = {'core': 3600, 'search': 60, 'graphql': 3600}
+    def __init__(self, clock=time.time, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.__lock = threading.Lock()
+        self.__quotas = {}
+        self.__next_call_at = {}
+        self.__calls = 0
+        self.__slept = 0
+
+    def calls(self):
+        return self.__calls
+
+    def slept(self):
+        return self.__slept
+
+    def quota(self, resource='core'):
+        return self.__quotas.get(resource)
+
+    # from the quota of the last response, 0 when it is unknown
+    def projected_sleep(self, resource, calls):
+        now = self.clock()
+        quota = self.quota(resource)
+        if quota == None or quota['reset'] <= now:
+            return 0
+        return projected_quota_sleep(calls, quota['remaining'], quota['limit'], quota['reset'] - now, self.WINDOWS.get(resource, 3600))
+
+    def resource(self, url):
+        if '/graphql' in url:
+            return 'graphql'
+        elif '/search/' in url:
+            return 'search'
+        return 'core'
+
+    def _sleep(self, seconds, reason):
+        if seconds >= self.WARN_SLEEP:
+            Console.println()
+            Console.warn("{reason}, sleeping for '{seconds}' seconds".format(reason=reason, seconds=int(seconds)))
+        self.sleep(seconds)
+        with self.__lock:
+            self.__slept += seconds
+
+    # called before each API call, reserves one call of the resource quota
+    def wait(self, resource='core'):
+        delay, reason = 0, ''
+        with self.__lock:
+            self.__calls += 1
+            now = self.clock()
+            quota = self.__quotas.get(resource)
+            if quota != None and quota['reset'] <= now:
+                del self.__quotas[resource]
+                quota = None
+            if quota != None:
+                if quota['remaining'] <= 0:
+                    delay, reason = quota['reset'] - now + 1, "Rate limit of '{resource}' API calls exhausted".format(resource=resource)
+                elif quota['remaining'] < quota['limit']*self.PACE_BELOW:
+                    interval = (quota['reset'] - now) / quota['remaining']
+                    call_at = max(now, self.__next_call_at.get(resource, now))
+                    self.__next_call_at[resource] = call_at + interval
+                    delay, reason = call_at - now, "Pacing '{resource}' API calls to last until rate limit reset".format(resource=resource)
+                quota['remaining'] -= 1
+        if delay > 0:
+            self._sleep(delay, reason)
+
+    # called with each API response, returns seconds to wait before retrying it or None,
+    # attempt is the number of retries of the call so far
+    def update(self, resource, status, headers, attempt=0):
+        headers = {k.lower(): v for k, v in headers.items()}
+        resource = headers.get('x-ratelimit-resource', resource)
+        now = self.clock()
+        with self.__lock:
+            if 'x-ratelimit-remaining' in headers and 'x-ratelimit-reset' in headers:
+                self.__quotas[resource] = {'limit': int(headers.get('x-ratelimit-limit', headers['x-ratelimit-remaining'])),
+                                           'remaining': int(headers['x-ratelimit-remaining']),
+                                           'reset': int(headers['x-ratelimit-reset'])}
+        if status not in [403, 429]:
+            return None
+        if 'retry-after' in headers:
+            return int(headers['retry-after'])
+        quota = self.__quotas.get(resource)
+        if quota != None and quota['remaining'] <= 0:
+            return max(0, quota['reset'] - now) + 1
+        return self.SECONDARY_BACKOFF * 2 ** attempt
+
+    # send() makes the API call and returns (response, status, headers), retried when rate limited
+    def call(self, resource, send):
+        for attempt in range(self.MAX_RETRIES + 1):
+            self.wait(resource)
+            response, status, headers = send()
+            retry_after = self.update(resource, status, headers, attempt)
+            if retry_after == None or attempt == self.MAX_RETRIES:
+                return response
+            self._sleep(retry_after, "Rate limited by GitHub '{resource}' API".format(resource=resource))
+        return response
+
+# Spreads API calls over several access tokens, each paced by its own AdaptiveRateLimiter,
+# by sending each call with the token that has the most quota left for its resource
+class TokenPool:
+    def __init__(self, tokens, clock=time.time, sleep=time.sleep):
+        self.tokens = tokens
+        self.clock = clock
+        self.sleep = sleep
+        self.limiters = {}
+        for token in tokens:
+            self.limiters[token] = AdaptiveRateLimiter(clock, sleep)
+        self.__blocked = {}
+        self.__slept = 0
+        self.__lock = threading.Lock()
+
+    def calls(self):
+        return sum([limiter.calls() for limiter in self.limiters.values()])
+
+    def slept(self):
+        return self.__slept + sum([limiter.slept() for limiter in self.limiters.values()])
+
+    def resource(self, url):
+        return self.limiters[self.tokens[0]].resource(url)
+
+    # the known quotas of all tokens are used before the first one resets
+    def projected_sleep(self, resource, calls):
+        now = self.clock()
+        quotas = [limiter.quota(resource) for limiter in self.limiters.values()]
+        quotas = [quota for quota in quotas if quota != None and quota['reset'] > now]
+        if len(quotas) == 0:
+            return 0
+        return projected_quota_sleep(calls, sum([quota['remaining'] for quota in quotas]), sum([quota['limit'] for quota in quotas]),
+                                     min([quota['reset'] for quota in quotas]) - now, AdaptiveRateLimiter.WINDOWS.get(resource, 3600))
+
+    # sorts tokens by (not blocked, unknown or reset quota, most remaining, earliest reset)
+    def _headroom(self, token, resource, now):
+        blocked_until = self.__blocked.get((token, resource), 0)
+        quota = self.limiters[token].quota(resource)
+        if quota == None or quota['reset'] <= now:
+            return (blocked_until <= now, 1, 0, -blocked_until)
+        return (blocked_until <= now, 0, quota['remaining'], -max(quota['reset'], blocked_until))
+
+    # once every token is exhausted the one resetting first is picked and its limiter waits for the reset
+    def acquire(self, resource='core'):
+        with self.__lock:
+            now = self.clock()
+            token = max(self.tokens, key=lambda token: self._headroom(token, resource, now))
+            delay = self.__blocked.get((token, resource), now) - now
+        if delay > 0:
+            Console.println()
+            Console.warn("Secondary rate limit of '{resource}' API calls on all access tokens, sleeping for '{seconds}' seconds".format(resource=resource, seconds=int(delay)))
+            self.sleep(delay)
+            with self.__lock:
+                self.__slept += delay
+        return token
+
+    # send(token) makes the API call with token and returns (response, status, headers)
+    def call(self, resource, send):
+        for attempt in range(AdaptiveRateLimiter.MAX_RETRIES + 1):
+            token = self.acquire(resource)
+            limiter = self.limiters[token]
+            limiter.wait(resource)
+            response, status, headers = send(token)
+            retry_after = limiter.update(resource, status, headers, attempt)
+            if retry_after == None:
+                return response
+            self.block(token, resource, retry_after)
+        return response
+
+    # the call is retried right away with another token when one has quota left
+    def block(self, token, resource, seconds):
+        with self.__lock:
+            self.__blocked[(token, resource)] = self.clock() + seconds
+
+    def summary(self):
+        remaining = []
+        for token in self.tokens:
+            quota = self.limiters[token].quota('core')
+            remaining.append('?' if quota == None else str(quota['remaining']))
+        return "GitHub API tokens: {tokens}, remaining quotas: {remaining}".format(tokens=len(self.tokens), remaining=', '.join(remaining))
@@ -12,10 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import os, unittest
+import os, threading, unittest
 
 from common import *
 from io import StringIO
+from unittest.mock import patch
 
 class TestConsole(unittest.TestCase):
     def setUp(self):
@@ -89,6 +90,12 @@ class TestRateLimitData(unittest.TestCase):
         self.assertTrue(sleep >= 1)
         self.assertTrue(sleep <= 10)
 
+    def test_projected_sleep(self):
+        self.assertEqual(self.rate_limit_data.projected_sleep(10), 0)
+        rate_limit_data = RateLimitData(100, 60, True)
+        self.assertEqual(rate_limit_data.projected_sleep(99), 0)
+        self.assertEqual(rate_limit_data.projected_sleep(250), 120)
+
     def test_enabled_default(self):
         self.assertFalse(self.rate_limit_data.enabled())
 
@@ -98,5 +105,203 @@ class TestRateLimitData(unittest.TestCase):
         self.rate_limit_data.set_enabled(False)
         self.assertFalse(self.rate_limit_data.enabled())
 
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.backup_out = sys.stdout
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.backup_out
+
+    def test_count_call_disabled(self):
+        rate_limiter = RateLimiter(RateLimitData(1, 1))
+        rate_limiter.count_call()
+        self.assertEqual(rate_limiter.calls(), 0)
+        self.assertEqual(rate_limiter.total_calls(), 1)
+
+    @patch('time.sleep')
+    def test_count_call(self, mock_sleep):
+        rate_limiter = RateLimiter(RateLimitData(3, 10, True))
+        for i in range(7):
+            rate_limiter.count_call()
+        self.assertEqual(rate_limiter.calls(), 1)
+        self.assertEqual(mock_sleep.call_count, 2)
+        mock_sleep.assert_called_with(10)
+
+    @patch('time.sleep')
+    def test_count_call_threads(self, mock_sleep):
+        rate_limiter = RateLimiter(RateLimitData(100, 1, True))
+        def count_calls():
+            for i in range(250):
+                rate_limiter.count_call()
+        threads = [threading.Thread(target=count_calls) for i in range(8)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        self.assertEqual(rate_limiter.total_calls(), 2000)
+        self.assertEqual(mock_sleep.call_count, 20)
+        self.assertEqual(rate_limiter.calls(), 0)
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.backup_out = sys.stdout
+        sys.stdout = StringIO()
+        self.now = 1000
+        self.sleeps = []
+        self.limiter = AdaptiveRateLimiter(lambda: self.now, self.sleeps.append)
+
+    def tearDown(self):
+        sys.stdout = self.backup_out
+
+    def __headers(self, remaining, reset, limit=5000):
+        return {'X-RateLimit-Limit': str(limit), 'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': str(reset)}
+
+    def test_resource(self):
+        self.assertEqual(self.limiter.resource('/repos/org/repo/pulls?page=2'), 'core')
+        self.assertEqual(self.limiter.resource('/search/issues?q=author'), 'search')
+        self.assertEqual(self.limiter.resource('/graphql'), 'graphql')
+
+    def test_full_speed(self):
+        self.limiter.update('core', 200, self.__headers(4000, 4600))
+        for i in range(10):
+            self.limiter.wait('core')
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(self.limiter.calls(), 10)
+        self.assertEqual(self.limiter.quota('core')['remaining'], 3990)
+
+    def test_pacing(self):
+        self.limiter.update('core', 200, self.__headers(100, 1200))
+        for i in range(3):
+            self.limiter.wait('core')
+        # 200 seconds until reset for 100 then 99 remaining calls
+        self.assertEqual(self.sleeps[0], 2.0)
+        self.assertAlmostEqual(self.sleeps[1], 2.0 + 200/99)
+
+    def test_exhausted(self):
+        self.limiter.update('core', 200, self.__headers(0, 1300))
+        self.limiter.wait('core')
+        self.assertEqual(self.sleeps, [301])
+        self.limiter.wait('search')
+        self.assertEqual(self.sleeps, [301])
+
+    def test_reset(self):
+        self.limiter.update('core', 200, self.__headers(0, 1300))
+        self.now = 1300
+        self.limiter.wait('core')
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(self.limiter.quota('core'), None)
+
+    def test_update_retry_after(self):
+        headers = self.__headers(10, 1300)
+        headers['Retry-After'] = '60'
+        self.assertEqual(self.limiter.update('core', 403, headers), 60)
+        self.assertEqual(self.limiter.update('core', 200, headers), None)
+
+    def test_update_exhausted(self):
+        self.assertEqual(self.limiter.update('core', 403, self.__headers(0, 1300)), 301)
+        self.assertEqual(self.limiter.update('core', 403, {}), 301)
+
+    def test_update_secondary(self):
+        self.assertEqual(self.limiter.update('core', 403, self.__headers(10, 1300)), 60)
+        self.assertEqual(self.limiter.update('core', 403, self.__headers(10, 1300), 2), 240)
+        self.assertEqual(self.limiter.update('search', 429, {}), 60)
+        self.assertEqual(self.limiter.update('core', 404, self.__headers(10, 1300)), None)
+
+    def test_update_resource_header(self):
+        headers = self.__headers(29, 1060, 30)
+        headers['X-RateLimit-Resource'] = 'search'
+        self.limiter.update('core', 200, headers)
+        self.assertEqual(self.limiter.quota('search')['limit'], 30)
+        self.assertEqual(self.limiter.quota('core'), None)
+
+    def test_projected_sleep(self):
+        self.assertEqual(self.limiter.projected_sleep('core', 10000), 0)
+        self.limiter.update('core', 200, self.__headers(1000, 1600))
+        self.assertEqual(self.limiter.projected_sleep('core', 1000), 0)
+        self.assertEqual(self.limiter.projected_sleep('core', 7000), 600 + 3600)
+        self.limiter.update('search', 200, self.__headers(10, 1030, 30))
+        self.assertEqual(self.limiter.projected_sleep('search', 100), 30 + 2*60)
+
+    def test_call(self):
+        responses = [('limited', 403, {'Retry-After': '30'}), ('ok', 200, self.__headers(10, 1300))]
+        response = self.limiter.call('core', lambda: responses.pop(0))
+        self.assertEqual(response, 'ok')
+        self.assertEqual(self.sleeps, [30])
+        self.assertEqual(self.limiter.slept(), 30)
+
+    def test_call_max_retries(self):
+        response = self.limiter.call('core', lambda: ('limited', 429, {'Retry-After': '1'}))
+        self.assertEqual(response, 'limited')
+        self.assertEqual(len(self.sleeps), AdaptiveRateLimiter.MAX_RETRIES)
+
+    def test_call_secondary(self):
+        responses = [('limited', 403, self.__headers(4000, 1300)), ('limited', 403, self.__headers(3999, 1300)), ('ok', 200, self.__headers(3998, 1300))]
+        response = self.limiter.call('core', lambda: responses.pop(0))
+        self.assertEqual(response, 'ok')
+        self.assertEqual(self.sleeps, [60, 120])
+
+class TestTokenPool(unittest.TestCase):
+    def setUp(self):
+        self.backup_out = sys.stdout
+        sys.stdout = StringIO()
+        self.now = 1000
+        self.sleeps = []
+        self.pool = TokenPool(['token0', 'token1', 'token2'], lambda: self.now, self.sleeps.append)
+
+    def tearDown(self):
+        sys.stdout = self.backup_out
+
+    def __headers(self, remaining, reset, limit=5000):
+        return {'X-RateLimit-Limit': str(limit), 'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': str(reset)}
+
+    def test_most_headroom(self):
+        self.pool.limiters['token0'].update('core', 200, self.__headers(100, 1300))
+        self.pool.limiters['token1'].update('core', 200, self.__headers(3000, 1300))
+        self.pool.limiters['token2'].update('core', 200, self.__headers(2000, 1300))
+        self.assertEqual(self.pool.acquire('core'), 'token1')
+        self.assertEqual(self.pool.acquire('search'), 'token0')
+
+    def test_call_spreads_tokens(self):
+        tokens = []
+        def send(token):
+            tokens.append(token)
+            return 'ok', 200, self.__headers(4000 - len(tokens), 1300)
+        for i in range(6):
+            self.pool.call('core', send)
+        self.assertEqual(sorted(set(tokens)), ['token0', 'token1', 'token2'])
+        self.assertEqual(self.pool.calls(), 6)
+        self.assertEqual(self.sleeps, [])
+
+    def test_all_exhausted(self):
+        self.pool.limiters['token0'].update('core', 200, self.__headers(0, 1500))
+        self.pool.limiters['token1'].update('core', 200, self.__headers(0, 1200))
+        self.pool.limiters['token2'].update('core', 200, self.__headers(0, 1400))
+        response = self.pool.call('core', lambda token: (token, 200, self.__headers(4999, 5000)))
+        self.assertEqual(response, 'token1')
+        self.assertEqual(self.sleeps, [201])
+
+    def test_retry_other_token(self):
+        responses = [('limited', 403, {'Retry-After': '60'}), ('ok', 200, self.__headers(10, 1300))]
+        tokens = []
+        def send(token):
+            tokens.append(token)
+            return responses.pop(0)
+        self.assertEqual(self.pool.call('core', send), 'ok')
+        self.assertEqual(len(set(tokens)), 2)
+        self.assertEqual(self.sleeps, [])
+
+    def test_projected_sleep(self):
+        self.pool.limiters['token0'].update('core', 200, self.__headers(100, 1300))
+        self.pool.limiters['token1'].update('core', 200, self.__headers(3000, 1600))
+        self.assertEqual(self.pool.projected_sleep('core', 3100), 0)
+        self.assertEqual(self.pool.projected_sleep('core', 3101), 300)
+        self.assertEqual(self.pool.projected_sleep('search', 3101), 0)
+
+    def test_all_blocked(self):
+        pool = TokenPool(['token0'], lambda: self.now, self.sleeps.append)
+        responses = [('limited', 403, {'Retry-After': '60'}), ('ok', 200, self.__headers(10, 1300))]
+        self.assertEqual(pool.call('core', lambda token: responses.pop(0)), 'ok')
+        self.assertEqual(self.sleeps, [60])
+        self.assertEqual(pool.slept(), 60)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,112 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+from github.Requester import Requester, HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+
+# mimic the httplib response object PyGithub reads, for responses served from the cache
+class CachedResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self):
+        return self.body
+
+# Hooks every HTTP request PyGithub makes, for all GHClient instances once installed
+class GHConnectionMixin:
+    cache = None
+    limiter = None
+    __sessions = {}
+    __sessions_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = self._shared_session(self.session)
+
+    # PyGithub does not keep injected connections, so share one keep-alive session per host
+    def _shared_session(self, session):
+        key = (self.protocol, self.host, self.port)
+        with GHConnectionMixin.__sessions_lock:
+            if key not in GHConnectionMixin.__sessions:
+                GHConnectionMixin.__sessions[key] = session
+            elif GHConnectionMixin.__sessions[key] is not session:
+                session.close()
+            return GHConnectionMixin.__sessions[key]
+
+    def _cache_key(self):
+        return "{protocol}://{host}:{port}{url} {accept}".format(protocol=self.protocol, host=self.host, port=self.port, url=self.url, accept=self.headers.get('Accept', ''))
+
+    def getresponse(self):
+        limiter = GHConnectionMixin.limiter
+        if limiter == None:
+            return self._getresponse_cached()
+        # a TokenPool limiter picks the access token of each request
+        def send(token=None):
+            if token != None:
+                self.headers = dict(self.headers)
+                self.headers['Authorization'] = "token {token}".format(token=token)
+            response = self._getresponse_cached()
+            return response, response.status, dict(response.getheaders())
+        return limiter.call(limiter.resource(self.url), send)
+
+    def _getresponse_cached(self):
+        cache = GHConnectionMixin.cache
+        if cache == None or self.verb != 'GET':
+            return super().getresponse()
+
+        key = self._cache_key()
+        cached = cache.get(key)
+        if cached != None:
+            self.headers = dict(self.headers)
+            if cached['etag'] != None:
+                self.headers['If-None-Match'] = cached['etag']
+            if cached['last_modified'] != None:
+                self.headers['If-Modified-Since'] = cached['last_modified']
+
+        response = super().getresponse()
+        if cached != None and response.status == 304:
+            cache.touch(key)
+            headers = dict(cached['headers'])
+            headers.update({k.lower(): v for k, v in response.getheaders() if k.lower() != 'content-length'})
+            return CachedResponse(cached['status'], headers, cached['body'])
+        if response.status == 200:
+            cache.put(key, response.status, {k.lower(): v for k, v in response.getheaders()}, response.read())
+        return response
+
+    # the session is shared with the other connections to this host
+    def close(self):
+        pass
+
+class GHHTTPConnection(GHConnectionMixin, HTTPRequestsConnectionClass):
+    pass
+
+class GHHTTPSConnection(GHConnectionMixin, HTTPSRequestsConnectionClass):
+    pass
+
+# routes the requests of Github clients created after this call through GHConnectionMixin
+def install_connection(cache=None, limiter=None):
+    GHConnectionMixin.cache = cache
+    GHConnectionMixin.limiter = limiter
+    Requester.injectConnectionClasses(GHHTTPConnection, GHHTTPSConnection)
+
+def uninstall_connection():
+    GHConnectionMixin.cache = None
+    GHConnectionMixin.limiter = None
+    Requester.resetConnectionClasses()
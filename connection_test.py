@@ -0,0 +1,130 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json, shutil, tempfile, threading, unittest
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from github import Github
+
+from cache import HTTPCache
+from common import *
+from connection import *
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    etag = '"v1"'
+    requests = []
+    authorizations = []
+    retry_after = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        FakeGitHubHandler.requests.append(self.headers.get('If-None-Match'))
+        FakeGitHubHandler.authorizations.append(self.headers.get('Authorization'))
+        if len(self.retry_after) > 0:
+            self.send_response(403)
+            self.send_header('Retry-After', self.retry_after.pop(0))
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+            return
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.send_header('X-RateLimit-Remaining', '4999')
+            self.end_headers()
+            return
+        body = json.dumps({'login': 'fake-org', 'name': "Fake Org {etag}".format(etag=self.etag)}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', self.etag)
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.send_header('X-RateLimit-Remaining', '4999')
+        self.send_header('X-RateLimit-Reset', '2000000000')
+        self.end_headers()
+        self.wfile.write(body)
+
+class TestGHConnection(unittest.TestCase):
+    def setUp(self):
+        FakeGitHubHandler.etag = '"v1"'
+        FakeGitHubHandler.requests = []
+        FakeGitHubHandler.authorizations = []
+        FakeGitHubHandler.retry_after = []
+        self.server = HTTPServer(('127.0.0.1', 0), FakeGitHubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = "http://127.0.0.1:{port}".format(port=self.server.server_port)
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = HTTPCache(self.cache_dir)
+
+    def tearDown(self):
+        uninstall_connection()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def __github(self):
+        return Github('fake-access-token', base_url=self.base_url, retry=None)
+
+    def test_revalidate(self):
+        install_connection(self.cache)
+        self.assertEqual(self.__github().get_organization('fake-org').name, 'Fake Org "v1"')
+        self.assertEqual(self.__github().get_organization('fake-org').name, 'Fake Org "v1"')
+        self.assertEqual(FakeGitHubHandler.requests, [None, '"v1"'])
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_revalidate_changed(self):
+        install_connection(self.cache)
+        self.__github().get_organization('fake-org')
+        FakeGitHubHandler.etag = '"v2"'
+        self.assertEqual(self.__github().get_organization('fake-org').name, 'Fake Org "v2"')
+        self.assertEqual(self.__github().get_organization('fake-org').name, 'Fake Org "v2"')
+        self.assertEqual(FakeGitHubHandler.requests, [None, '"v1"', '"v2"'])
+
+    def test_limiter(self):
+        sleeps = []
+        limiter = AdaptiveRateLimiter(sleep=sleeps.append)
+        install_connection(self.cache, limiter)
+        self.__github().get_organization('fake-org')
+        self.__github().get_organization('fake-org')
+        self.assertEqual(limiter.calls(), 2)
+        self.assertEqual(limiter.quota('core')['remaining'], 4999)
+
+    def test_limiter_retry_after(self):
+        sleeps = []
+        FakeGitHubHandler.retry_after = ['7']
+        install_connection(None, AdaptiveRateLimiter(sleep=sleeps.append))
+        self.assertEqual(self.__github().get_organization('fake-org').name, 'Fake Org "v1"')
+        self.assertEqual(sleeps, [7])
+        self.assertEqual(len(FakeGitHubHandler.requests), 2)
+
+    def test_token_pool_retry_after(self):
+        sleeps = []
+        FakeGitHubHandler.retry_after = ['7']
+        install_connection(None, TokenPool(['token0', 'token1'], sleep=sleeps.append))
+        self.assertEqual(self.__github().get_organization('fake-org').name, 'Fake Org "v1"')
+        self.assertEqual(sleeps, [])
+        self.assertEqual(FakeGitHubHandler.authorizations, ['token token0', 'token token1'])
+
+    def test_no_cache(self):
+        install_connection()
+        self.__github().get_organization('fake-org')
+        self.__github().get_organization('fake-org')
+        self.assertEqual(FakeGitHubHandler.requests, [None, None])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, base64, sqlite3, subprocess, threading
+
+from datetime import datetime, timezone
+
+from client import GHClient
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS authors (email TEXT PRIMARY KEY, login TEXT);
+"""
+
+# Bare mirrors of GitHub repos in a local directory, cloned once then updated with git fetch,
+# with the login of each commit author email, so commits are counted from the commit graph
+class GitMirrors:
+    DEFAULT_MIRRORS_DIR = '~/.ghtrack/mirrors'
+    # emails hidden by GitHub are ID+login@users.noreply.github.com, or login@ for older accounts
+    NOREPLY_DOMAIN = 'users.noreply.github.com'
+    def __init__(self, mirrors_dir, access_token=None):
+        self.mirrors_dir = os.path.expanduser(mirrors_dir)
+        self.access_token = access_token
+        self.clones = 0
+        self.fetches = 0
+        self.__updated = set()
+        self.__lock = threading.Lock()
+        os.makedirs(self.mirrors_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(self.mirrors_dir, 'authors.db'), check_same_thread=False)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def path(self, full_name):
+        return os.path.join(self.mirrors_dir, full_name + '.git')
+
+    # the access token is sent as a header so it is not saved in the config of the mirrors, and is passed
+    # through the environment, with git config environment variables, so it is not shown in the processes list
+    def _git(self, *args):
+        env = os.environ.copy()
+        if self.access_token:
+            credentials = base64.b64encode("x-access-token:{token}".format(token=self.access_token).encode('utf-8')).decode('ascii')
+            count = int(env.get('GIT_CONFIG_COUNT') or 0)
+            env['GIT_CONFIG_KEY_{index}'.format(index=count)] = 'http.extraHeader'
+            env['GIT_CONFIG_VALUE_{index}'.format(index=count)] = "Authorization: Basic {credentials}".format(credentials=credentials)
+            env['GIT_CONFIG_COUNT'] = str(count + 1)
+        result = subprocess.run(['git'] + list(args), capture_output=True, text=True, env=env)
+        if result.returncode != 0:
+            raise Exception("git {command} failed: {error}".format(command=args[0], error=result.stderr.strip()))
+        return result.stdout
+
+    # clones the mirror of full_name from url, or fetches its new commits, once per ght command
+    def update(self, full_name, url):
+        path = self.path(full_name)
+        with self.__lock:
+            if path in self.__updated:
+                return path
+            self.__updated.add(path)
+        if os.path.isdir(path):
+            self._git('-C', path, 'fetch', '--prune', '--quiet', 'origin')
+            with self.__lock:
+                self.fetches += 1
+        else:
+            self._git('clone', '--mirror', '--quiet', url, path)
+            with self.__lock:
+                self.clones += 1
+        return path
+
+    # returns [(sha, email, author date, additions, deletions)] of the commits of the default branch, without
+    # merges like the contributors stats, with author dates as naive UTC, and lines only counted with numstat
+    def commits(self, full_name, numstat=False):
+        commits = []
+        # git log fails on the HEAD of empty repos
+        if self._git('-C', self.path(full_name), 'for-each-ref', '--count=1', 'refs/heads') == '':
+            return commits
+        args = ['-C', self.path(full_name), 'log', 'HEAD', '--no-merges', '--format=commit %H %at %ae'] + (['--numstat'] if numstat else [])
+        for line in self._git(*args).splitlines():
+            if line.startswith('commit '):
+                sha, timestamp, email = line[len('commit '):].split(' ', 2)
+                commits.append([sha, email.lower(), datetime.fromtimestamp(int(timestamp), timezone.utc).replace(tzinfo=None), 0, 0])
+            elif line != '':
+                additions, deletions, _ = line.split('\t', 2)
+                # binary files have no lines
+                if additions != '-':
+                    commits[-1][3] += int(additions)
+                    commits[-1][4] += int(deletions)
+        return [tuple(commit) for commit in commits]
+
+    def _noreply_login(self, email):
+        local, _, domain = email.partition('@')
+        if domain == self.NOREPLY_DOMAIN:
+            return local.split('+')[-1]
+        return None
+
+    # returns the login of email, or None when it is no GitHub user's, resolve() is only called for
+    # emails never seen before and its result is kept in the authors table
+    def login(self, email, resolve):
+        login = self._noreply_login(email)
+        if login != None:
+            return login
+        with self.__lock:
+            row = self.db.execute("SELECT login FROM authors WHERE email = ?", (email,)).fetchone()
+        if row != None:
+            return row[0]
+        login = resolve()
+        self.set_login(email, login)
+        return login
+
+    def set_login(self, email, login):
+        with self.__lock:
+            self.db.execute("INSERT OR REPLACE INTO authors (email, login) VALUES (?, ?)", (email.lower(), login))
+            self.db.commit()
+
+# GHClient counting commits in local git mirrors by exact author date instead of with the weekly
+# contributors stats, so only emails not mapped to a login yet cost API calls after the first clone
+class GHGitClient(GHClient):
+    def __init__(self, access_token, mirrors, client=None, cache=None, base_url=None):
+        super().__init__(access_token, client, cache, base_url)
+        self.mirrors = mirrors
+
+    def mirror_url(self, repo):
+        return repo.clone_url
+
+    def cost_summary(self):
+        mirrors_summary = "Git mirrors: {clones} cloned, {fetches} fetched in: {mirrors_dir}".format(clones=self.mirrors.clones, fetches=self.mirrors.fetches, mirrors_dir=self.mirrors.mirrors_dir)
+        return '\n'.join([summary for summary in [super().cost_summary(), mirrors_summary] if summary])
+
+    # the login of the GitHub user GitHub links to the commit author
+    def _commit_login(self, repo, sha):
+        self._count_check_api_calls()
+        author = repo.get_commit(sha).author
+        return author.login if author != None else None
+
+    def commits_count(self, repo, author, start_date, end_date):
+        return self.commits_counts(repo, [author], start_date, end_date)[author]
+
+    def commits_counts(self, repo, authors, start_date, end_date):
+        return self._commits_churn_counts(repo, authors, start_date, end_date, False)[0]
+
+    # the lines of each commit are only read from the mirror when counting them
+    def commits_churn_counts(self, repo, authors, start_date, end_date):
+        return self._commits_churn_counts(repo, authors, start_date, end_date, True)
+
+    def _commits_churn_counts(self, repo, authors, start_date, end_date, numstat):
+        commits_counts = self._init_authors_count_map(authors)
+        additions_counts = self._init_authors_count_map(authors)
+        deletions_counts = self._init_authors_count_map(authors)
+        self.mirrors.update(repo.full_name, self.mirror_url(repo))
+        for sha, email, authored_at, additions, deletions in self.mirrors.commits(repo.full_name, numstat):
+            if authored_at < start_date or authored_at > end_date:
+                continue
+            login = self.mirrors.login(email, lambda: self._commit_login(repo, sha))
+            if login in commits_counts:
+                self._count(commits_counts, login, authored_at)
+                self._count(additions_counts, login, authored_at, additions)
+                self._count(deletions_counts, login, authored_at, deletions)
+        return commits_counts, additions_counts, deletions_counts
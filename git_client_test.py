@@ -0,0 +1,122 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, shutil, tempfile, subprocess, unittest
+
+from unittest.mock import Mock, patch
+from datetime import datetime
+
+from git_client import *
+
+class TestGHGitClient(unittest.TestCase):
+    def setUp(self):
+        self.start_date = datetime(2020, 7, 1)
+        self.end_date = datetime(2020, 7, 31, 23, 59, 59)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmp_dir, 'source')
+        self.logins = {}
+        self.__git('init', '--quiet', '--initial-branch=main', self.source)
+        # (author email, author date, login GitHub links to the email)
+        self.__commit('user0@example.com', '2020-06-30T23:59:59Z', 'user0')
+        self.__commit('user0@example.com', '2020-07-01T00:00:00Z', 'user0')
+        self.__commit('1234+user1@users.noreply.github.com', '2020-07-15T10:00:00Z', 'user1')
+        self.__commit('User0@Example.com', '2020-07-31T23:00:00Z', 'user0')
+        self.__commit('unknown@example.com', '2020-07-20T10:00:00Z', None)
+        self.__commit('user2@example.com', '2020-08-01T00:00:00Z', 'user2')
+        self.mirrors = GitMirrors(os.path.join(self.tmp_dir, 'mirrors'))
+        self.client = GHGitClient("fake-access-token", self.mirrors, Mock())
+        self.client.mirror_url = lambda repo: self.source
+        self.repo = Mock(full_name='fake-org/fake-repo')
+        self.repo.get_commit.side_effect = lambda sha: Mock(author=Mock(login=self.logins[sha]) if self.logins[sha] != None else None)
+
+    def tearDown(self):
+        self.mirrors.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def __git(self, *args, env={}):
+        return subprocess.run(['git'] + list(args), check=True, capture_output=True, text=True, env=dict(os.environ, **env)).stdout.strip()
+
+    def __commit(self, email, date, login):
+        env = {'GIT_AUTHOR_NAME': 'fake', 'GIT_AUTHOR_EMAIL': email, 'GIT_AUTHOR_DATE': date,
+               'GIT_COMMITTER_NAME': 'fake', 'GIT_COMMITTER_EMAIL': 'fake@example.com', 'GIT_COMMITTER_DATE': date}
+        self.__git('-C', self.source, 'commit', '--quiet', '--allow-empty', '-m', date, env=env)
+        self.logins[self.__git('-C', self.source, 'rev-parse', 'HEAD')] = login
+
+    def test_commits_counts(self):
+        commits_counts = self.client.commits_counts(self.repo, ['user0', 'user1', 'user2'], self.start_date, self.end_date)
+        self.assertEqual(commits_counts, {'user0': 2, 'user1': 1, 'user2': 0})
+        self.assertEqual(self.mirrors.clones, 1)
+        # the noreply email needs no API call and each other email only one
+        self.assertEqual(self.repo.get_commit.call_count, 2)
+
+    def test_commits_counts_all_authors(self):
+        self.assertEqual(self.client.commits_counts(self.repo, None, self.start_date, self.end_date), {'user0': 2, 'user1': 1})
+
+    def test_commits_counts_period(self):
+        self.client.set_period('month')
+        commits_counts = self.client.commits_counts(self.repo, ['user0'], datetime(2020, 6, 1), self.end_date)
+        self.assertEqual(commits_counts, {'user0': {'2020-06': 1, '2020-07': 2}})
+
+    def test_commits_churn_counts(self):
+        with open(os.path.join(self.source, 'file'), 'w') as f:
+            f.write("line0\nline1\nline2\n")
+        self.__git('-C', self.source, 'add', 'file')
+        self.__commit('user0@example.com', '2020-07-10T00:00:00Z', 'user0')
+        with open(os.path.join(self.source, 'file'), 'w') as f:
+            f.write("line0\n")
+        self.__git('-C', self.source, 'add', 'file')
+        self.__commit('1234+user1@users.noreply.github.com', '2020-07-11T00:00:00Z', 'user1')
+        counts = self.client.commits_churn_counts(self.repo, ['user0', 'user1'], self.start_date, self.end_date)
+        self.assertEqual(counts, ({'user0': 3, 'user1': 2}, {'user0': 3, 'user1': 0}, {'user0': 0, 'user1': 2}))
+
+    def test_commits_count(self):
+        self.assertEqual(self.client.commits_count(self.repo, 'user0', self.start_date, self.end_date), 2)
+
+    def test_logins_kept(self):
+        self.client.commits_counts(self.repo, ['user0'], self.start_date, self.end_date)
+        mirrors = GitMirrors(self.mirrors.mirrors_dir)
+        client = GHGitClient("fake-access-token", mirrors, Mock())
+        client.mirror_url = self.client.mirror_url
+        self.repo.get_commit.reset_mock()
+        self.assertEqual(client.commits_counts(self.repo, ['user0'], self.start_date, self.end_date), {'user0': 2})
+        self.assertEqual(self.repo.get_commit.call_count, 0)
+        self.assertEqual((mirrors.clones, mirrors.fetches), (0, 1))
+        mirrors.close()
+
+    def test_mirror_fetched(self):
+        self.client.commits_counts(self.repo, ['user0'], self.start_date, self.end_date)
+        self.__commit('user0@example.com', '2020-07-02T00:00:00Z', 'user0')
+        mirrors = GitMirrors(self.mirrors.mirrors_dir)
+        client = GHGitClient("fake-access-token", mirrors, Mock())
+        client.mirror_url = self.client.mirror_url
+        self.assertEqual(client.commits_counts(self.repo, ['user0'], self.start_date, self.end_date), {'user0': 3})
+        mirrors.close()
+
+    def test_empty_repo(self):
+        empty = os.path.join(self.tmp_dir, 'empty')
+        self.__git('init', '--quiet', '--bare', empty)
+        self.client.mirror_url = lambda repo: empty
+        self.assertEqual(self.client.commits_counts(Mock(full_name='fake-org/empty'), ['user0'], self.start_date, self.end_date), {'user0': 0})
+
+    def test_access_token_not_in_command(self):
+        mirrors = GitMirrors(self.mirrors.mirrors_dir, 'fake-access-token')
+        with patch('git_client.subprocess.run', wraps=subprocess.run) as run:
+            header = mirrors._git('config', '--get', 'http.extraHeader').strip()
+        self.assertEqual(header, "Authorization: Basic {credentials}".format(credentials=base64.b64encode(b'x-access-token:fake-access-token').decode('ascii')))
+        self.assertFalse(any(header in arg for arg in run.call_args[0][0]))
+        mirrors.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import requests, threading
+
+from datetime import datetime
+
+from client import GHClient
+
+GRAPHQL_URL = 'https://api.github.com/graphql'
+
+# GitHub Enterprise serves REST at /api/v3 and GraphQL at /api/graphql
+def graphql_url(api_url):
+    api_url = api_url.rstrip('/')
+    if api_url.endswith('/api/v3'):
+        return api_url[:-len('/v3')] + '/graphql'
+    return api_url + '/graphql'
+
+PRS_REVIEWS_QUERY = """
+query($owner: String!, $name: String!, $states: [PullRequestState!], $cursor: String) {
+  rateLimit { cost remaining resetAt }
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: 50, after: $cursor, states: $states, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        author { login }
+        createdAt
+        updatedAt
+        reviews(first: 100) {
+          pageInfo { hasNextPage endCursor }
+          nodes { author { login } submittedAt }
+        }
+      }
+    }
+  }
+}
+"""
+
+PR_REVIEWS_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $cursor: String) {
+  rateLimit { cost remaining resetAt }
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      reviews(first: 100, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { author { login } submittedAt }
+      }
+    }
+  }
+}
+"""
+
+# GHClient backend that fetches PRs with their nested reviews in batches with the
+# GitHub GraphQL API, instead of one REST get_reviews() call per PR
+class GHGraphQLClient(GHClient):
+    PR_STATES = {'open': ['OPEN'], 'closed': ['CLOSED', 'MERGED']}
+    def __init__(self, access_token, client=None, session=None, graphql_url=GRAPHQL_URL, cache=None, base_url=None):
+        super().__init__(access_token, client, cache, base_url)
+        self.session = session
+        self.sessions = {}
+        self.graphql_url = graphql_url
+        self.cost_points = 0
+        self.graphql_requests = 0
+        self.remaining_points = None
+        self.__lock = threading.Lock()
+
+    def _parse_datetime(self, value):
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+
+    def _owner_and_name(self, repo):
+        owner, name = repo.full_name.split('/')
+        return owner, name
+
+    # one session per access token when the rate limiter is a TokenPool
+    def get_session(self, token=None):
+        if self.session != None:
+            return self.session
+        if token == None:
+            token = self.access_token
+        with self.__lock:
+            if token not in self.sessions:
+                session = requests.Session()
+                session.headers.update({'Authorization': "bearer {token}".format(token=token)})
+                self.sessions[token] = session
+            return self.sessions[token]
+
+    def _post(self, query, variables, token=None):
+        response = self.get_session(token).post(self.graphql_url, json={'query': query, 'variables': variables})
+        return response, response.status_code, response.headers
+
+    def query(self, query, variables):
+        self._count_check_api_calls()
+        if self.adaptive_rate_limiter != None:
+            response = self.adaptive_rate_limiter.call('graphql', lambda token=None: self._post(query, variables, token))
+        else:
+            response, _, _ = self._post(query, variables)
+        response.raise_for_status()
+        result = response.json()
+        if result.get('errors'):
+            raise Exception("GraphQL query failed: {errors}".format(errors=result['errors']))
+        data = result['data']
+        with self.__lock:
+            self.graphql_requests += 1
+            if data.get('rateLimit'):
+                self.cost_points += data['rateLimit']['cost']
+                self.remaining_points = data['rateLimit']['remaining']
+        return data
+
+    def cost_summary(self):
+        graphql_summary = "GraphQL API cost: {cost} points in {requests} requests, {remaining} points remaining".format(cost=self.cost_points, requests=self.graphql_requests, remaining=self.remaining_points)
+        return '\n'.join([summary for summary in [super().cost_summary(), graphql_summary] if summary])
+
+    # yields (pr, reviews) of every PR in pr_state updated since start_date
+    def _graphql_prs_reviews(self, repo, start_date, pr_state):
+        owner, name = self._owner_and_name(repo)
+        cursor = None
+        while True:
+            variables = {'owner': owner, 'name': name, 'states': self.PR_STATES.get(pr_state), 'cursor': cursor}
+            prs = self.query(PRS_REVIEWS_QUERY, variables)['repository']['pullRequests']
+            for pr in prs['nodes']:
+                if self._parse_datetime(pr['updatedAt']) < start_date:
+                    return
+                reviews = pr['reviews']['nodes']
+                if pr['reviews']['pageInfo']['hasNextPage']:
+                    reviews = reviews + list(self._more_reviews(owner, name, pr['number'], pr['reviews']['pageInfo']['endCursor']))
+                yield pr, reviews
+            if not prs['pageInfo']['hasNextPage']:
+                return
+            cursor = prs['pageInfo']['endCursor']
+
+    def _more_reviews(self, owner, name, number, cursor):
+        while True:
+            variables = {'owner': owner, 'name': name, 'number': number, 'cursor': cursor}
+            reviews = self.query(PR_REVIEWS_QUERY, variables)['repository']['pullRequest']['reviews']
+            yield from reviews['nodes']
+            if not reviews['pageInfo']['hasNextPage']:
+                return
+            cursor = reviews['pageInfo']['endCursor']
+
+    # the GHClient REST listing, cheaper than GraphQL for repos with few PRs
+    def list_reviews_counts(self, repo, authors, start_date, end_date, pr_state='close'):
+        return super().reviews_counts(repo, authors, start_date, end_date, pr_state)
+
+    def reviews_count(self, repo, author, start_date, end_date, pr_state='close'):
+        return self.reviews_counts(repo, [author], start_date, end_date, pr_state)[author]
+
+    def _count_reviews_nodes(self, reviews_counts, reviews, start_date, end_date):
+        for r in reviews:
+            # pending reviews have no submittedAt and deleted users no author
+            if r['author'] == None or r['submittedAt'] == None:
+                continue
+            submitted_at = self._parse_datetime(r['submittedAt'])
+            if r['author']['login'] in reviews_counts and (submitted_at >= start_date and submitted_at <= end_date):
+                self._count(reviews_counts, r['author']['login'], submitted_at)
+
+    def reviews_counts(self, repo, authors, start_date, end_date, pr_state='close'):
+        reviews_counts = self._init_authors_count_map(authors)
+        for pr, reviews in self._graphql_prs_reviews(repo, start_date, pr_state):
+            self._count_reviews_nodes(reviews_counts, reviews, start_date, end_date)
+        return reviews_counts
+
+    def prs_reviews_counts(self, repo, authors, start_date, end_date, state='close'):
+        prs_counts = self._init_authors_count_map(authors)
+        reviews_counts = self._init_authors_count_map(authors)
+        for pr, reviews in self._graphql_prs_reviews(repo, start_date, state):
+            created_at = self._parse_datetime(pr['createdAt'])
+            if pr['author'] != None and pr['author']['login'] in prs_counts and created_at >= start_date and created_at <= end_date:
+                self._count(prs_counts, pr['author']['login'], created_at)
+            self._count_reviews_nodes(reviews_counts, reviews, start_date, end_date)
+        return prs_counts, reviews_counts
@@ -0,0 +1,125 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from unittest.mock import Mock
+from datetime import datetime, timedelta
+
+from client import GHClient
+from graphql_client import *
+
+class TestGHGraphQLClient(unittest.TestCase):
+    def setUp(self):
+        self.start_date = datetime(2020, 7, 1)
+        self.end_date = datetime(2020, 7, 31)
+        # PRs newest updated first: (number, updated_at, [(reviewer, submitted_at), ...])
+        self.prs = [(3, datetime(2020, 8, 2), [('user0', datetime(2020, 8, 1)), ('user1', datetime(2020, 7, 30))]),
+                    (2, datetime(2020, 7, 20), [('user0', datetime(2020, 7, 2)), ('user0', datetime(2020, 7, 3)), ('user2', None)]),
+                    (1, datetime(2020, 7, 10), [('user1', datetime(2020, 7, 9)), (None, datetime(2020, 7, 9))]),
+                    (0, datetime(2020, 6, 1), [('user0', datetime(2020, 6, 1))])]
+        self.session = Mock()
+        self.session.post.side_effect = self.__graphql_response
+        self.client = GHGraphQLClient("fake-access-token", Mock(), self.session)
+        self.repo = Mock(full_name='fake-org/fake-repo')
+
+    def __format(self, date):
+        if date == None:
+            return None
+        return date.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def __author(self, number):
+        return "user{no}".format(no=number % 2)
+
+    def __review_nodes(self, reviews):
+        return [{'author': None if login == None else {'login': login}, 'submittedAt': self.__format(submitted_at)} for login, submitted_at in reviews]
+
+    # serves one PR per page and one review per nested page to exercise both cursors
+    def __graphql_response(self, url, json=None):
+        variables = json['variables']
+        rate_limit = {'cost': 1, 'remaining': 4999, 'resetAt': '2020-08-01T00:00:00Z'}
+        if 'number' in variables:
+            number, index = variables['number'], int(variables['cursor'])
+            reviews = [pr for pr in self.prs if pr[0] == number][0][2]
+            data = {'rateLimit': rate_limit,
+                    'repository': {'pullRequest': {'reviews': {'pageInfo': {'hasNextPage': index + 1 < len(reviews), 'endCursor': str(index + 1)},
+                                                               'nodes': self.__review_nodes(reviews[index:index + 1])}}}}
+        else:
+            index = int(variables['cursor'] or 0)
+            number, updated_at, reviews = self.prs[index]
+            pr = {'number': number, 'author': {'login': self.__author(number)}, 'createdAt': self.__format(updated_at - timedelta(days=1)), 'updatedAt': self.__format(updated_at),
+                  'reviews': {'pageInfo': {'hasNextPage': len(reviews) > 1, 'endCursor': '1'}, 'nodes': self.__review_nodes(reviews[:1])}}
+            data = {'rateLimit': rate_limit,
+                    'repository': {'pullRequests': {'pageInfo': {'hasNextPage': index + 1 < len(self.prs), 'endCursor': str(index + 1)}, 'nodes': [pr]}}}
+        return Mock(json=Mock(return_value={'data': data}))
+
+    def __rest_repo(self):
+        prs = []
+        for number, updated_at, reviews in self.prs:
+            rest_reviews = [Mock(user=None if login == None else Mock(login=login), submitted_at=submitted_at) for login, submitted_at in reviews]
+            prs.append(Mock(user=Mock(login=self.__author(number)), created_at=updated_at - timedelta(days=1), updated_at=updated_at, get_reviews=Mock(return_value=rest_reviews)))
+        return Mock(get_pulls=Mock(return_value=prs))
+
+    def test_reviews_counts(self):
+        reviews_counts = self.client.reviews_counts(self.repo, ['user0', 'user1', 'user2'], self.start_date, self.end_date, 'closed')
+        self.assertEqual(reviews_counts, {'user0': 2, 'user1': 2, 'user2': 0})
+
+    def test_reviews_count(self):
+        self.assertEqual(self.client.reviews_count(self.repo, 'user1', self.start_date, self.end_date, 'closed'), 2)
+
+    def test_reviews_counts_match_rest(self):
+        authors = ['user0', 'user1', 'user2']
+        rest_counts = GHClient("fake-access-token", Mock()).reviews_counts(self.__rest_repo(), authors, self.start_date, self.end_date, 'closed')
+        graphql_counts = self.client.reviews_counts(self.repo, authors, self.start_date, self.end_date, 'closed')
+        self.assertEqual(rest_counts, graphql_counts)
+
+    def test_prs_reviews_counts(self):
+        authors = ['user0', 'user1', 'user2']
+        prs_counts, reviews_counts = self.client.prs_reviews_counts(self.repo, authors, self.start_date, self.end_date, 'closed')
+        self.assertEqual(prs_counts, {'user0': 1, 'user1': 1, 'user2': 0})
+        self.assertEqual(reviews_counts, self.client.reviews_counts(self.repo, authors, self.start_date, self.end_date, 'closed'))
+        rest_counts = GHClient("fake-access-token", Mock()).prs_reviews_counts(self.__rest_repo(), authors, self.start_date, self.end_date, 'closed')
+        self.assertEqual(rest_counts, (prs_counts, reviews_counts))
+
+    def test_query_variables(self):
+        self.client.reviews_counts(self.repo, ['user0'], self.start_date, self.end_date, 'closed')
+        variables = self.session.post.call_args_list[0][1]['json']['variables']
+        self.assertEqual(variables['owner'], 'fake-org')
+        self.assertEqual(variables['name'], 'fake-repo')
+        self.assertEqual(variables['states'], ['CLOSED', 'MERGED'])
+
+    def test_stops_at_start_date(self):
+        self.client.reviews_counts(self.repo, ['user0'], self.start_date, self.end_date, 'closed')
+        cursors = [c[1]['json']['variables']['cursor'] for c in self.session.post.call_args_list if 'number' not in c[1]['json']['variables']]
+        self.assertEqual(cursors, [None, '1', '2', '3'])
+
+    def test_cost_summary(self):
+        self.client.reviews_counts(self.repo, ['user0'], self.start_date, self.end_date, 'closed')
+        self.assertEqual(self.client.cost_points, self.session.post.call_count)
+        self.assertEqual(self.client.remaining_points, 4999)
+        self.assertTrue("{cost} points".format(cost=self.client.cost_points) in self.client.cost_summary())
+
+    def test_query_errors(self):
+        self.session.post.side_effect = None
+        self.session.post.return_value = Mock(json=Mock(return_value={'errors': [{'message': 'Could not resolve'}]}))
+        with self.assertRaises(Exception):
+            self.client.reviews_counts(self.repo, ['user0'], self.start_date, self.end_date, 'closed')
+
+class TestGraphQLURL(unittest.TestCase):
+    def test_graphql_url(self):
+        self.assertEqual(graphql_url('https://api.github.com'), GRAPHQL_URL)
+        self.assertEqual(graphql_url('https://github.example.com/api/v3/'), 'https://github.example.com/api/graphql')
+
+if __name__ == '__main__':
+    unittest.main()
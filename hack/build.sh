@@ -61,6 +61,12 @@ run() {
     exit 0
   fi
 
+  # Run only benchmarks
+  if $(has_flag --bench -b); then
+    py_bench
+    exit 0
+  fi
+
   # Run only all tests
   if $(has_flag --tests -T); then
     py_test
@@ -183,6 +189,22 @@ py_e2e() {
   rm $e2e_output
 }
 
+py_bench() {
+  echo "⏱️  Benchmarks"
+  set +e
+  python3 -m unittest discover -s bench -p '*_test.py'
+  local err=$?
+  if [ $err -ne 0 ]; then
+    exit $err
+  fi
+  python3 bench/bench.py
+  err=$?
+  if [ $err -ne 0 ]; then
+    echo "🔥 Regressions over bench/baselines.json"
+    exit $err
+  fi
+}
+
 check_credentials() {
   gh_access_token=${GH_ACCESS_TOKEN:-''}
   if [[ -z "$gh_access_token" ]]; then
@@ -299,6 +321,7 @@ with the following options:
 -t  --test                    Run the UT tests when used with --fast or --watch
 -e  --e2e                     Run the e2e tests when used with --fast or --watch
 -T  --tests                   Run the UT and e2e tests
+-b  --bench                   Run the benchmarks against a fake GitHub API and compare to bench/baselines.json
 -d  --docker                  Generates Docker image and push using DOCKER_USERNAME
     --docker-image            Generates Docker image only
     --docker-push             Pushes Docker image using DOCKER_USERNAME
@@ -317,6 +340,7 @@ Examples:
 * Run only UT tests:.................. build.sh --test
 * Run only e2e tests: ................ build.sh --e2e
 * Run all tests: ..................... build.sh --tests
+* Run benchmarks: .................... build.sh --bench
 * Compile with tests: ................ build.sh -f -t
 * Generate and push docker image: .... build.sh --docker
 * Build and all and tests: ........... build.sh --all
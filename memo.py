@@ -0,0 +1,63 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (org TEXT, repo TEXT, data TEXT, state TEXT, user TEXT, year INTEGER, month INTEGER, count INTEGER, PRIMARY KEY (org, repo, data, state, user, year, month));
+"""
+
+# Local SQLite copy of the counts of months that ended long enough ago to never change,
+# so that collecting them again needs no GitHub API calls
+class ResultsMemo:
+    DEFAULT_MEMO = '~/.ghtrack/memo.db'
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        if os.path.dirname(self.path) != '':
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _in(self, values):
+        return ','.join('?'*len(values))
+
+    # returns {repo_name: {user: count}} of the memoized counts
+    def counts(self, org, data, state, year, month, repos_names, users):
+        repos_counts = {}
+        rows = self.db.execute("SELECT repo, user, count FROM counts WHERE org = ? AND data = ? AND state = ? AND year = ? AND month = ? AND repo IN ({repos}) AND user IN ({users})".format(repos=self._in(repos_names), users=self._in(users)),
+                               (org, data, state, year, month, *repos_names, *users)).fetchall()
+        for repo_name, user, count in rows:
+            repos_counts.setdefault(repo_name, {})[user] = count
+        return repos_counts
+
+    # repos_counts is {repo_name: {user: count}}
+    def put(self, org, data, state, year, month, repos_counts):
+        self.db.executemany("INSERT OR REPLACE INTO counts (org, repo, data, state, user, year, month, count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            [(org, repo_name, data, state, user, year, month, count) for repo_name, users_counts in repos_counts.items() for user, count in users_counts.items()])
+        self.db.commit()
+
+    # drops the counts of org, only of repos_names and users when set, and returns how many
+    def invalidate(self, org, repos_names=None, users=None):
+        query, params = "DELETE FROM counts WHERE org = ?", [org]
+        if repos_names:
+            query, params = query + " AND repo IN ({repos})".format(repos=self._in(repos_names)), params + list(repos_names)
+        if users:
+            query, params = query + " AND user IN ({users})".format(users=self._in(users)), params + list(users)
+        deleted = self.db.execute(query, params).rowcount
+        self.db.commit()
+        return deleted
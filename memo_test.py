@@ -0,0 +1,51 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os, tempfile, unittest
+
+from memo import *
+
+class TestResultsMemo(unittest.TestCase):
+    def setUp(self):
+        self.db_file, self.db_path = tempfile.mkstemp()
+        self.memo = ResultsMemo(self.db_path)
+        self.memo.put('fake-org', 'prs', 'closed', 2020, 7, {'repo0': {'user0': 1, 'user1': 0}, 'repo1': {'user0': 2}})
+
+    def tearDown(self):
+        self.memo.close()
+        os.close(self.db_file)
+        os.remove(self.db_path)
+
+    def test_counts(self):
+        self.assertEqual(self.memo.counts('fake-org', 'prs', 'closed', 2020, 7, ['repo0', 'repo1'], ['user0', 'user1']),
+                         {'repo0': {'user0': 1, 'user1': 0}, 'repo1': {'user0': 2}})
+        self.assertEqual(self.memo.counts('fake-org', 'prs', 'closed', 2020, 7, ['repo1'], ['user1']), {})
+        self.assertEqual(self.memo.counts('fake-org', 'prs', 'open', 2020, 7, ['repo0'], ['user0']), {})
+        self.assertEqual(self.memo.counts('fake-org', 'issues', 'closed', 2020, 7, ['repo0'], ['user0']), {})
+        self.assertEqual(self.memo.counts('fake-org', 'prs', 'closed', 2020, 6, ['repo0'], ['user0']), {})
+
+    def test_put_replaces(self):
+        self.memo.put('fake-org', 'prs', 'closed', 2020, 7, {'repo0': {'user0': 5}})
+        self.assertEqual(self.memo.counts('fake-org', 'prs', 'closed', 2020, 7, ['repo0'], ['user0']), {'repo0': {'user0': 5}})
+
+    def test_invalidate(self):
+        self.memo.put('other-org', 'prs', 'closed', 2020, 7, {'repo0': {'user0': 1}})
+        self.assertEqual(self.memo.invalidate('fake-org', ['repo0'], ['user1']), 1)
+        self.assertEqual(self.memo.invalidate('fake-org', users=['user0']), 2)
+        self.assertEqual(self.memo.invalidate('fake-org'), 0)
+        self.assertEqual(self.memo.invalidate('other-org'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
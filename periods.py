@@ -0,0 +1,51 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from datetime import datetime, timedelta
+
+PERIODS = ['week', 'month', 'quarter']
+
+# weeks start on Sunday like the weeks of GitHub contributors stats
+def period_start(period, date):
+    date = datetime(date.year, date.month, date.day)
+    if period == 'week':
+        return date - timedelta(days=(date.weekday() + 1) % 7)
+    elif period == 'quarter':
+        return datetime(date.year, 3*((date.month - 1) // 3) + 1, 1)
+    return datetime(date.year, date.month, 1)
+
+# e.g., '2020-07-05' for a week, '2020-07' for a month, and '2020-Q3' for a quarter
+def period_key(period, date):
+    start = period_start(period, date)
+    if period == 'week':
+        return start.strftime('%Y-%m-%d')
+    elif period == 'quarter':
+        return "{year}-Q{quarter}".format(year=start.year, quarter=(start.month - 1) // 3 + 1)
+    return start.strftime('%Y-%m')
+
+def _next_period_start(period, start):
+    if period == 'week':
+        return start + timedelta(days=7)
+    months = 3 if period == 'quarter' else 1
+    return datetime(start.year + (start.month - 1 + months) // 12, (start.month - 1 + months) % 12 + 1, 1)
+
+# the keys of all periods overlapping start_date to end_date, in order
+def period_keys(period, start_date, end_date):
+    keys = []
+    start = period_start(period, start_date)
+    while start <= end_date:
+        keys.append(period_key(period, start))
+        start = _next_period_start(period, start)
+    return keys
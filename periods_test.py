@@ -0,0 +1,37 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+
+from datetime import datetime
+
+from periods import *
+
+class TestPeriods(unittest.TestCase):
+    def test_period_key(self):
+        # 2020-07-08 is a Wednesday
+        self.assertEqual(period_key('week', datetime(2020, 7, 8, 10)), '2020-07-05')
+        self.assertEqual(period_key('week', datetime(2020, 7, 5)), '2020-07-05')
+        self.assertEqual(period_key('month', datetime(2020, 7, 31, 23, 59)), '2020-07')
+        self.assertEqual(period_key('quarter', datetime(2020, 9, 30)), '2020-Q3')
+        self.assertEqual(period_key('quarter', datetime(2020, 10, 1)), '2020-Q4')
+
+    def test_period_keys(self):
+        self.assertEqual(period_keys('month', datetime(2020, 11, 15), datetime(2021, 2, 1)), ['2020-11', '2020-12', '2021-01', '2021-02'])
+        self.assertEqual(period_keys('quarter', datetime(2020, 1, 1), datetime(2020, 12, 31)), ['2020-Q1', '2020-Q2', '2020-Q3', '2020-Q4'])
+        self.assertEqual(period_keys('week', datetime(2020, 7, 1), datetime(2020, 7, 14)), ['2020-06-28', '2020-07-05', '2020-07-12'])
+
+if __name__ == '__main__':
+    unittest.main()
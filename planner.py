@@ -0,0 +1,142 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import math
+
+from datetime import datetime
+
+from common import *
+
+# One chosen strategy for a metric, with the estimated API calls of every strategy considered
+class PlanStep:
+    def __init__(self, metric, repo_name, estimates):
+        self.metric = metric
+        self.repo_name = repo_name
+        self.estimates = estimates
+        # ties go to the first strategy, i.e., listing, whose responses are cached
+        self.strategy = min(estimates, key=lambda strategy: estimates[strategy])
+
+    def estimated_calls(self):
+        return self.estimates[self.strategy]
+
+# Plan of one metric, either one search per user over the whole organization or one step per repo
+class Plan:
+    def __init__(self, metric, steps, org_search_calls=None, planning_calls=0):
+        self.metric = metric
+        self.steps = {step.repo_name: step for step in steps}
+        self.planning_calls = planning_calls
+        self.org_search_calls = org_search_calls
+        self.org_search = org_search_calls != None and org_search_calls < sum([step.estimated_calls() for step in steps])
+
+    def strategy(self, repo_name):
+        if self.org_search:
+            return 'org search'
+        return self.steps[repo_name].strategy
+
+    def estimated_calls(self):
+        if self.org_search:
+            return self.org_search_calls
+        return sum([step.estimated_calls() for step in self.steps.values()])
+
+    def rows(self):
+        rows = []
+        if self.org_search:
+            rows.append([self.metric, '*', 'org search', self.org_search_calls, "list: {calls}".format(calls=sum([s.estimates['list'] for s in self.steps.values()]))])
+            return rows
+        for step in self.steps.values():
+            others = ', '.join(["{strategy}: {calls}".format(strategy=strategy, calls=calls) for strategy, calls in sorted(step.estimates.items()) if strategy != step.strategy])
+            rows.append([self.metric, step.repo_name, step.strategy, step.estimated_calls(), others])
+        return rows
+
+# Estimates the API calls of each way a client can count a metric, from the totals of each
+# repo listings, the number of tracked users, and the date window, and picks the cheapest:
+# listing costs a page per PER_PAGE items since start_date, searching costs one call per user
+class Planner:
+    PER_PAGE = 30
+    GRAPHQL_PRS_PER_REQUEST = 50
+    METRICS = ['prs', 'issues', 'reviews']
+    RESOURCES = {'list': 'core', 'search': 'search', 'graphql': 'graphql'}
+    def __init__(self, client, org, users, start_date, end_date, state, now=None):
+        self.client = client
+        self.org = org
+        self.users = users
+        self.start_date = start_date
+        self.end_date = end_date
+        self.state = state
+        self.now = now or datetime.utcnow()
+        self.__totals = {}
+        self.planning_calls = 0
+
+    # fraction of a repo items created since start_date, assuming they were created evenly since the repo was
+    def _fraction_since_start(self, repo):
+        created_at = to_utc(getattr(repo, 'created_at', None))
+        if not isinstance(created_at, datetime) or created_at >= self.start_date:
+            return 1.0
+        age = (self.now - created_at).total_seconds()
+        return min(1.0, max(0.0, (self.now - self.start_date).total_seconds() / age))
+
+    # listing totals cost one call per repo and listing, PRs totals are shared by the prs and reviews plans
+    def _total(self, repo, listing):
+        key = (repo.name, listing)
+        if key not in self.__totals:
+            self.planning_calls += 1
+            if listing == 'prs':
+                self.__totals[key] = self.client.prs_total(repo, self.state)
+            else:
+                self.__totals[key] = self.client.issues_total(repo, self.state)
+        return self.__totals[key]
+
+    def _items_since_start(self, repo, listing):
+        return self._total(repo, listing) * self._fraction_since_start(repo)
+
+    def _list_calls(self, items):
+        return 1 + math.floor(items / self.PER_PAGE)
+
+    def estimates(self, metric, repo):
+        if metric == 'reviews':
+            prs = self._items_since_start(repo, 'prs')
+            estimates = {'list': self._list_calls(prs) + math.ceil(prs)}
+            if hasattr(self.client, 'list_reviews_counts'):
+                estimates['graphql'] = 1 + math.floor(prs / self.GRAPHQL_PRS_PER_REQUEST)
+            return estimates
+        items = self._items_since_start(repo, metric)
+        return {'list': self._list_calls(items), 'search': len(self.users)}
+
+    # returns the estimated calls of counting metric with strategy, i.e., 'list', 'search', 'graphql', or 'auto', per API resource
+    def estimate(self, metric, repos, strategy):
+        calls = {'core': 0, 'search': 0, 'graphql': 0}
+        if metric == 'commits':
+            # git mirrors only call the API for commit emails never seen before
+            calls['core'] = 0 if strategy == 'git' else len(repos)
+            return calls
+        if strategy == 'auto' or (strategy == 'search' and metric in ['prs', 'issues']):
+            plan = self.plan(metric, repos)
+            if strategy == 'search' or plan.org_search:
+                calls['search'] = plan.org_search_calls
+                return calls
+            for step in plan.steps.values():
+                calls[self.RESOURCES[step.strategy]] += step.estimated_calls()
+            return calls
+        for repo in repos:
+            estimates = self.estimates(metric, repo)
+            repo_strategy = strategy if strategy in estimates else 'list'
+            calls[self.RESOURCES[repo_strategy]] += estimates[repo_strategy]
+        return calls
+
+    def plan(self, metric, repos):
+        planning_calls = self.planning_calls
+        steps = [PlanStep(metric, repo.name, self.estimates(metric, repo)) for repo in repos]
+        org_search_calls = len(self.users) if metric in ['prs', 'issues'] else None
+        return Plan(metric, steps, org_search_calls, self.planning_calls - planning_calls)
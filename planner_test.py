@@ -0,0 +1,81 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import unittest
+
+from unittest.mock import Mock
+from datetime import datetime
+
+from planner import *
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        self.client = Mock(spec=['prs_total', 'issues_total', 'list_reviews_counts'])
+        self.totals = {'big-repo': 3000, 'small-repo': 20}
+        self.client.prs_total.side_effect = lambda repo, state: self.totals[repo.name]
+        self.client.issues_total.side_effect = lambda repo, state: self.totals[repo.name]
+        self.repos = [self.__repo('big-repo', datetime(2020, 1, 1)), self.__repo('small-repo', datetime(2020, 7, 1))]
+        self.planner = Planner(self.client, 'fake-org', ['user0', 'user1', 'user2'], datetime(2020, 7, 1), datetime(2020, 7, 31), 'closed', now=datetime(2020, 8, 1))
+
+    def __repo(self, name, created_at):
+        repo = Mock(created_at=created_at)
+        repo.name = name
+        return repo
+
+    def test_estimates(self):
+        # big-repo PRs are spread over 213 days, 31 of them since start date
+        self.assertEqual(self.planner.estimates('prs', self.repos[0]), {'list': 1 + (3000*31//213)//30, 'search': 3})
+        self.assertEqual(self.planner.estimates('issues', self.repos[1]), {'list': 1, 'search': 3})
+        self.assertEqual(self.planner.estimates('reviews', self.repos[1]), {'list': 21, 'graphql': 1})
+
+    def test_plan_per_repo(self):
+        self.planner.users = ['user{no}'.format(no=no) for no in range(40)]
+        plan = self.planner.plan('prs', self.repos)
+        self.assertFalse(plan.org_search)
+        self.assertEqual(plan.strategy('big-repo'), 'list')
+        self.assertEqual(plan.strategy('small-repo'), 'list')
+        self.assertEqual(plan.estimated_calls(), 16)
+        self.assertEqual(plan.rows()[1], ['prs', 'small-repo', 'list', 1, 'search: 40'])
+        self.assertEqual(plan.planning_calls, 2)
+
+    def test_plan_org_search(self):
+        plan = self.planner.plan('issues', self.repos)
+        self.assertTrue(plan.org_search)
+        self.assertEqual(plan.strategy('small-repo'), 'org search')
+        self.assertEqual(plan.estimated_calls(), 3)
+        self.assertEqual(plan.rows()[0][:4], ['issues', '*', 'org search', 3])
+
+    def test_plan_reviews(self):
+        plan = self.planner.plan('reviews', self.repos)
+        self.assertFalse(plan.org_search)
+        self.assertEqual(plan.strategy('big-repo'), 'graphql')
+        del self.client.list_reviews_counts
+        self.assertEqual(self.planner.plan('reviews', self.repos).strategy('big-repo'), 'list')
+
+    def test_estimate(self):
+        self.assertEqual(self.planner.estimate('commits', self.repos, 'list'), {'core': 2, 'search': 0, 'graphql': 0})
+        self.assertEqual(self.planner.estimate('prs', self.repos, 'list'), {'core': 16, 'search': 0, 'graphql': 0})
+        self.assertEqual(self.planner.estimate('prs', self.repos, 'search'), {'core': 0, 'search': 3, 'graphql': 0})
+        self.assertEqual(self.planner.estimate('reviews', self.repos, 'search'), {'core': 15 + 437 + 21, 'search': 0, 'graphql': 0})
+        self.assertEqual(self.planner.estimate('reviews', self.repos, 'auto'), {'core': 0, 'search': 0, 'graphql': 10})
+
+    def test_totals_cached(self):
+        self.planner.plan('prs', self.repos)
+        plan = self.planner.plan('reviews', self.repos)
+        self.assertEqual(plan.planning_calls, 0)
+        self.assertEqual(self.client.prs_total.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os, sqlite3, threading
+
+from datetime import datetime
+
+from client import GHClient
+
+from common import *
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (org TEXT, name TEXT, full_name TEXT, PRIMARY KEY (org, name));
+CREATE TABLE IF NOT EXISTS prs (repo TEXT, number INTEGER, author TEXT, state TEXT, created_at TEXT, updated_at TEXT, PRIMARY KEY (repo, number));
+CREATE INDEX IF NOT EXISTS prs_repo_author_created_at ON prs (repo, author, created_at);
+CREATE TABLE IF NOT EXISTS issues (repo TEXT, number INTEGER, author TEXT, state TEXT, created_at TEXT, updated_at TEXT, PRIMARY KEY (repo, number));
+CREATE INDEX IF NOT EXISTS issues_repo_author_created_at ON issues (repo, author, created_at);
+CREATE TABLE IF NOT EXISTS reviews (repo TEXT, id INTEGER, pr_number INTEGER, author TEXT, submitted_at TEXT, PRIMARY KEY (repo, id));
+CREATE INDEX IF NOT EXISTS reviews_repo_author_submitted_at ON reviews (repo, author, submitted_at);
+CREATE TABLE IF NOT EXISTS contributor_weeks (repo TEXT, author TEXT, week TEXT, additions INTEGER, deletions INTEGER, commits INTEGER, PRIMARY KEY (repo, author, week));
+CREATE TABLE IF NOT EXISTS sync_state (repo TEXT, data TEXT, high_water TEXT, PRIMARY KEY (repo, data));
+"""
+
+# dates are stored as sortable UTC text, e.g., '2020-07-01 12:00:00'
+def to_db_date(date):
+    if date == None:
+        return None
+    return to_utc(date).strftime('%Y-%m-%d %H:%M:%S')
+
+def from_db_date(text):
+    return datetime.strptime(text, '%Y-%m-%d %H:%M:%S')
+
+# Local SQLite copy of the PRs, issues, reviews, and contributors weekly stats of
+# synced repos, updated incrementally from the last synced item of each repo; counts read the store from the
+# counting worker threads, so the connection is shared and its queries are serialized with a lock
+class EventStore:
+    DEFAULT_STORE = '~/.ghtrack/ghtrack.db'
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        if os.path.dirname(self.path) != '':
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript(SCHEMA)
+
+    def _fetchall(self, query, params):
+        with self.lock:
+            return self.db.execute(query, params).fetchall()
+
+    def close(self):
+        self.db.close()
+
+    def high_water(self, repo_name, data):
+        rows = self._fetchall("SELECT high_water FROM sync_state WHERE repo = ? AND data = ?", (repo_name, data))
+        if len(rows) == 0 or rows[0][0] == None:
+            return None
+        return from_db_date(rows[0][0])
+
+    def _set_high_water(self, repo_name, data, high_water):
+        self.db.execute("INSERT OR REPLACE INTO sync_state (repo, data, high_water) VALUES (?, ?, ?)", (repo_name, data, to_db_date(high_water)))
+
+    def _max_date(self, date, other_date):
+        if date == None or (other_date != None and to_db_date(other_date) > to_db_date(date)):
+            return other_date
+        return date
+
+    # each sync_* method fetches only what was updated since the repo high water mark and returns the number of items stored
+    def sync_repo(self, client, org, repo):
+        self.db.execute("INSERT OR REPLACE INTO repos (org, name, full_name) VALUES (?, ?, ?)", (org, repo.name, repo.full_name))
+        counts = {'prs': self.sync_prs(client, repo),
+                  'issues': self.sync_issues(client, repo),
+                  'weeks': self.sync_contributor_weeks(client, repo)}
+        self.db.commit()
+        return counts
+
+    # reviews are synced with their PR, since submitting a review updates the PR
+    def sync_prs(self, client, repo):
+        high_water = self.high_water(repo.full_name, 'prs')
+        new_high_water = high_water
+        prs_count = 0
+        client._count_check_api_calls()
+        for pr in repo.get_pulls(state='all', sort='updated', direction='desc'):
+            if high_water != None and to_db_date(pr.updated_at) <= to_db_date(high_water):
+                break
+            self.db.execute("INSERT OR REPLACE INTO prs (repo, number, author, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                            (repo.full_name, pr.number, pr.user.login if pr.user else None, pr.state, to_db_date(pr.created_at), to_db_date(pr.updated_at)))
+            client._count_check_api_calls()
+            for r in pr.get_reviews():
+                self.db.execute("INSERT OR REPLACE INTO reviews (repo, id, pr_number, author, submitted_at) VALUES (?, ?, ?, ?, ?)",
+                                (repo.full_name, r.id, pr.number, r.user.login if r.user else None, to_db_date(r.submitted_at)))
+            new_high_water = self._max_date(new_high_water, pr.updated_at)
+            prs_count += 1
+        self._set_high_water(repo.full_name, 'prs', new_high_water)
+        return prs_count
+
+    def sync_issues(self, client, repo):
+        high_water = self.high_water(repo.full_name, 'issues')
+        new_high_water = high_water
+        issues_count = 0
+        client._count_check_api_calls()
+        if high_water == None:
+            issues = repo.get_issues(state='all')
+        else:
+            issues = repo.get_issues(state='all', since=high_water)
+        for i in issues:
+            self.db.execute("INSERT OR REPLACE INTO issues (repo, number, author, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                            (repo.full_name, i.number, i.user.login if i.user else None, i.state, to_db_date(i.created_at), to_db_date(i.updated_at)))
+            new_high_water = self._max_date(new_high_water, i.updated_at)
+            issues_count += 1
+        self._set_high_water(repo.full_name, 'issues', new_high_water)
+        return issues_count
+
+    # contributors stats are one precomputed payload per repo, so they are replaced as a whole
+    def sync_contributor_weeks(self, client, repo):
+        client._count_check_api_calls()
+        stats_contributors = repo.get_stats_contributors()
+        if stats_contributors == None:
+            Console.warn("contributors stats for repo: '{repo}' are being computed by GitHub, sync again later".format(repo=repo.full_name))
+            return 0
+        self.db.execute("DELETE FROM contributor_weeks WHERE repo = ?", (repo.full_name,))
+        weeks_count = 0
+        for sc in stats_contributors:
+            if sc.author == None:
+                continue
+            for w in sc.weeks:
+                self.db.execute("INSERT OR REPLACE INTO contributor_weeks (repo, author, week, additions, deletions, commits) VALUES (?, ?, ?, ?, ?, ?)",
+                                (repo.full_name, sc.author.login, to_db_date(w.w), w.a, w.d, w.c))
+                weeks_count += 1
+        self._set_high_water(repo.full_name, 'weeks', datetime.utcnow())
+        return weeks_count
+
+    def repos(self, org):
+        return self._fetchall("SELECT name, full_name FROM repos WHERE org = ? ORDER BY name", (org,))
+
+    # returns [(author, day, count), ...] so that counts can be bucketed per period
+    def _authors_counts(self, query, params):
+        return [(author, from_db_date(day + ' 00:00:00'), count) for author, day, count in self._fetchall(query, params)]
+
+    # authors=None matches all authors
+    def _authors_filter(self, column, authors):
+        if authors == None:
+            return "{column} IS NOT NULL".format(column=column), ()
+        return "{column} IN ({authors})".format(column=column, authors=','.join('?'*len(authors))), tuple(authors)
+
+    def prs_counts(self, repo_name, authors, start_date, end_date, state):
+        authors_filter, authors_params = self._authors_filter('author', authors)
+        return self._authors_counts("SELECT author, substr(created_at, 1, 10), COUNT(*) FROM prs WHERE repo = ? AND {authors_filter} AND created_at >= ? AND created_at <= ? AND state = ? GROUP BY author, substr(created_at, 1, 10)".format(authors_filter=authors_filter),
+                                    (repo_name, *authors_params, to_db_date(start_date), to_db_date(end_date), state))
+
+    def issues_counts(self, repo_name, authors, start_date, end_date, state):
+        authors_filter, authors_params = self._authors_filter('author', authors)
+        return self._authors_counts("SELECT author, substr(created_at, 1, 10), COUNT(*) FROM issues WHERE repo = ? AND {authors_filter} AND created_at >= ? AND created_at <= ? AND state = ? GROUP BY author, substr(created_at, 1, 10)".format(authors_filter=authors_filter),
+                                    (repo_name, *authors_params, to_db_date(start_date), to_db_date(end_date), state))
+
+    def reviews_counts(self, repo_name, authors, start_date, end_date, pr_state):
+        authors_filter, authors_params = self._authors_filter('r.author', authors)
+        return self._authors_counts("SELECT r.author, substr(r.submitted_at, 1, 10), COUNT(*) FROM reviews r JOIN prs p ON p.repo = r.repo AND p.number = r.pr_number WHERE r.repo = ? AND {authors_filter} AND r.submitted_at >= ? AND r.submitted_at <= ? AND p.state = ? GROUP BY r.author, substr(r.submitted_at, 1, 10)".format(authors_filter=authors_filter),
+                                    (repo_name, *authors_params, to_db_date(start_date), to_db_date(end_date), pr_state))
+
+    # returns [(author, week, additions, deletions, commits), ...]
+    def contributor_weeks(self, repo_name, authors):
+        authors_filter, authors_params = self._authors_filter('author', authors)
+        rows = self._fetchall("SELECT author, week, additions, deletions, commits FROM contributor_weeks WHERE repo = ? AND {authors_filter}".format(authors_filter=authors_filter),
+                              (repo_name, *authors_params))
+        return [(author, from_db_date(week), a, d, c) for author, week, a, d, c in rows]
+
+class StoreRepo:
+    def __init__(self, name, full_name):
+        self.name = name
+        self.full_name = full_name
+
+# GHClient answering the counts from an EventStore without any GitHub API calls
+class StoreClient(GHClient):
+    def __init__(self, store):
+        super().__init__('')
+        self.store = store
+
+    def get_client(self):
+        raise Exception("no GitHub client when using the local store, run 'ght sync' to update it")
+
+    def cost_summary(self):
+        return "Answered from local store: {path}".format(path=self.store.path)
+
+    def repos(self, org):
+        return Repos([StoreRepo(name, full_name) for name, full_name in self.store.repos(org)])
+
+    def repo(self, org, name):
+        return next((repo for repo in self.repos(org) if repo.name == name), None)
+
+    def _authors_counts(self, authors, rows):
+        authors_counts = self._init_authors_count_map(authors)
+        for author, day, count in rows:
+            self._count(authors_counts, author, day, count)
+        return authors_counts
+
+    def reviews_count(self, repo, author, start_date, end_date, pr_state='close'):
+        return self.reviews_counts(repo, [author], start_date, end_date, pr_state)[author]
+
+    def reviews_counts(self, repo, authors, start_date, end_date, pr_state='close'):
+        return self._authors_counts(authors, self.store.reviews_counts(repo.full_name, authors, start_date, end_date, pr_state))
+
+    # the store has no listing to share
+    def prs_reviews_counts(self, repo, authors, start_date, end_date, state='close'):
+        return self.prs_counts(repo, authors, start_date, end_date, state), self.reviews_counts(repo, authors, start_date, end_date, state)
+
+    def prs_count(self, repo, author, start_date, end_date, state='close'):
+        return self.prs_counts(repo, [author], start_date, end_date, state)[author]
+
+    def prs_counts(self, repo, authors, start_date, end_date, state='close'):
+        return self._authors_counts(authors, self.store.prs_counts(repo.full_name, authors, start_date, end_date, state))
+
+    def issues_count(self, repo, author, start_date, end_date, state='close'):
+        return self.issues_counts(repo, [author], start_date, end_date, state)[author]
+
+    def issues_counts(self, repo, authors, start_date, end_date, state='close'):
+        return self._authors_counts(authors, self.store.issues_counts(repo.full_name, authors, start_date, end_date, state))
+
+    def commits_count(self, repo, author, start_date, end_date):
+        return self.commits_counts(repo, [author], start_date, end_date)[author]
+
+    def commits_counts(self, repo, authors, start_date, end_date):
+        return self.commits_churn_counts(repo, authors, start_date, end_date)[0]
+
+    def commits_churn_counts(self, repo, authors, start_date, end_date):
+        commits_counts = self._init_authors_count_map(authors)
+        additions_counts = self._init_authors_count_map(authors)
+        deletions_counts = self._init_authors_count_map(authors)
+        for author, week, a, d, c in self.store.contributor_weeks(repo.full_name, authors):
+            if self._week_in(week, start_date, end_date):
+                self._count(commits_counts, author, week, c)
+                self._count(additions_counts, author, week, a)
+                self._count(deletions_counts, author, week, d)
+        return commits_counts, additions_counts, deletions_counts
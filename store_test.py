@@ -0,0 +1,126 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os, tempfile, unittest
+
+from unittest.mock import Mock
+from datetime import datetime
+
+from client import GHClient
+from store import *
+
+class TestEventStore(unittest.TestCase):
+    def setUp(self):
+        self.start_date = datetime(2020, 7, 1)
+        self.end_date = datetime(2020, 7, 31)
+        self.db_file, self.db_path = tempfile.mkstemp()
+        self.store = EventStore(self.db_path)
+        self.client = GHClient("fake-access-token", Mock())
+        self.prs = [self.__pr(3, 'user0', 'closed', datetime(2020, 7, 20), datetime(2020, 7, 25), [('user1', datetime(2020, 7, 21))]),
+                    self.__pr(2, 'user1', 'open', datetime(2020, 7, 10), datetime(2020, 7, 12), [('user0', datetime(2020, 7, 11))]),
+                    self.__pr(1, 'user0', 'closed', datetime(2020, 6, 10), datetime(2020, 7, 2), [('user1', datetime(2020, 7, 2)), ('user1', datetime(2020, 6, 11))])]
+        self.issues = [self.__item(5, 'user0', 'closed', datetime(2020, 7, 3), datetime(2020, 7, 4)),
+                       self.__item(4, 'user0', 'closed', datetime(2020, 5, 3), datetime(2020, 7, 4))]
+        self.repo = self.__repo()
+
+    def tearDown(self):
+        self.store.close()
+        os.close(self.db_file)
+        os.remove(self.db_path)
+
+    def __item(self, number, login, state, created_at, updated_at):
+        return Mock(number=number, user=Mock(login=login), state=state, created_at=created_at, updated_at=updated_at)
+
+    def __pr(self, number, login, state, created_at, updated_at, reviews):
+        pr = self.__item(number, login, state, created_at, updated_at)
+        pr.get_reviews.return_value = [Mock(id=number*10+no, user=Mock(login=r[0]), submitted_at=r[1]) for no, r in enumerate(reviews)]
+        return pr
+
+    def __repo(self):
+        repo = Mock(full_name='fake-org/fake-repo')
+        repo.name = 'fake-repo'
+        repo.get_pulls.side_effect = lambda **kwargs: list(self.prs)
+        repo.get_issues.side_effect = lambda **kwargs: list(self.issues)
+        weeks = [Mock(w=datetime(2020, 7, 5), a=10, d=2, c=3), Mock(w=datetime(2020, 5, 3), a=1, d=1, c=1)]
+        repo.get_stats_contributors.return_value = [Mock(author=Mock(login='user0'), weeks=weeks)]
+        return repo
+
+    def __store_client(self):
+        store_client = StoreClient(self.store)
+        repos = store_client.repos('fake-org')
+        self.assertEqual(repos.totalCount, 1)
+        return store_client, repos[0]
+
+    def test_sync_repo(self):
+        counts = self.store.sync_repo(self.client, 'fake-org', self.repo)
+        self.assertEqual(counts, {'prs': 3, 'issues': 2, 'weeks': 2})
+        self.assertEqual(self.store.high_water('fake-org/fake-repo', 'prs'), datetime(2020, 7, 25))
+        self.assertEqual(self.store.high_water('fake-org/fake-repo', 'issues'), datetime(2020, 7, 4))
+
+    def test_sync_incremental(self):
+        self.store.sync_repo(self.client, 'fake-org', self.repo)
+        self.prs.insert(0, self.__pr(4, 'user1', 'closed', datetime(2020, 7, 26), datetime(2020, 7, 27), []))
+        counts = self.store.sync_repo(self.client, 'fake-org', self.repo)
+        self.assertEqual(counts['prs'], 1)
+        self.assertEqual(self.prs[1].get_reviews.call_count, 1)
+        self.repo.get_issues.assert_called_with(state='all', since=datetime(2020, 7, 4))
+
+    def test_sync_stats_computing(self):
+        self.repo.get_stats_contributors.return_value = None
+        counts = self.store.sync_repo(self.client, 'fake-org', self.repo)
+        self.assertEqual(counts['weeks'], 0)
+
+    def test_store_client_counts(self):
+        self.store.sync_repo(self.client, 'fake-org', self.repo)
+        store_client, repo = self.__store_client()
+        authors = ['user0', 'user1', 'user2']
+        self.assertEqual(store_client.prs_counts(repo, authors, self.start_date, self.end_date, 'closed'), {'user0': 1, 'user1': 0, 'user2': 0})
+        self.assertEqual(store_client.prs_count(repo, 'user1', self.start_date, self.end_date, 'open'), 1)
+        self.assertEqual(store_client.issues_counts(repo, authors, self.start_date, self.end_date, 'closed'), {'user0': 1, 'user1': 0, 'user2': 0})
+        self.assertEqual(store_client.reviews_counts(repo, authors, self.start_date, self.end_date, 'closed'), {'user0': 0, 'user1': 2, 'user2': 0})
+        self.assertEqual(store_client.commits_counts(repo, authors, self.start_date, self.end_date), {'user0': 3, 'user1': 0, 'user2': 0})
+        self.assertEqual(store_client.commits_churn_counts(repo, ['user0'], self.start_date, self.end_date), ({'user0': 3}, {'user0': 10}, {'user0': 2}))
+
+    def test_store_client_counts_period(self):
+        self.store.sync_repo(self.client, 'fake-org', self.repo)
+        store_client, repo = self.__store_client()
+        store_client.set_period('month')
+        self.assertEqual(store_client.reviews_counts(repo, ['user1'], datetime(2020, 6, 1), self.end_date, 'closed'), {'user1': {'2020-06': 1, '2020-07': 2}})
+        self.assertEqual(store_client.issues_counts(repo, ['user0'], datetime(2020, 5, 1), self.end_date, 'closed'), {'user0': {'2020-05': 1, '2020-07': 1}})
+
+    def test_store_client_counts_all_authors(self):
+        self.store.sync_repo(self.client, 'fake-org', self.repo)
+        store_client, repo = self.__store_client()
+        self.assertEqual(store_client.reviews_counts(repo, None, self.start_date, self.end_date, 'closed'), {'user1': 2})
+        self.assertEqual(store_client.prs_counts(repo, None, self.start_date, self.end_date, 'open'), {'user1': 1})
+        self.assertEqual(store_client.commits_counts(repo, None, self.start_date, self.end_date), {'user0': 3})
+
+    def test_store_client_matches_client(self):
+        self.store.sync_repo(self.client, 'fake-org', self.repo)
+        store_client, repo = self.__store_client()
+        authors = ['user0', 'user1']
+        self.repo.get_pulls.side_effect = lambda **kwargs: [pr for pr in self.prs if pr.state == kwargs['state']]
+        self.assertEqual(store_client.reviews_counts(repo, authors, self.start_date, self.end_date, 'closed'),
+                         self.client.reviews_counts(self.repo, authors, self.start_date, self.end_date, 'closed'))
+        self.assertEqual(store_client.prs_counts(repo, authors, self.start_date, self.end_date, 'closed'),
+                         self.client.prs_counts(self.repo, authors, self.start_date, self.end_date, 'closed'))
+
+    def test_store_client_no_api(self):
+        self.store.sync_repo(self.client, 'fake-org', self.repo)
+        store_client, repo = self.__store_client()
+        with self.assertRaises(Exception):
+            store_client.get_client()
+
+if __name__ == '__main__':
+    unittest.main()
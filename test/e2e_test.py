@@ -22,10 +22,17 @@ HELP_STRING = """GitHub track
 
 Usage:
   ght commits MONTH ORG [options]
+  ght commits --since=DATE ORG [options]
   ght prs MONTH ORG [options]
+  ght prs --since=DATE ORG [options]
   ght reviews MONTH ORG [options]
+  ght reviews --since=DATE ORG [options]
   ght issues MONTH ORG [options]
+  ght issues --since=DATE ORG [options]
   ght stats MONTH ORG [options]
+  ght stats --since=DATE ORG [options]
+  ght sync ORG [options]
+  ght invalidate ORG [options]
 
   ght (-h | --help)
   ght (-v | --version)
@@ -37,6 +44,7 @@ Options:
   --prs                          Collect PRs stats.
   --reviews                      Collect reviews stats.
   --issues                       Collect issues stats.
+  --churn                        Also collect the lines added, deleted, and net of the commits, from the same API calls.
 
   --summarize                    Summarize collected stats.
 
@@ -45,18 +53,50 @@ Options:
   --rl-max=100                   Max number of API calls before sleeping [default: 100].
   --rl-sleep=30m                 Time to sleep once max API calls reach, e.g., 30m, 1h for 30 mins, 1 hour [default: 30m].
 
+  --workers=N                    Number of repos, and of PRs reviews, collected in parallel, 1 by default, or 16 with --backend=async.
+
+  --since=DATE                   Collect stats from this date, e.g., 2020-01-01, instead of for MONTH.
+  --until=DATE                   Collect stats until this date included, e.g., 2020-12-31, defaults to now.
+  --period=PERIOD                Count stats per 'week', 'month', or 'quarter', from one listing of each repo.
+
   -s --state=closed              State one of 'open' or 'closed' [default: closed].
 
   --users=user1,user2,...        List of GitHub user IDs to track.
+  --all-users                    Track all users found in the repositories instead of --users, in one listing of each repo.
+  --top=N                        With --all-users, only show the N users with the most contributions.
 
   --all-repos                    Track all repositories in GitHub organization.
   --repos=repo1,repo2,...        List of repositories in GitHub organization to track.
   --skip-repos=repo1,repo2,...   List of repositories in GitHub organization to skip.
+  --active-only                  Skip the repositories without activity in the month or --since dates, from the organization listing.
+  --active-rules=RULES           Rules of --active-only among 'pushed', only for commits, 'created', 'archived', and 'fork' [default: pushed,created].
   --show-all-stats               Show all stats even when 0 or non-existant for a user [default: False].
 
+  --backend=rest                 GitHub API backend used to collect stats, one of 'rest', 'graphql', 'async', or 'git' [default: rest].
+  --mirrors-dir=DIR              Directory of the git mirrors of the repositories with --backend=git [default: ~/.ghtrack/mirrors].
+
+  --strategy=list                How prs and issues are counted, 'list' pages through them per repo, 'search' makes one search per user, 'auto' picks the cheapest per repo [default: list].
+  --explain                      Show the plan picked by --strategy=auto with its estimated API calls.
+  --estimate                     Only estimate the API calls, rate limit sleeps, and wall time of the command.
+
+  --api-url=URL                  GitHub API URL, e.g., https://HOST/api/v3 for GitHub Enterprise [default: https://api.github.com].
+
+  --cache-dir=DIR                Directory caching GitHub API responses, revalidated on each use [default: ~/.ghtrack/cache].
+  --no-cache                     Do not cache GitHub API responses.
+
+  --checkpoint=FILE              File checkpointing the completed repos of a command until it completes, {request} is a hash of the command [default: ~/.ghtrack/checkpoint-{request}.json].
+  --resume                       Skip the repos completed by the interrupted command of the --checkpoint file.
+
+  --memo=FILE                    Local memo of the commits, and closed prs and issues, counts of past months [default: ~/.ghtrack/memo.db].
+  --memo-after=3d                Time after the end of a month when its counts are final and memoized, e.g., 3d, 12h [default: 3d].
+  --no-memo                      Do not memoize counts of past months.
+
+  --store=FILE                   Local store of GitHub data updated with 'ght sync' [default: ~/.ghtrack/ghtrack.db].
+  --offline                      Collect stats from the local store, without GitHub API calls.
+
   -a --access-token=ACCESS_TOKEN Your GitHub access token to access GitHub APIs.
 
-  -o --output=CSV                The format of the output: text, json, yml, or csv [default: text].
+  -o --output=CSV                The format of the output: text, json, yml, csv, or jsonl [default: text].
   -f --file=output.csv           The file path to save results file.
 
   -h --help                      Show this screen.
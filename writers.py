@@ -0,0 +1,74 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import csv, json
+
+# Writes the rows of each data of a command to its --file as they are counted, through one buffered
+# handle flushed once per repo, so partial results of long runs can be read before the command ends
+class StreamWriter:
+    FORMATS = ['csv', 'jsonl']
+    def __init__(self, stream, output, close=True):
+        self.stream = stream
+        self.output = output
+        self.rows = 0
+        self.__close = close
+        self.__csv = csv.writer(stream)
+        self.__request = {}
+        self.__headers = []
+
+    @classmethod
+    def open(cls, path, output):
+        return cls(open(path, 'a', newline=''), output)
+
+    # starts the rows of a data, with CSV its request and the header of its rows, with JSON Lines
+    # the column of --period is 'period_key' since its name, e.g., 'month', is also a request field
+    def start(self, request, headers):
+        self.__request = request
+        self.__headers = headers
+        if self.output == 'jsonl' and request.get('period') in headers:
+            self.__headers = ['period_key' if header == request['period'] else header for header in headers]
+        if self.output == 'csv':
+            self.stream.write('\n')
+            writer = csv.DictWriter(self.stream, request.keys())
+            writer.writeheader()
+            writer.writerow(request)
+            self.stream.write('\n')
+            self.__csv.writerow(headers)
+        self.stream.flush()
+
+    # with JSON Lines each row is an object with the request, e.g., {"org": ..., "data": "prs", "user": ..., "repo": ..., "count": 1}
+    def write_rows(self, rows):
+        for row in rows:
+            if self.output == 'csv':
+                self.__csv.writerow(row)
+            else:
+                self.stream.write(json.dumps({**self.__request, **dict(zip(self.__headers, row))}, sort_keys=True) + '\n')
+        self.rows += len(rows)
+        self.stream.flush()
+
+    # a table after the rows, e.g., of --summarize, with JSON Lines one object per row
+    def write_table(self, headers, rows):
+        if self.output == 'csv':
+            self.stream.write('\n')
+            self.__csv.writerow(headers)
+            self.__csv.writerows(rows)
+        else:
+            for row in rows:
+                self.stream.write(json.dumps({'org': self.__request.get('org'), **dict(zip(headers, row))}, sort_keys=True) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        if self.__close:
+            self.stream.close()
@@ -0,0 +1,66 @@
+# Copyright © 2020 IBM
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import io, json, unittest
+
+from writers import *
+
+class TestStreamWriter(unittest.TestCase):
+    def setUp(self):
+        self.request = {'org': 'fake-org', 'state': 'closed', 'year': 2020, 'month': 'july', 'data': 'prs'}
+
+    def test_csv(self):
+        stream = io.StringIO()
+        writer = StreamWriter(stream, 'csv', close=False)
+        writer.start(self.request, ['user', 'repo', 'data', 'count'])
+        writer.write_rows([['user0', 'repo0', 'prs', 2]])
+        writer.write_rows([['user1', 'repo1', 'prs', 1]])
+        writer.write_table(['repo', 'data', 'total'], [['repo0', 'prs', 2]])
+        self.assertEqual(stream.getvalue().splitlines(), ['', 'org,state,year,month,data', 'fake-org,closed,2020,july,prs', '',
+                                                          'user,repo,data,count', 'user0,repo0,prs,2', 'user1,repo1,prs,1',
+                                                          '', 'repo,data,total', 'repo0,prs,2'])
+        self.assertEqual(writer.rows, 2)
+
+    def test_jsonl(self):
+        stream = io.StringIO()
+        writer = StreamWriter(stream, 'jsonl', close=False)
+        writer.start(self.request, ['user', 'repo', 'data', 'count'])
+        writer.write_rows([['user0', 'repo0', 'prs', 2], ['user1', 'repo1', 'prs', 1]])
+        writer.write_table(['repo', 'data', 'total'], [['repo0', 'prs', 2]])
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[0], {**self.request, 'user': 'user0', 'repo': 'repo0', 'count': 2})
+        self.assertEqual(lines[1]['user'], 'user1')
+        self.assertEqual(lines[2], {'org': 'fake-org', 'repo': 'repo0', 'data': 'prs', 'total': 2})
+
+    def test_jsonl_period(self):
+        stream = io.StringIO()
+        writer = StreamWriter(stream, 'jsonl', close=False)
+        writer.start({**self.request, 'period': 'month'}, ['user', 'repo', 'data', 'month', 'count'])
+        writer.write_rows([['user0', 'repo0', 'prs', '2020-07', 2]])
+        line = json.loads(stream.getvalue())
+        self.assertEqual((line['month'], line['period'], line['period_key']), ('july', 'month', '2020-07'))
+
+    def test_flushed_rows(self):
+        stream = io.BufferedWriter(io.BytesIO())
+        text = io.TextIOWrapper(stream, newline='')
+        writer = StreamWriter(text, 'csv')
+        writer.start(self.request, ['user', 'repo', 'data', 'count'])
+        writer.write_rows([['user0', 'repo0', 'prs', 2]])
+        self.assertTrue(b'user0,repo0,prs,2' in stream.raw.getvalue())
+        writer.close()
+        self.assertTrue(text.closed)
+
+if __name__ == '__main__':
+    unittest.main()